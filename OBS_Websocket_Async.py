@@ -0,0 +1,889 @@
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import random
+import threading
+import websockets
+from animation import Animation, Tween
+
+# obs-websocket v5 opcodes
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_EVENT = 5
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
+
+# Event subscriptions needed to keep the scene and filter caches in sync (Scenes | Inputs | Filters | SceneItems).
+# SceneItemTransformChanged is left out: it fires for every frame of a slide or zoom, and transforms are
+# cached from this controller's own reads and writes instead, like OBSController.
+CACHE_EVENT_SUBSCRIPTIONS = (1 << 2) | (1 << 3) | (1 << 5) | (1 << 7)
+
+BATCH_EXECUTION_TYPES = {'SerialRealtime': 0, 'SerialFrame': 1, 'Parallel': 2}
+
+
+class OBSRequestError(Exception):
+    """Raised when OBS answers a request with a failed requestStatus."""
+    def __init__(self, request_type, code, comment=None):
+        super().__init__(f"{request_type} failed with code {code}: {comment}")
+        self.request_type = request_type
+        self.code = code
+        self.comment = comment
+
+
+class AsyncOBSController:
+    """
+    asyncio counterpart of OBSController speaking obs-websocket v5 directly.
+
+    Requests are pipelined: each one gets a requestId and a future, a single reader task resolves
+    the futures as responses arrive, so any number of requests can be awaited concurrently over one
+    connection. Every request is bounded by the timeout.
+    """
+    def __init__(self, host='localhost', port=4455, password='', timeout=5, event_subscriptions=CACHE_EVENT_SUBSCRIPTIONS):
+        self.url = f"ws://{host}:{port}"
+        self.password = password
+        self.timeout = timeout
+        self.event_subscriptions = event_subscriptions
+        self.ws = None
+        self.connected = False
+        self.disconnect_reason = None
+        self._reader = None
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        self._last_ok = 0.0
+        # Latest visibility wanted per scene, replayed by replay_state() after a reconnect:
+        # {scene_name: (visible_source, sources, serial_realtime)}
+        self._desired_visibility = {}
+
+        # Same scene item index as OBSController: {scene_name: {source_name: item}}
+        self._scene_cache = {}
+        self._scene_ids = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Same filter index as OBSController: {source_name: {filter_name: filter}}
+        self._filter_cache = {}
+        self.filter_cache_hits = 0
+        self.filter_cache_misses = 0
+
+    # CONNECTION
+
+    async def connect(self):
+        """Open the websocket and complete the Hello/Identify handshake."""
+        ws = await asyncio.wait_for(websockets.connect(self.url, max_size=None), self.timeout)
+        try:
+            hello = json.loads(await asyncio.wait_for(ws.recv(), self.timeout))
+            if hello["op"] != OP_HELLO:
+                raise ConnectionError(f"Expected Hello from OBS, got opcode {hello['op']}")
+
+            identify = {"rpcVersion": 1, "eventSubscriptions": self.event_subscriptions}
+            auth = hello["d"].get("authentication")
+            if auth:
+                secret = base64.b64encode(hashlib.sha256((self.password + auth["salt"]).encode()).digest())
+                identify["authentication"] = base64.b64encode(hashlib.sha256(secret + auth["challenge"].encode()).digest()).decode()
+            await ws.send(json.dumps({"op": OP_IDENTIFY, "d": identify}))
+
+            identified = json.loads(await asyncio.wait_for(ws.recv(), self.timeout))
+            if identified["op"] != OP_IDENTIFIED:
+                raise ConnectionError(f"OBS refused identification (opcode {identified['op']})")
+        except BaseException:
+            await ws.close()
+            raise
+        self.ws = ws
+        self.connected = True
+        self.disconnect_reason = None
+        self._last_ok = asyncio.get_running_loop().time()
+        # Scene item IDs (and filters) may have changed if OBS restarted.
+        self.invalidate_scene_cache()
+        self.invalidate_filter_cache()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def disconnect(self):
+        """Close the connection and fail any request still waiting for a response."""
+        self.connected = False
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+        self._fail_pending(ConnectionError("Disconnected from OBS"))
+
+    async def wait_closed(self, timeout=None):
+        """Wait until the connection drops (or timeout). Returns True if it is closed."""
+        if self._reader is not None:
+            await asyncio.wait({self._reader}, timeout=timeout)
+        return not self.connected
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def _read_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            async for message in self.ws:
+                self._last_ok = loop.time()
+                try:
+                    payload = json.loads(message)
+                    op, data = payload["op"], payload["d"]
+                    if op in (OP_REQUEST_RESPONSE, OP_REQUEST_BATCH_RESPONSE):
+                        future = self._pending.pop(data["requestId"], None)
+                        if future is not None and not future.done():
+                            future.set_result(data)
+                    elif op == OP_EVENT:
+                        self._handle_event(data["eventType"], data.get("eventData", {}))
+                except Exception as e:
+                    # One bad message must not take down the reader and leave every request hanging.
+                    print(f"Ignoring unexpected message from OBS: {e!r}")
+            error = ConnectionError("OBS closed the connection")
+        except websockets.ConnectionClosed as e:
+            error = ConnectionError(f"OBS connection closed: {e}")
+        except Exception as e:
+            error = ConnectionError(f"OBS connection failed: {e!r}")
+        self.connected = False
+        self.disconnect_reason = error
+        self._fail_pending(error)
+        await self.ws.close()
+
+    async def _send(self, op, data, timeout=None):
+        if not self.connected:
+            # Fail fast while OBS is unreachable instead of waiting out the timeout.
+            raise ConnectionError("Not connected to OBS")
+        request_id = str(next(self._request_ids))
+        data["requestId"] = request_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.ws.send(json.dumps({"op": op, "d": data}))
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def request(self, request_type, request_data=None, timeout=None):
+        """
+        Send a single request and return its responseData.
+
+        :raises OBSRequestError: If OBS reports the request as failed.
+        :raises asyncio.TimeoutError: If no response arrives within the timeout.
+        """
+        data = {"requestType": request_type}
+        if request_data:
+            data["requestData"] = request_data
+        response = await self._send(OP_REQUEST, data, timeout)
+        status = response["requestStatus"]
+        if not status["result"]:
+            raise OBSRequestError(request_type, status["code"], status.get("comment"))
+        return response.get("responseData", {})
+
+    async def send_batch(self, requests, execution_type='SerialRealtime', halt_on_failure=False, timeout=None):
+        """Send several requests as one RequestBatch and return the per-request results."""
+        data = {
+            "haltOnFailure": halt_on_failure,
+            "executionType": BATCH_EXECUTION_TYPES[execution_type],
+            "requests": requests,
+        }
+        response = await self._send(OP_REQUEST_BATCH, data, timeout)
+        return response["results"]
+
+    # SCENE ITEM CACHE
+
+    def _handle_event(self, event_type, event_data):
+        if event_type in ("SceneItemCreated", "SceneItemRemoved"):
+            self.invalidate_scene_cache(event_data["sceneName"])
+        elif event_type == "SceneNameChanged":
+            self.invalidate_scene_cache(event_data["oldSceneName"])
+            self.invalidate_filter_cache(event_data["oldSceneName"])
+        elif event_type == "InputNameChanged":
+            self.invalidate_scene_cache()
+            self.invalidate_filter_cache(event_data["oldInputName"])
+        elif event_type == "InputRemoved":
+            self.invalidate_filter_cache(event_data["inputName"])
+        elif event_type in ("SourceFilterCreated", "SourceFilterRemoved"):
+            self.invalidate_filter_cache(event_data["sourceName"])
+        elif event_type == "SourceFilterNameChanged":
+            index = self._filter_cache.get(event_data["sourceName"])
+            if index is not None and event_data["oldFilterName"] in index:
+                item = index.pop(event_data["oldFilterName"])
+                item['filterName'] = event_data["filterName"]
+                index[event_data["filterName"]] = item
+        elif event_type == "SourceFilterEnableStateChanged":
+            item = self._filter_cache.get(event_data["sourceName"], {}).get(event_data["filterName"])
+            if item is not None:
+                item['filterEnabled'] = event_data["filterEnabled"]
+        elif event_type == "SourceFilterSettingsChanged":
+            item = self._filter_cache.get(event_data["sourceName"], {}).get(event_data["filterName"])
+            if item is not None:
+                item['filterSettings'] = event_data["filterSettings"]
+        elif event_type == "SourceFilterListReindexed":
+            index = self._filter_cache.get(event_data["sourceName"])
+            if index is not None:
+                for entry in event_data["filters"]:
+                    item = index.get(entry['filterName'])
+                    if item is not None:
+                        item['filterIndex'] = entry['filterIndex']
+        elif event_type == "SceneItemEnableStateChanged":
+            item = self._get_cached_item_by_id(event_data["sceneName"], event_data["sceneItemId"])
+            if item is not None:
+                item['sceneItemEnabled'] = event_data["sceneItemEnabled"]
+
+    async def _get_scene_index(self, scene_name, refresh=False):
+        if not refresh and scene_name in self._scene_cache:
+            self.cache_hits += 1
+            return self._scene_cache[scene_name]
+        self.cache_misses += 1
+        response = await self.request("GetSceneItemList", {"sceneName": scene_name})
+        index = {item['sourceName']: item for item in response["sceneItems"]}
+        self._scene_cache[scene_name] = index
+        self._scene_ids[scene_name] = {item['sceneItemId']: item['sourceName'] for item in index.values()}
+        return index
+
+    async def _get_scene_item(self, scene_name, source_name):
+        item = (await self._get_scene_index(scene_name)).get(source_name)
+        if item is None:
+            item = (await self._get_scene_index(scene_name, refresh=True)).get(source_name)
+        return item
+
+    def _get_cached_item_by_id(self, scene_name, scene_item_id):
+        source_name = self._scene_ids.get(scene_name, {}).get(scene_item_id)
+        if source_name is None:
+            return None
+        return self._scene_cache[scene_name].get(source_name)
+
+    def invalidate_scene_cache(self, scene_name=None):
+        """Drop the cached index for one scene, or for every scene if no name is given."""
+        if scene_name is None:
+            self._scene_cache.clear()
+            self._scene_ids.clear()
+        else:
+            self._scene_cache.pop(scene_name, None)
+            self._scene_ids.pop(scene_name, None)
+
+    def cache_stats(self):
+        """Return the scene and filter cache hit/miss counters."""
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'scenes': len(self._scene_cache),
+                'filter_hits': self.filter_cache_hits, 'filter_misses': self.filter_cache_misses,
+                'filter_sources': len(self._filter_cache)}
+
+    # FILTER CACHE
+
+    async def _get_filter_index(self, source_name, refresh=False):
+        if not refresh and source_name in self._filter_cache:
+            self.filter_cache_hits += 1
+            return self._filter_cache[source_name]
+        self.filter_cache_misses += 1
+        response = await self.request("GetSourceFilterList", {"sourceName": source_name})
+        index = {item['filterName']: item for item in response["filters"]}
+        self._filter_cache[source_name] = index
+        return index
+
+    async def _get_filter(self, source_name, filter_name):
+        item = (await self._get_filter_index(source_name)).get(filter_name)
+        if item is None:
+            item = (await self._get_filter_index(source_name, refresh=True)).get(filter_name)
+        return item
+
+    async def _prefetch_filters(self, source_names):
+        """Fetch the filter lists of every uncached source in one batch instead of one round trip each."""
+        missing = [name for name in dict.fromkeys(source_names) if name not in self._filter_cache]
+        if not missing:
+            return
+        self.filter_cache_misses += len(missing)
+        results = await self.send_batch([{"requestType": "GetSourceFilterList", "requestData": {"sourceName": name}}
+                                         for name in missing], 'Parallel')
+        for source_name, result in zip(missing, results):
+            if result["requestStatus"]["result"]:
+                filters = result.get("responseData", {}).get("filters", [])
+                self._filter_cache[source_name] = {item['filterName']: item for item in filters}
+
+    def invalidate_filter_cache(self, source_name=None):
+        """Drop the cached filters of one source, or of every source if no name is given."""
+        if source_name is None:
+            self._filter_cache.clear()
+        else:
+            self._filter_cache.pop(source_name, None)
+
+    # SCENE ITEMS
+
+    async def get_source_id_by_name(self, scene_name, source_name):
+        """Fetches the ID of a source in a scene by its name."""
+        try:
+            item = await self._get_scene_item(scene_name, source_name)
+        except Exception as e:
+            print(f"Failed to fetch sources for scene '{scene_name}': {e}")
+            return None
+        return item['sceneItemId'] if item is not None else None
+
+    async def set_source_enabled_by_name(self, scene_name, source_name, enable):
+        """Enable or disable a source using its name."""
+        try:
+            item = await self._get_scene_item(scene_name, source_name)
+            if item is None:
+                print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+                return
+            await self.request("SetSceneItemEnabled", {"sceneName": scene_name, "sceneItemId": item['sceneItemId'], "sceneItemEnabled": enable})
+            item['sceneItemEnabled'] = enable
+        except Exception as e:
+            print(f"Failed to set visibility of source '{source_name}': {e}")
+
+    async def get_source_enabled_by_name(self, scene_name, source_name):
+        """Get the enabled status of a source using its name."""
+        try:
+            item = await self._get_scene_item(scene_name, source_name)
+        except Exception as e:
+            print(f"Failed to fetch sources for scene '{scene_name}': {e}")
+            return None
+        if item is None:
+            print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+            return None
+        return item['sceneItemEnabled']
+
+    async def apply_visibility(self, scene_name, visible_source, sources=None, serial_realtime=True):
+        """
+        Show visible_source and hide every other source in one batched request. Returns the number of requests sent.
+
+        While disconnected nothing is sent; the latest request per scene is applied by replay_state() on reconnect.
+        """
+        return await self.apply_scenes_visibility({scene_name: (visible_source, sources)}, serial_realtime)
+
+    async def apply_scenes_visibility(self, updates, serial_realtime=True):
+        """apply_visibility() for several scenes at once, in a single batched request: {scene_name: (visible_source, sources)}."""
+        for scene_name, (visible_source, sources) in updates.items():
+            self._desired_visibility[scene_name] = (visible_source, list(sources) if sources is not None else None, serial_realtime)
+        if not self.connected:
+            return 0
+
+        changes = []
+        for scene_name, (visible_source, sources) in updates.items():
+            try:
+                index = await self._get_scene_index(scene_name)
+            except Exception as e:
+                print(f"Failed to fetch sources for scene '{scene_name}': {e}")
+                continue
+            for source_name in (sources if sources is not None else list(index)):
+                item = index.get(source_name)
+                if item is None:
+                    print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+                    continue
+                enable = source_name == visible_source
+                if item['sceneItemEnabled'] != enable:
+                    changes.append((scene_name, item, enable))
+        if not changes:
+            return 0
+        changes.sort(key=lambda change: not change[2])
+
+        requests = [
+            {
+                "requestType": "SetSceneItemEnabled",
+                "requestData": {"sceneName": scene_name, "sceneItemId": item['sceneItemId'], "sceneItemEnabled": enable},
+            }
+            for scene_name, item, enable in changes
+        ]
+        try:
+            results = await self.send_batch(requests, 'SerialRealtime' if serial_realtime else 'Parallel')
+        except Exception as e:
+            print(f"Failed to update source visibility in {', '.join(repr(name) for name in updates)}: {e}")
+            return 0
+        for (scene_name, item, enable), result in zip(changes, results):
+            status = result["requestStatus"]
+            if status["result"]:
+                item['sceneItemEnabled'] = enable
+            else:
+                print(f"Failed to set visibility of '{item['sourceName']}': {status.get('comment', status['code'])}")
+        return len(requests)
+
+    async def replay_state(self):
+        """Re-apply the visibility that was requested while disconnected (or before OBS restarted)."""
+        for scene_name, (visible_source, sources, serial_realtime) in list(self._desired_visibility.items()):
+            await self.apply_visibility(scene_name, visible_source, sources, serial_realtime)
+
+    def forget_visibility(self, scene_name):
+        """Stop replaying the visibility of a scene on reconnect, eg. after it was renamed in config.ini."""
+        self._desired_visibility.pop(scene_name, None)
+
+    async def set_transform_by_source_name(self, scene_name, source_name, transform):
+        """Modify the transform attributes of a source using its name."""
+        try:
+            item = await self._get_scene_item(scene_name, source_name)
+            if item is None:
+                print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+                return
+            await self.request("SetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": item['sceneItemId'], "sceneItemTransform": transform})
+            item['sceneItemTransform'] = {**item.get('sceneItemTransform', {}), **transform}
+        except Exception as e:
+            print(f"Failed to modify the source transform: {e}")
+
+    async def get_transform_by_source_name(self, scene_name, source_name):
+        """Fetch the transform attributes of a source using its name."""
+        try:
+            item = await self._get_scene_item(scene_name, source_name)
+            if item is None:
+                print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+                return None
+            if 'sceneItemTransform' not in item:
+                response = await self.request("GetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": item['sceneItemId']})
+                item['sceneItemTransform'] = response["sceneItemTransform"]
+            return dict(item['sceneItemTransform'])
+        except Exception as e:
+            print(f"Failed to fetch the source transform: {e}")
+            return None
+
+    async def print_scene_item_transform(self, scene_name, source_name):
+        """Fetch and print the transform details of a source in a scene."""
+        try:
+            item = await self._get_scene_item(scene_name, source_name)
+            if item is None:
+                print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+                return
+            response = await self.request("GetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": item['sceneItemId']})
+        except Exception as e:
+            print(f"Failed to fetch the source transform: {e}")
+            return
+        item['sceneItemTransform'] = response["sceneItemTransform"]
+        for key, value in sorted(response["sceneItemTransform"].items()):
+            print(key, ":", value)
+
+    async def slide_source(self, scene_name, source_name, end_position, duration, fps=60, easing='linear'):
+        """
+        Slide a source from its current position to end_position over the given duration.
+
+        Frames follow the same fixed deadline grid as animation.Animator: late frames are dropped so
+        the slide still ends on time, and the last frame always lands on end_position.
+
+        :param end_position: Tuple (x, y) specifying the end position for the slide.
+        :param easing: Name of an easing curve from animation.EASINGS, or a callable.
+        :return: The finished animation.Animation, or None if the source could not be found.
+        """
+        current_transform = await self.get_transform_by_source_name(scene_name, source_name)
+        if not current_transform:
+            print(f"Failed to get the transform for source '{source_name}'.")
+            return None
+        item = await self._get_scene_item(scene_name, source_name)
+        tweens = [
+            Tween(scene_name, source_name, 'positionX', end_position[0], duration, easing, start=current_transform["positionX"]),
+            Tween(scene_name, source_name, 'positionY', end_position[1], duration, easing, start=current_transform["positionY"]),
+        ]
+        animation = Animation(tweens, duration)
+        loop = asyncio.get_running_loop()
+        frame_interval = 1.0 / fps
+        animation.started_at = start = loop.time()
+        frame = 0
+        position = {}
+        try:
+            while not animation.cancelled:
+                elapsed = loop.time() - start
+                if elapsed >= duration:
+                    break
+                position = await self._send_slide_frame(animation, scene_name, item['sceneItemId'], elapsed)
+
+                # Next deadline on the fixed frame grid; skip any frames we are already late for.
+                frame += 1
+                late_frame = int((loop.time() - start) / frame_interval) + 1
+                if late_frame > frame:
+                    animation.dropped_frames += late_frame - frame
+                    frame = late_frame
+                await asyncio.sleep(max(0.0, start + frame * frame_interval - loop.time()))
+
+            if not animation.cancelled:
+                position = await self._send_slide_frame(animation, scene_name, item['sceneItemId'], duration)
+        finally:
+            animation.finished_at = loop.time()
+            item['sceneItemTransform'] = {**item.get('sceneItemTransform', {}), **position}
+            animation._done_event.set()
+        return animation
+
+    async def _send_slide_frame(self, animation, scene_name, scene_item_id, elapsed):
+        position = {tween.prop: tween.value_at(elapsed) for tween in animation.tweens}
+        try:
+            await self.request("SetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": scene_item_id, "sceneItemTransform": position})
+        except Exception as e:
+            print(f"Failed to send animation frame: {e}")
+        animation.frames += 1
+        return position
+
+    async def set_source_opacity(self, scene_name, source_name, opacity):
+        """Set the opacity of a source."""
+        current_transform = await self.get_transform_by_source_name(scene_name, source_name)
+        if current_transform is None:
+            print(f"Failed to fetch current transform for source '{source_name}' in scene '{scene_name}'.")
+            return
+        await self.set_transform_by_source_name(scene_name, source_name, {**current_transform, 'opacity': opacity})
+
+    async def set_source_zoom(self, scene_name, source_name, zoom_level):
+        """Set the zoom level of a source (scales its width and height, like OBSController.set_source_zoom)."""
+        current_transform = await self.get_transform_by_source_name(scene_name, source_name)
+        if current_transform is None:
+            print(f"Failed to fetch current transform for source '{source_name}' in scene '{scene_name}'.")
+            return
+        await self.set_transform_by_source_name(scene_name, source_name, {
+            **current_transform,
+            'width': current_transform['width'] * zoom_level,
+            'height': current_transform['height'] * zoom_level,
+        })
+
+    async def fetch_sources(self, scene_name):
+        """Fetch the list of sources from a specified scene."""
+        try:
+            return list(await self._get_scene_index(scene_name))
+        except Exception as e:
+            print(f"Error: {e}")
+            return []
+
+    # MEDIA
+
+    async def pause_media_source(self, source_name):
+        """Pause a media source."""
+        try:
+            await self.request("TriggerMediaInputAction", {"inputName": source_name, "mediaAction": "OBS_WEBSOCKET_MEDIA_INPUT_ACTION_PAUSE"})
+        except Exception as e:
+            print(f"Failed to pause media source '{source_name}': {e}")
+
+    async def play_media_source(self, source_name):
+        """Play (or resume) a media source."""
+        try:
+            await self.request("TriggerMediaInputAction", {"inputName": source_name, "mediaAction": "OBS_WEBSOCKET_MEDIA_INPUT_ACTION_PLAY"})
+        except Exception as e:
+            print(f"Failed to play media source '{source_name}': {e}")
+
+    # FILTERS
+
+    async def apply_filter_changes(self, changes, serial_realtime=True):
+        """
+        Enable/disable filters and change their settings on any number of sources in one batched request,
+        skipping changes that match the cached state (see OBSController.apply_filter_changes).
+
+        :param changes: Iterable of (source_name, filter_name, enabled, settings); None leaves that part alone.
+        :return: Number of requests sent.
+        """
+        changes = list(changes)
+        try:
+            await self._prefetch_filters(source_name for source_name, _, _, _ in changes)
+        except Exception as e:
+            print(f"Failed to fetch filters: {e}")
+            return 0
+
+        requests = []
+        pending = []
+        for source_name, filter_name, enabled, settings in changes:
+            try:
+                item = await self._get_filter(source_name, filter_name)
+            except Exception as e:
+                print(f"Failed to get filters for source '{source_name}': {e}")
+                continue
+            if item is None:
+                print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+                continue
+            if settings:
+                current = item.get('filterSettings', {})
+                if any(current.get(key) != value for key, value in settings.items()):
+                    requests.append({
+                        "requestType": "SetSourceFilterSettings",
+                        "requestData": {"sourceName": source_name, "filterName": filter_name, "filterSettings": settings, "overlay": True},
+                    })
+                    pending.append((item, 'filterSettings', settings))
+            if enabled is not None and item['filterEnabled'] != enabled:
+                requests.append({
+                    "requestType": "SetSourceFilterEnabled",
+                    "requestData": {"sourceName": source_name, "filterName": filter_name, "filterEnabled": enabled},
+                })
+                pending.append((item, 'filterEnabled', enabled))
+        if not requests:
+            return 0
+
+        try:
+            results = await self.send_batch(requests, 'SerialRealtime' if serial_realtime else 'Parallel')
+        except Exception as e:
+            print(f"Failed to update filters: {e}")
+            return 0
+        for (item, key, value), result in zip(pending, results):
+            status = result["requestStatus"]
+            if not status["result"]:
+                print(f"Failed to update filter '{item['filterName']}': {status.get('comment', status['code'])}")
+            elif key == 'filterSettings':
+                item['filterSettings'] = {**item.get('filterSettings', {}), **value}
+            else:
+                item['filterEnabled'] = value
+        return len(requests)
+
+    async def set_filters_enabled(self, source_names, filter_name, enable):
+        """Enable or disable the same filter on several sources in one request. Returns the number of changes sent."""
+        return await self.apply_filter_changes((source_name, filter_name, enable, None) for source_name in source_names)
+
+    async def set_filters_settings(self, source_names, filter_name, filter_settings):
+        """Change the settings of the same filter on several sources in one request. Returns the number of changes sent."""
+        return await self.apply_filter_changes((source_name, filter_name, None, filter_settings) for source_name in source_names)
+
+    async def set_filter_enabled(self, source_name, filter_name, enable):
+        """Enable or disable a filter on a specific source."""
+        await self.apply_filter_changes([(source_name, filter_name, enable, None)])
+
+    async def get_source_filters(self, source_name):
+        """Get a list of filters applied to a specific source, in filter order."""
+        try:
+            index = await self._get_filter_index(source_name)
+        except Exception as e:
+            print(f"Failed to get filters for source '{source_name}': {e}")
+            return None
+        return sorted((dict(item) for item in index.values()), key=lambda item: item.get('filterIndex', 0))
+
+    async def get_source_filter_settings(self, source_name, filter_name):
+        """Get the settings of a filter on a specific source."""
+        try:
+            item = await self._get_filter(source_name, filter_name)
+        except Exception as e:
+            print(f"Failed to get settings for filter '{filter_name}' on source '{source_name}': {e}")
+            return None
+        if item is None:
+            print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+            return None
+        return dict(item.get('filterSettings', {}))
+
+    async def toggle_filter_on_source(self, source_name, filter_name):
+        """Toggle the enabled state of a filter on a specific source."""
+        try:
+            item = await self._get_filter(source_name, filter_name)
+        except Exception as e:
+            print(f"Failed to toggle filter '{filter_name}' on source '{source_name}': {e}")
+            return
+        if item is None:
+            print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+            return
+        await self.set_filter_enabled(source_name, filter_name, not item['filterEnabled'])
+
+    async def set_source_filter_settings(self, source_name, filter_name, filter_settings):
+        """Modify the settings of a filter on a specific source (merged into its current settings)."""
+        await self.apply_filter_changes([(source_name, filter_name, None, filter_settings)])
+
+    async def add_filter_to_source(self, source_name, filter_name, filter_type, filter_settings):
+        """Add a new filter to a specific source."""
+        try:
+            await self.request("CreateSourceFilter", {"sourceName": source_name, "filterName": filter_name, "filterKind": filter_type, "filterSettings": filter_settings})
+        except Exception as e:
+            print(f"Failed to add filter '{filter_name}' to source '{source_name}': {e}")
+        self.invalidate_filter_cache(source_name)
+
+    async def remove_filter_from_source(self, source_name, filter_name):
+        """Remove a filter from a specific source."""
+        try:
+            await self.request("RemoveSourceFilter", {"sourceName": source_name, "filterName": filter_name})
+        except Exception as e:
+            print(f"Failed to remove filter '{filter_name}' from source '{source_name}': {e}")
+        self.invalidate_filter_cache(source_name)
+
+    async def reorder_source_filter(self, source_name, filter_name, new_index):
+        """Reorder a filter on a specific source."""
+        try:
+            await self.request("SetSourceFilterIndex", {"sourceName": source_name, "filterName": filter_name, "filterIndex": new_index})
+        except Exception as e:
+            print(f"Failed to reorder filter '{filter_name}' on source '{source_name}': {e}")
+        self.invalidate_filter_cache(source_name)
+
+    # SCREENSHOTS
+
+    async def get_source_screenshot(self, source_name, img_format, width, height, quality):
+        """Takes a base64 encoded screenshot of a given source and returns the data URI."""
+        try:
+            response = await self.request("GetSourceScreenshot", {
+                "sourceName": source_name, "imageFormat": img_format,
+                "imageWidth": width, "imageHeight": height, "imageCompressionQuality": quality,
+            })
+            return response["imageData"]
+        except Exception as e:
+            print(f"Failed to grab screenshot of source '{source_name}': {e}")
+            return None
+
+    async def save_source_screenshot(self, source_name, img_format, file_path, width, height, quality):
+        """Saves a base64 encoded screenshot of a given source"""
+        try:
+            await self.request("SaveSourceScreenshot", {
+                "sourceName": source_name, "imageFormat": img_format, "imageFilePath": file_path,
+                "imageWidth": width, "imageHeight": height, "imageCompressionQuality": quality,
+            })
+        except Exception as e:
+            print(f"Failed to grab screenshot of source '{source_name}': {e}")
+
+
+class BackgroundOBSController:
+    """
+    Runs an AsyncOBSController on its own event loop thread for synchronous callers.
+
+    Every coroutine method of the controller is exposed as a plain method that schedules the call
+    and immediately returns a concurrent.futures.Future, so the caller (the shuffler's main loop)
+    never waits on OBS. Call .result() on the future when the answer is actually needed.
+
+    Like OBSController, the connection is kept alive on the loop: OBS is pinged every
+    health_interval seconds when nothing else was heard from it, a ping that times out drops the
+    connection, and a dropped connection is reopened with exponential backoff (up to max_backoff).
+    While disconnected, calls fail fast and visibility changes are replayed on reconnect.
+    """
+    def __init__(self, host='localhost', port=4455, password='', timeout=5, health_interval=5.0, max_backoff=30.0):
+        self.controller = AsyncOBSController(host=host, port=port, password=password, timeout=timeout)
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+        self.reconnects = 0
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="obs-async", daemon=True)
+        self._thread.start()
+        # Resolved after the first connection attempt, whatever its outcome
+        self._first_attempt = concurrent.futures.Future()
+        self._monitor = self.submit(self._monitor_connection())
+
+    @property
+    def connected(self):
+        return self.controller.connected
+
+    async def _monitor_connection(self):
+        attempt = 0
+        was_connected = False
+        while True:
+            try:
+                await self.controller.connect()
+            except Exception as e:
+                # Only report the first failed attempt of each outage.
+                if attempt == 0:
+                    print(f"Failed to connect to OBS: {e}")
+                self._first_attempt_done()
+                # Exponential backoff with jitter so a restarting OBS isn't hammered.
+                delay = min(self.max_backoff, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            if was_connected:
+                self.reconnects += 1
+                print("Reconnected to OBS.")
+            attempt = 0
+            was_connected = True
+            self._first_attempt_done()
+            await self.controller.replay_state()
+            await self._watch_connection()
+            print(f"Lost connection to OBS: {self.controller.disconnect_reason}")
+
+    async def _watch_connection(self):
+        """Return once the connection is gone, pinging OBS when it has been quiet so a hung OBS is noticed too."""
+        loop = asyncio.get_running_loop()
+        while not await self.controller.wait_closed(self.health_interval):
+            if loop.time() - self.controller._last_ok < self.health_interval:
+                continue
+            try:
+                await self.controller.request("GetVersion")
+            except Exception as e:
+                if self.controller.connected:
+                    await self.controller.disconnect()
+                    self.controller.disconnect_reason = ConnectionError(f"OBS stopped answering: {e!r}")
+                return
+
+    def _first_attempt_done(self):
+        if not self._first_attempt.done():
+            self._first_attempt.set_result(None)
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the OBS loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.controller, name)
+        if not asyncio.iscoroutinefunction(attribute):
+            return attribute
+
+        def schedule(*args, **kwargs):
+            return self.submit(self._after_connect(attribute(*args, **kwargs)))
+        return schedule
+
+    def warm_up(self, scene_name, source_name):
+        """Look a scene item up on the loop so a later call finds it cached. Returns at once; skipped while OBS is down."""
+        if self.controller.connected:
+            self.submit(self.controller.get_source_id_by_name(scene_name, source_name))
+
+    async def _after_connect(self, coroutine):
+        # Calls made while the first handshake is still running wait for it instead of failing.
+        await asyncio.wrap_future(self._first_attempt)
+        return await coroutine
+
+    def close(self):
+        """Stop reconnecting, disconnect from OBS and stop the loop thread."""
+        self._monitor.cancel()
+        self.submit(self.controller.disconnect()).result(self.controller.timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(self.controller.timeout)
+
+
+# -------------------------------------------------
+# SELF-CHECK
+# -------------------------------------------------
+
+def _wait_for(condition, timeout=5.0):
+    import time
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def check_background_controller():
+    """
+    Drive a BackgroundOBSController against a fake OBS: pipelined requests, the scene item helpers,
+    a malformed event, OBS being restarted and OBS hanging.
+    """
+    from fake_obs import FakeOBSServer
+
+    server = FakeOBSServer({"Scene": ["Game A", "Game B", "Game C"]}).start()
+    obs = BackgroundOBSController(port=server.port, timeout=0.5, health_interval=0.2, max_backoff=0.5)
+    try:
+        assert obs.apply_visibility("Scene", "Game B").result(2) == 2
+        assert server.visible("Scene") == ["Game B"]
+
+        # Pipelined: many requests in flight on one connection
+        versions = [obs.request("GetVersion") for _ in range(20)]
+        assert all(future.result(2)['rpcVersion'] == 1 for future in versions)
+
+        # Same helpers and zoom semantics as OBSController
+        obs.set_source_zoom("Scene", "Game B", 0.5).result(2)
+        assert server.scenes["Scene"]["Game B"]['sceneItemTransform']['width'] == 960.0
+        obs.set_source_opacity("Scene", "Game B", 0.5).result(2)
+        obs.print_scene_item_transform("Scene", "Game B").result(2)
+        animation = obs.slide_source("Scene", "Game B", (100.0, 50.0), 0.2, fps=30).result(2)
+        assert animation.frames > 2, animation.stats()
+        transform = server.scenes["Scene"]["Game B"]['sceneItemTransform']
+        assert (transform['positionX'], transform['positionY']) == (100.0, 50.0)
+
+        # A message the reader cannot handle is skipped; the reader keeps answering requests
+        server.emit('SceneItemCreated', {'sourceName': 'no scene name'})
+        assert obs.request("GetVersion").result(2)['rpcVersion'] == 1
+
+        # Warm-up returns at once and fetches a newly added source on the loop
+        fetches = server.requests['GetSceneItemList']
+        server.add_scene_item("Scene", "Game D")
+        obs.warm_up("Scene", "Game D")
+        assert _wait_for(lambda: server.requests['GetSceneItemList'] > fetches), "warm_up did not fetch the scene"
+
+        # OBS closed and started again: calls fail fast meanwhile, visibility is replayed on reconnect
+        server.stop()
+        assert _wait_for(lambda: not obs.connected), "closed connection was not noticed"
+        assert obs.apply_visibility("Scene", "Game C").result(2) == 0
+        assert isinstance(obs.request("GetVersion").exception(0.2), ConnectionError)
+        server.start()
+        assert _wait_for(lambda: obs.connected and server.visible("Scene") == ["Game C"]), "state was not replayed"
+        assert obs.reconnects == 1
+
+        # OBS hangs: the health ping times out, the connection is dropped and reopened
+        server.hang()
+        assert _wait_for(lambda: obs.reconnects >= 2), "hung OBS was not noticed"
+        server.unhang()
+        assert _wait_for(lambda: obs.connected)
+        assert obs.request("GetVersion").result(2)['rpcVersion'] == 1
+    finally:
+        obs.close()
+        server.stop()
+    print(f"Background controller: {obs.reconnects} reconnects, {sum(server.requests.values())} requests to the fake OBS")
+
+
+if __name__ == "__main__":
+    check_background_controller()
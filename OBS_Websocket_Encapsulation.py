@@ -1,13 +1,525 @@
 import obsws_python as obs
+import websocket
+from obsws_python.error import OBSSDKTimeoutError
+from animation import Animator, Tween
+import itertools
+import json
+import random
+import threading
 import time
 
+# obs-websocket v5 RequestBatchExecutionType values
+BATCH_EXECUTION_TYPES = {'SerialRealtime': 0, 'SerialFrame': 1, 'Parallel': 2}
+
+# Errors that mean the websocket itself is gone, as opposed to OBS rejecting a request. A timeout
+# counts too: OBS is hung, and its late reply would otherwise stay queued on the socket and be
+# read as the answer to the next request, so the socket is dropped and reopened.
+CONNECTION_ERRORS = (OSError, websocket.WebSocketException, OBSSDKTimeoutError)
+
+
+class _DisconnectedClient:
+    """Stands in for the ReqClient while OBS is unreachable: every call fails immediately instead of blocking."""
+    def __getattr__(self, name):
+        raise ConnectionError("Not connected to OBS")
+
+
+class _MonitoredClient:
+    """
+    Wraps the ReqClient so requests from different threads never interleave on the socket and
+    a dropped connection is reported to the controller as soon as any request notices it.
+    """
+    def __init__(self, client, controller):
+        self._client = client
+        self._controller = controller
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._controller._request_lock:
+                start = time.perf_counter()
+                try:
+                    result = attribute(*args, **kwargs)
+                except CONNECTION_ERRORS as e:
+                    self._controller._connection_lost(e, self)
+                    raise
+                finally:
+                    self._controller._observe(f"obs.{name}", time.perf_counter() - start)
+            self._controller._last_ok = time.monotonic()
+            return result
+        return call
+
+
+def _skip_utf8_validation(client):
+    """
+    websocket-client checks every incoming text frame for valid UTF-8 in pure Python (unless wsaccel
+    is installed), which takes seconds for a multi-megabyte screenshot. The responses are JSON, which
+    json.loads validates anyway, so turn the check off on the client's socket.
+    """
+    try:
+        client.base_client.ws.frame_buffer.skip_utf8_validation = True
+        client.base_client.ws.cont_frame.skip_utf8_validation = True
+    except AttributeError:
+        pass
+
+
 class OBSController:
-    def __init__(self, host='localhost', port=4455, password='', timeout=5):
-        """Initialize and connect to the OBS WebSockets server."""
+    def __init__(self, host='localhost', port=4455, password='', timeout=5, listen_events=True,
+                 lazy=False, health_interval=5.0, max_backoff=30.0, metrics=None):
+        """
+        Initialize and connect to the OBS WebSockets server.
+
+        The connection is kept alive by a background thread that pings OBS every health_interval
+        seconds and reconnects with exponential backoff (up to max_backoff) when it drops. While
+        disconnected, calls fail fast and visibility changes are remembered and replayed on reconnect.
+
+        :param lazy: Don't connect in the constructor; let the background thread connect instead.
+        :param metrics: Optional metrics.Metrics that receives the round-trip time of every request.
+        """
+        # Per-scene index of scene items: {scene_name: {source_name: item}}, where item is the
+        # raw entry from GetSceneItemList (sceneItemId, sceneItemEnabled, sceneItemTransform, ...).
+        # Filled on first use and kept in sync by OBS events, so name lookups cost no round trip.
+        # Transforms are the ones last read or sent from here: SceneItemTransformChanged fires for
+        # every frame of a slide or zoom, so it is not subscribed to.
+        self._scene_cache = {}
+        self._scene_ids = {}
+        # Per-source index of filters: {source_name: {filter_name: filter}}, where filter is the raw
+        # entry from GetSourceFilterList (filterName, filterEnabled, filterIndex, filterKind, filterSettings).
+        # Kept in sync by the SourceFilter* events, like the scene cache.
+        self._filter_cache = {}
+        self._cache_lock = threading.RLock()
+        self._warming = set()  # Scenes being looked up by warm_up()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.filter_cache_hits = 0
+        self.filter_cache_misses = 0
+        self.events = None
+        self.metrics = metrics
+        self._batch_ids = itertools.count(1)
+
+        self._connection_settings = {'host': host, 'port': port, 'password': password, 'timeout': timeout}
+        self.listen_events = listen_events
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+        self.ws = _DisconnectedClient()
+        self.connected = False
+        self.reconnects = 0
+        self._request_lock = threading.RLock()
+        self._connect_lock = threading.Lock()
+        self._last_ok = 0.0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        # Latest visibility wanted per scene, replayed after a reconnect: {scene_name: (visible_source, sources, serial_realtime)}
+        self._desired_visibility = {}
+
+        if not lazy:
+            self.connect()
+        self._monitor = threading.Thread(target=self._monitor_connection, name="obs-monitor", daemon=True)
+        self._monitor.start()
+
+    # CONNECTION MANAGEMENT
+
+    def connect(self, quiet=False):
+        """Open the request (and event) connection, then replay the remembered state. Returns True on success."""
+        with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                client = obs.ReqClient(**self._connection_settings)
+            except Exception as e:
+                if not quiet:
+                    print(f"Failed to connect to OBS: {e}")
+                return False
+            _skip_utf8_validation(client)
+            self.ws = _MonitoredClient(client, self)
+            self.connected = True
+            self._last_ok = time.monotonic()
+            # Scene item IDs (and filters) may have changed if OBS restarted.
+            self.invalidate_scene_cache()
+            self.invalidate_filter_cache()
+            if self.listen_events:
+                self._start_event_client(**self._connection_settings)
+        self._replay_state()
+        return True
+
+    def _observe(self, name, seconds):
+        if self.metrics is not None:
+            self.metrics.observe(name, seconds)
+
+    def _connection_lost(self, error, client):
+        """Mark the connection dead and wake the monitor thread to start reconnecting."""
+        # A call that started on an older connection must not take down the one that replaced it
+        if not self.connected or client is not self.ws:
+            return
+        print(f"Lost connection to OBS: {error}")
+        self.connected = False
+        old_client, self.ws = self.ws, _DisconnectedClient()
+        try:
+            old_client.base_client.ws.close()
+        except Exception:
+            pass
+        self._wake.set()
+
+    def _monitor_connection(self):
+        attempt = 0
+        was_connected = False
+        while not self._stop.is_set():
+            if self.connected:
+                attempt = 0
+                was_connected = True
+                self._wake.wait(self.health_interval)
+                self._wake.clear()
+                # Only ping when nothing else has talked to OBS recently.
+                if self.connected and time.monotonic() - self._last_ok >= self.health_interval:
+                    try:
+                        self.ws.get_version()
+                    except Exception:
+                        pass  # _MonitoredClient already reported a dead connection
+            else:
+                # Only report the first failed attempt of each outage.
+                if self.connect(quiet=attempt > 0):
+                    if was_connected:
+                        self.reconnects += 1
+                        print("Reconnected to OBS.")
+                    elif attempt:
+                        print("Connected to OBS.")
+                    continue
+                # Exponential backoff with jitter so a restarting OBS isn't hammered.
+                delay = min(self.max_backoff, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2)
+                attempt += 1
+                self._stop.wait(delay)
+
+    def _replay_state(self):
+        """Re-apply the visibility that was requested while disconnected (or before OBS restarted)."""
+        for scene_name, (visible_source, sources, serial_realtime) in list(self._desired_visibility.items()):
+            self.apply_visibility(scene_name, visible_source, sources, serial_realtime)
+
+    def forget_visibility(self, scene_name):
+        """Stop replaying the visibility of a scene on reconnect, eg. after it was renamed in config.ini."""
+        self._desired_visibility.pop(scene_name, None)
+
+    def close(self):
+        """Stop the connection monitor and disconnect from OBS."""
+        self._stop.set()
+        self._wake.set()
+        self.connected = False
+        for client in (self.ws, self.events):
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+        self.ws = _DisconnectedClient()
+
+    # SCENE ITEM CACHE
+
+    def _start_event_client(self, host, port, password, timeout):
+        """Subscribe to the low-volume events so the scene and filter caches follow changes made in OBS."""
+        if self.events is not None:
+            try:
+                self.events.disconnect()
+            except Exception:
+                pass
+        try:
+            self.events = obs.EventClient(
+                host=host, port=port, password=password, timeout=timeout,
+                subs=obs.Subs.LOW_VOLUME,
+            )
+            self.events.callback.register([
+                self.on_scene_item_created,
+                self.on_scene_item_removed,
+                self.on_scene_item_enable_state_changed,
+                self.on_scene_name_changed,
+                self.on_input_name_changed,
+                self.on_input_removed,
+                self.on_source_filter_created,
+                self.on_source_filter_removed,
+                self.on_source_filter_name_changed,
+                self.on_source_filter_enable_state_changed,
+                self.on_source_filter_settings_changed,
+                self.on_source_filter_list_reindexed,
+            ])
+        except Exception as e:
+            self.events = None
+            print(f"Failed to subscribe to OBS events, scene and filter caches will not auto-refresh: {e}")
+
+    def _get_scene_index(self, scene_name, refresh=False):
+        """Return the cached {source_name: scene item} index for a scene, fetching it on a miss."""
+        with self._cache_lock:
+            if not refresh and scene_name in self._scene_cache:
+                self.cache_hits += 1
+                return self._scene_cache[scene_name]
+            self.cache_misses += 1
+        scene_details = self.ws.get_scene_item_list(scene_name)
+        index = {item['sourceName']: item for item in scene_details.scene_items}
+        with self._cache_lock:
+            self._scene_cache[scene_name] = index
+            self._scene_ids[scene_name] = {item['sceneItemId']: item['sourceName'] for item in index.values()}
+        return index
+
+    def _get_scene_item(self, scene_name, source_name):
+        """Return the cached scene item for a source, refreshing the scene once if it is unknown."""
+        item = self._get_scene_index(scene_name).get(source_name)
+        if item is None:
+            # The source may have been added while events were unavailable, so re-check once.
+            item = self._get_scene_index(scene_name, refresh=True).get(source_name)
+        return item
+
+    def _get_cached_item_by_id(self, scene_name, scene_item_id):
+        """Return the cached scene item with the given ID, or None if the scene is not cached."""
+        source_name = self._scene_ids.get(scene_name, {}).get(scene_item_id)
+        if source_name is None:
+            return None
+        return self._scene_cache[scene_name].get(source_name)
+
+    def _update_cached_transform(self, scene_name, source_name, transform):
+        """Merge transform values that were sent to OBS into the cached scene item."""
+        with self._cache_lock:
+            item = self._scene_cache.get(scene_name, {}).get(source_name)
+            if item is not None:
+                item['sceneItemTransform'] = {**item.get('sceneItemTransform', {}), **transform}
+
+    def invalidate_scene_cache(self, scene_name=None):
+        """Drop the cached index for one scene, or for every scene if no name is given."""
+        with self._cache_lock:
+            if scene_name is None:
+                self._scene_cache.clear()
+                self._scene_ids.clear()
+            else:
+                self._scene_cache.pop(scene_name, None)
+                self._scene_ids.pop(scene_name, None)
+
+    def cache_stats(self):
+        """Return the scene and filter cache hit/miss counters."""
+        with self._cache_lock:
+            return {'hits': self.cache_hits, 'misses': self.cache_misses, 'scenes': len(self._scene_cache),
+                    'filter_hits': self.filter_cache_hits, 'filter_misses': self.filter_cache_misses,
+                    'filter_sources': len(self._filter_cache)}
+
+    def on_scene_item_created(self, data):
+        self.invalidate_scene_cache(data.scene_name)
+
+    def on_scene_item_removed(self, data):
+        self.invalidate_scene_cache(data.scene_name)
+
+    def on_scene_item_enable_state_changed(self, data):
+        with self._cache_lock:
+            item = self._get_cached_item_by_id(data.scene_name, data.scene_item_id)
+            if item is not None:
+                item['sceneItemEnabled'] = data.scene_item_enabled
+
+    def on_scene_name_changed(self, data):
+        self.invalidate_scene_cache(data.old_scene_name)
+        self.invalidate_filter_cache(data.old_scene_name)
+
+    def on_input_name_changed(self, data):
+        # An input can appear in any number of scenes, so drop everything.
+        self.invalidate_scene_cache()
+        self.invalidate_filter_cache(data.old_input_name)
+
+    def on_input_removed(self, data):
+        self.invalidate_filter_cache(data.input_name)
+
+    # FILTER CACHE
+
+    def _get_filter_index(self, source_name, refresh=False):
+        """Return the cached {filter_name: filter} index for a source, fetching it on a miss."""
+        with self._cache_lock:
+            if not refresh and source_name in self._filter_cache:
+                self.filter_cache_hits += 1
+                return self._filter_cache[source_name]
+            self.filter_cache_misses += 1
+        filter_list = self.ws.get_source_filter_list(source_name)
+        index = {item['filterName']: item for item in filter_list.filters}
+        with self._cache_lock:
+            self._filter_cache[source_name] = index
+        return index
+
+    def _get_filter(self, source_name, filter_name):
+        """Return the cached filter, refreshing the source once if the filter is unknown."""
+        item = self._get_filter_index(source_name).get(filter_name)
+        if item is None:
+            item = self._get_filter_index(source_name, refresh=True).get(filter_name)
+        return item
+
+    def _prefetch_filters(self, source_names):
+        """Fetch the filter lists of every uncached source in one batch instead of one round trip each."""
+        with self._cache_lock:
+            missing = [name for name in dict.fromkeys(source_names) if name not in self._filter_cache]
+            self.filter_cache_misses += len(missing)
+        if not missing:
+            return
+        requests = [{"requestType": "GetSourceFilterList", "requestData": {"sourceName": name}} for name in missing]
+        results = self.send_batch(requests, 'Parallel')
+        with self._cache_lock:
+            for source_name, result in zip(missing, results):
+                if result["requestStatus"]["result"]:
+                    filters = result.get("responseData", {}).get("filters", [])
+                    self._filter_cache[source_name] = {item['filterName']: item for item in filters}
+
+    def _update_cached_filter_settings(self, source_name, filter_name, settings):
+        """Merge filter settings that were sent to OBS into the cached filter."""
+        with self._cache_lock:
+            item = self._filter_cache.get(source_name, {}).get(filter_name)
+            if item is not None:
+                item['filterSettings'] = {**item.get('filterSettings', {}), **settings}
+
+    def invalidate_filter_cache(self, source_name=None):
+        """Drop the cached filters of one source, or of every source if no name is given."""
+        with self._cache_lock:
+            if source_name is None:
+                self._filter_cache.clear()
+            else:
+                self._filter_cache.pop(source_name, None)
+
+    def on_source_filter_created(self, data):
+        # A new filter shifts the indexes of the others, so refetch the list on next use.
+        self.invalidate_filter_cache(data.source_name)
+
+    def on_source_filter_removed(self, data):
+        self.invalidate_filter_cache(data.source_name)
+
+    def on_source_filter_name_changed(self, data):
+        with self._cache_lock:
+            index = self._filter_cache.get(data.source_name)
+            if index is not None and data.old_filter_name in index:
+                item = index.pop(data.old_filter_name)
+                item['filterName'] = data.filter_name
+                index[data.filter_name] = item
+
+    def on_source_filter_enable_state_changed(self, data):
+        with self._cache_lock:
+            item = self._filter_cache.get(data.source_name, {}).get(data.filter_name)
+            if item is not None:
+                item['filterEnabled'] = data.filter_enabled
+
+    def on_source_filter_settings_changed(self, data):
+        with self._cache_lock:
+            item = self._filter_cache.get(data.source_name, {}).get(data.filter_name)
+            if item is not None:
+                item['filterSettings'] = data.filter_settings
+
+    def on_source_filter_list_reindexed(self, data):
+        with self._cache_lock:
+            index = self._filter_cache.get(data.source_name)
+            if index is not None:
+                for entry in data.filters:
+                    item = index.get(entry['filterName'])
+                    if item is not None:
+                        item['filterIndex'] = entry['filterIndex']
+
+    # BATCHED REQUESTS
+
+    def send_batch(self, requests, execution_type='SerialRealtime', halt_on_failure=False):
+        """
+        Send several requests as a single obs-websocket RequestBatch and return the per-request results.
+
+        :param requests: List of {'requestType': ..., 'requestData': {...}} dictionaries.
+        :param execution_type: 'SerialRealtime', 'SerialFrame' or 'Parallel'.
+        :param halt_on_failure: Stop processing the batch at the first failed request.
+        :return: List of result dictionaries in the same order as the requests.
+        """
+        payload = {
+            "op": 8,
+            "d": {
+                "requestId": f"batch-{next(self._batch_ids)}",
+                "haltOnFailure": halt_on_failure,
+                "executionType": BATCH_EXECUTION_TYPES[execution_type],
+                "requests": requests,
+            },
+        }
+        # ReqClient has no batch API, so talk to its websocket directly. The lock keeps the
+        # send/recv pair together when requests come from more than one thread.
+        with self._request_lock:
+            client = self.ws
+            socket = client.base_client.ws
+            start = time.perf_counter()
+            try:
+                socket.send(json.dumps(payload))
+                # Skip anything that is not the answer to this batch (a stray reply to another request)
+                while True:
+                    response = json.loads(socket.recv())
+                    if response["op"] == 9 and response["d"].get("requestId") == payload["d"]["requestId"]:
+                        break
+            except CONNECTION_ERRORS as e:
+                self._connection_lost(e, client)
+                raise
+            finally:
+                self._observe("obs.batch", time.perf_counter() - start)
+        self._last_ok = time.monotonic()
+        return response["d"]["results"]
+
+    def apply_visibility(self, scene_name, visible_source, sources=None, serial_realtime=True):
+        """
+        Show visible_source and hide every other source in one batched request.
+
+        Sources whose cached enabled state already matches are skipped, so a repeated call
+        sends nothing. The visible source is enabled before the others are disabled so the
+        scene is never empty on stream.
+
+        :param scene_name: Name of the scene containing the sources.
+        :param visible_source: Name of the source to show, or None to hide them all.
+        :param sources: Names of the sources to manage; defaults to every source in the scene.
+        :param serial_realtime: Run the batch with SerialRealtime execution instead of Parallel.
+        :return: Number of requests sent.
+        """
+        return self.apply_scenes_visibility({scene_name: (visible_source, sources)}, serial_realtime)
+
+    def apply_scenes_visibility(self, updates, serial_realtime=True):
+        """
+        apply_visibility() for several scenes at once, in a single batched request.
+
+        :param updates: {scene_name: (visible_source, sources)}, as apply_visibility() takes them.
+        :param serial_realtime: Run the batch with SerialRealtime execution instead of Parallel.
+        :return: Number of requests sent.
+        """
+        for scene_name, (visible_source, sources) in updates.items():
+            self._desired_visibility[scene_name] = (visible_source, list(sources) if sources is not None else None, serial_realtime)
+        if not self.connected:
+            # Buffered: the monitor thread applies the latest request for each scene on reconnect.
+            return 0
+
+        changes = []
+        for scene_name, (visible_source, sources) in updates.items():
+            try:
+                index = self._get_scene_index(scene_name)
+            except Exception as e:
+                print(f"Failed to fetch sources for scene '{scene_name}': {e}")
+                continue
+            for source_name in (sources if sources is not None else list(index)):
+                item = index.get(source_name)
+                if item is None:
+                    print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+                    continue
+                enable = source_name == visible_source
+                if item['sceneItemEnabled'] != enable:
+                    changes.append((scene_name, item, enable))
+        if not changes:
+            return 0
+        changes.sort(key=lambda change: not change[2])
+
+        requests = [
+            {
+                "requestType": "SetSceneItemEnabled",
+                "requestData": {"sceneName": scene_name, "sceneItemId": item['sceneItemId'], "sceneItemEnabled": enable},
+            }
+            for scene_name, item, enable in changes
+        ]
         try:
-            self.ws = obs.ReqClient(host=host, port=port, password=password)
+            results = self.send_batch(requests, 'SerialRealtime' if serial_realtime else 'Parallel')
         except Exception as e:
-            print(f"Failed to connect to OBS: {e}")
+            print(f"Failed to update source visibility in {', '.join(repr(name) for name in updates)}: {e}")
+            return 0
+
+        with self._cache_lock:
+            for (scene_name, item, enable), result in zip(changes, results):
+                status = result["requestStatus"]
+                if status["result"]:
+                    item['sceneItemEnabled'] = enable
+                else:
+                    print(f"Failed to set visibility of '{item['sourceName']}': {status.get('comment', status['code'])}")
+        return len(requests)
 
     @staticmethod
     def _print_object_attributes(obj):
@@ -28,38 +540,57 @@ class OBSController:
 
     def get_source_id_by_name(self, scene_name, source_name):
         """Fetches the ID of a source in a scene by its name."""
-        scene_details = self.ws.get_scene_item_list(scene_name)
-        for item in scene_details.scene_items:
-            if item['sourceName'] == source_name:
-                return item['sceneItemId']
+        item = self._get_scene_item(scene_name, source_name)
+        if item is not None:
+            return item['sceneItemId']
         return None
 
+    def warm_up(self, scene_name, source_name):
+        """
+        Look a scene item up on a background thread so a later call finds it cached. Returns at once;
+        does nothing when the scene is already cached, a lookup is already running or OBS is down.
+        """
+        with self._cache_lock:
+            if (source_name in self._scene_cache.get(scene_name, ())
+                    or scene_name in self._warming or not self.connected):
+                return
+            self._warming.add(scene_name)
+        threading.Thread(target=self._warm_up, args=(scene_name, source_name), name="obs-warm-up", daemon=True).start()
+
+    def _warm_up(self, scene_name, source_name):
+        try:
+            self._get_scene_item(scene_name, source_name)
+        except Exception:
+            pass  # The swap that needs the item reports OBS errors
+        finally:
+            with self._cache_lock:
+                self._warming.discard(scene_name)
+
     def set_source_enabled_by_name(self, scene_name, source_name, enable):
         """Enable or disable a source using its name."""
-        source_id = self.get_source_id_by_name(scene_name, source_name)
-        if source_id:
-            self.ws.set_scene_item_enabled(scene_name, source_id, enable)
+        item = self._get_scene_item(scene_name, source_name)
+        if item is not None:
+            self.ws.set_scene_item_enabled(scene_name, item['sceneItemId'], enable)
+            with self._cache_lock:
+                item['sceneItemEnabled'] = enable
         else:
             print(f"Source '{source_name}' not found in scene '{scene_name}'.")
 
     def get_source_enabled_by_name(self, scene_name, source_name):
         """Get the enabled status of a source using its name."""
-        source_id = self.get_source_id_by_name(scene_name, source_name)
-        if source_id:
-            scene_details = self.ws.get_scene_item_list(scene_name)
-            for item in scene_details.scene_items:
-                if item['sceneItemId'] == source_id:
-                    return item['sceneItemEnabled']  # Assuming 'visible' is the attribute for enabled status
-        else:
-            print(f"Source '{source_name}' not found in scene '{scene_name}'.")
+        item = self._get_scene_item(scene_name, source_name)
+        if item is not None:
+            return item['sceneItemEnabled']
+        print(f"Source '{source_name}' not found in scene '{scene_name}'.")
         return None  # Return None if source not found or any other error occurs
 
     def set_transform_by_source_name(self, scene_name, source_name, transform):
         """Modify the transform attributes of a source using its name."""
-        source_id = self.get_source_id_by_name(scene_name, source_name)
-        if source_id:
+        item = self._get_scene_item(scene_name, source_name)
+        if item is not None:
             try:
-                self.ws.set_scene_item_transform(scene_name, source_id, transform)
+                self.ws.set_scene_item_transform(scene_name, item['sceneItemId'], transform)
+                self._update_cached_transform(scene_name, source_name, transform)
             except Exception as e:
                 print(f"Failed to modify the source transform: {e}")
         else:
@@ -67,23 +598,27 @@ class OBSController:
 
     def get_transform_by_source_name(self, scene_name, source_name):
         """Fetch the transform attributes of a source using its name."""
-        source_id = self.get_source_id_by_name(scene_name, source_name)
-        if source_id:
-            try:
-                transform_dataclass = self.ws.get_scene_item_transform(scene_name, source_id)
-                if hasattr(transform_dataclass, 'scene_item_transform'):
-                    return transform_dataclass.scene_item_transform
-                else:
-                    print(f"scene_item_transform not found in the returned dataclass for source '{source_name}'.")
-                    return None
-            except Exception as e:
-                print(f"Failed to fetch the source transform: {e}")
-                return None
-        else:
+        item = self._get_scene_item(scene_name, source_name)
+        if item is None:
             print(f"Source '{source_name}' not found in scene '{scene_name}'.")
             return None
+        if 'sceneItemTransform' in item:
+            # Return a copy so callers can build a new transform without touching the cache.
+            return dict(item['sceneItemTransform'])
+        try:
+            transform_dataclass = self.ws.get_scene_item_transform(scene_name, item['sceneItemId'])
+            if hasattr(transform_dataclass, 'scene_item_transform'):
+                with self._cache_lock:
+                    item['sceneItemTransform'] = transform_dataclass.scene_item_transform
+                return dict(transform_dataclass.scene_item_transform)
+            else:
+                print(f"scene_item_transform not found in the returned dataclass for source '{source_name}'.")
+                return None
+        except Exception as e:
+            print(f"Failed to fetch the source transform: {e}")
+            return None
 
-    def slide_source(self, scene_name, source_name, end_position, duration):
+    def slide_source(self, scene_name, source_name, end_position, duration, fps=60, easing='linear', block=True):
         """
         Slide a source from its current position to the specified end_position over the given duration.
 
@@ -91,43 +626,21 @@ class OBSController:
         :param source_name: Name of the source to be moved.
         :param end_position: Tuple (x, y) specifying the end position for the slide.
         :param duration: Duration of the slide animation in seconds.
+        :param fps: Target frames per second; late frames are dropped so the slide still ends on time.
+        :param easing: Name of an easing curve from animation.EASINGS, or a callable.
+        :param block: Wait for the slide to finish; otherwise return immediately.
+        :return: The Animation handle, or None if the source could not be found.
         """
-        # Get the current position of the source.
         current_transform = self.get_transform_by_source_name(scene_name, source_name)
         if not current_transform:
             print(f"Failed to get the transform for source '{source_name}'.")
-            return
-
-        start_position = (current_transform["positionX"], current_transform["positionY"])
-
-        # Ensure required fields have valid values
-        current_transform["boundsWidth"] = max(1.0, current_transform.get("boundsWidth", 1.0))
-        current_transform["boundsHeight"] = max(1.0, current_transform.get("boundsHeight", 1.0))
-
-        # Calculate the step size for both x and y directions based on the duration.
-        fps = 60  # Target frames per second
-        steps = int(fps * duration)  # Total number of steps in the animation
-        step_duration = duration / steps
-        x_step = (end_position[0] - start_position[0]) / steps
-        y_step = (end_position[1] - start_position[1]) / steps
-
-        # Periodically update the source's position while retaining all other transform attributes.
-        for step in range(steps):
-            new_transform = {
-                **current_transform,  # First retain all other transform attributes
-                "positionX": start_position[0] + x_step * (step + 1),
-                "positionY": start_position[1] + y_step * (step + 1)
-            }
-            self.set_transform_by_source_name(scene_name, source_name, new_transform)
-
-            # Ensure smooth animation by using time.sleep between updates.
-            time.sleep(step_duration)
-
-        # Ensure the source is exactly at the end_position at the end of the animation.
-        current_transform["positionX"] = end_position[0]
-        current_transform["positionY"] = end_position[1]
-        self.set_transform_by_source_name(scene_name, source_name, current_transform)
+            return None
 
+        tweens = [
+            Tween(scene_name, source_name, 'positionX', end_position[0], duration, easing, start=current_transform["positionX"]),
+            Tween(scene_name, source_name, 'positionY', end_position[1], duration, easing, start=current_transform["positionY"]),
+        ]
+        return Animator(self, fps=fps).animate(tweens, block=block)
 
     def set_source_opacity(self, scene_name, source_name, opacity):
         """Set the opacity of a source."""
@@ -196,6 +709,82 @@ class OBSController:
 
     # FILTER MODIFICATION HERE
 
+    def apply_filter_changes(self, changes, serial_realtime=True):
+        """
+        Enable/disable filters and change their settings on any number of sources in one batched request.
+
+        Changes that match the cached filter state are skipped, so repeating a call sends nothing.
+        Filter lists of sources that are not cached yet are fetched together in one batch first.
+        Settings only count as unchanged when every given value is already cached; OBS leaves
+        default values out of filter lists, so setting a default may send a request that changes nothing.
+
+        :param changes: Iterable of (source_name, filter_name, enabled, settings) tuples; enabled=None
+                        leaves the enabled state alone and settings=None (or {}) leaves the settings alone.
+                        Settings are merged into the filter's current settings.
+        :param serial_realtime: Run the batch with SerialRealtime execution instead of Parallel.
+        :return: Number of requests sent.
+        """
+        changes = list(changes)
+        try:
+            self._prefetch_filters(source_name for source_name, _, _, _ in changes)
+        except Exception as e:
+            print(f"Failed to fetch filters: {e}")
+            return 0
+
+        requests = []
+        pending = []
+        for source_name, filter_name, enabled, settings in changes:
+            try:
+                item = self._get_filter(source_name, filter_name)
+            except Exception as e:
+                print(f"Failed to get filters for source '{source_name}': {e}")
+                continue
+            if item is None:
+                print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+                continue
+            if settings:
+                current = item.get('filterSettings', {})
+                if any(current.get(key) != value for key, value in settings.items()):
+                    requests.append({
+                        "requestType": "SetSourceFilterSettings",
+                        "requestData": {"sourceName": source_name, "filterName": filter_name, "filterSettings": settings, "overlay": True},
+                    })
+                    pending.append((item, 'filterSettings', settings))
+            # Settings go first so a filter that is switched on shows its new settings straight away
+            if enabled is not None and item['filterEnabled'] != enabled:
+                requests.append({
+                    "requestType": "SetSourceFilterEnabled",
+                    "requestData": {"sourceName": source_name, "filterName": filter_name, "filterEnabled": enabled},
+                })
+                pending.append((item, 'filterEnabled', enabled))
+        if not requests:
+            return 0
+
+        try:
+            results = self.send_batch(requests, 'SerialRealtime' if serial_realtime else 'Parallel')
+        except Exception as e:
+            print(f"Failed to update filters: {e}")
+            return 0
+
+        with self._cache_lock:
+            for (item, key, value), result in zip(pending, results):
+                status = result["requestStatus"]
+                if not status["result"]:
+                    print(f"Failed to update filter '{item['filterName']}': {status.get('comment', status['code'])}")
+                elif key == 'filterSettings':
+                    item['filterSettings'] = {**item.get('filterSettings', {}), **value}
+                else:
+                    item['filterEnabled'] = value
+        return len(requests)
+
+    def set_filters_enabled(self, source_names, filter_name, enable):
+        """Enable or disable the same filter on several sources in one request. Returns the number of changes sent."""
+        return self.apply_filter_changes((source_name, filter_name, enable, None) for source_name in source_names)
+
+    def set_filters_settings(self, source_names, filter_name, filter_settings):
+        """Change the settings of the same filter on several sources in one request. Returns the number of changes sent."""
+        return self.apply_filter_changes((source_name, filter_name, None, filter_settings) for source_name in source_names)
+
     def set_filter_enabled(self, source_name, filter_name, enable):
         """
         Enable or disable a filter on a specific source.
@@ -205,44 +794,65 @@ class OBSController:
         :param enable: Boolean value to enable or disable the filter.
         """
         try:
+            item = self._get_filter(source_name, filter_name)
+            if item is not None and item['filterEnabled'] == enable:
+                return
             self.ws.set_source_filter_enabled(source_name, filter_name, enable)
+            if item is not None:
+                with self._cache_lock:
+                    item['filterEnabled'] = enable
         except Exception as e:
             print(f"Failed to set filter '{filter_name}' enabled state on source '{source_name}': {e}")
 
     def get_source_filters(self, source_name):
         """
-        Get a list of filters applied to a specific source.
+        Get a list of filters applied to a specific source, in filter order.
     
         :param source_name: Name of the source.
         :return: List of filters or None if an error occurred.
         """
         try:
-            filter_list_data = self.ws.get_source_filter_list(source_name)
-            return filter_list_data.filters  # Assumes GetSourceFilterListDataclass has a filters attribute
+            index = self._get_filter_index(source_name)
         except Exception as e:
             print(f"Failed to get filters for source '{source_name}': {e}")
             return None
+        with self._cache_lock:
+            return sorted((dict(item) for item in index.values()), key=lambda item: item.get('filterIndex', 0))
+
+    def get_source_filter_settings(self, source_name, filter_name):
+        """
+        Get the settings of a filter on a specific source.
 
+        :param source_name: Name of the source.
+        :param filter_name: Name of the filter.
+        :return: Dictionary of filter settings or None if an error occurred.
+        """
+        try:
+            item = self._get_filter(source_name, filter_name)
+        except Exception as e:
+            print(f"Failed to get settings for filter '{filter_name}' on source '{source_name}': {e}")
+            return None
+        if item is None:
+            print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+            return None
+        # Return a copy so callers can build new settings without touching the cache.
+        return dict(item.get('filterSettings', {}))
 
     def toggle_filter_on_source(self, source_name, filter_name):
         """Toggle the enabled state of a filter on a specific source."""
         try:
-            current_filters = self.ws.get_source_filters(source_name)
-            for filter_info in current_filters:
-                if filter_info['name'] == filter_name:
-                    new_state = not filter_info['enabled']
-                    self.ws.set_source_filter_enabled(source_name, filter_name, new_state)
-                    return  # Exit once the filter is found and toggled
-            print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+            item = self._get_filter(source_name, filter_name)
         except Exception as e:
             print(f"Failed to toggle filter '{filter_name}' on source '{source_name}': {e}")
+            return
+        if item is None:
+            print(f"Filter '{filter_name}' not found on source '{source_name}'.")
+            return
+        self.set_filter_enabled(source_name, filter_name, not item['filterEnabled'])
 
     def set_source_filter_settings(self, source_name, filter_name, filter_settings):
-        """Modify the settings of a filter on a specific source."""
-        try:
-            self.ws.set_source_filter_settings(source_name, filter_name, filter_settings)
-        except Exception as e:
-            print(f"Failed to set filter settings for filter '{filter_name}' on source '{source_name}': {e}")
+        """Modify the settings of a filter on a specific source (merged into its current settings)."""
+        self.apply_filter_changes([(source_name, filter_name, None, filter_settings)])
 
     def add_filter_to_source(self, source_name, filter_name, filter_type, filter_settings):
         """Add a new filter to a specific source."""
@@ -250,6 +860,7 @@ class OBSController:
             self.ws.create_source_filter(source_name, filter_name, filter_type, filter_settings)
         except Exception as e:
             print(f"Failed to add filter '{filter_name}' to source '{source_name}': {e}")
+        self.invalidate_filter_cache(source_name)
 
     def remove_filter_from_source(self, source_name, filter_name):
         """Remove a filter from a specific source."""
@@ -257,6 +868,7 @@ class OBSController:
             self.ws.remove_source_filter(source_name, filter_name)
         except Exception as e:
             print(f"Failed to remove filter '{filter_name}' from source '{source_name}': {e}")
+        self.invalidate_filter_cache(source_name)
     
     def reorder_source_filter(self, source_name, filter_name, new_index):
         """Reorder a filter on a specific source."""
@@ -264,15 +876,17 @@ class OBSController:
             self.ws.set_source_filter_index(source_name, filter_name, new_index)
         except Exception as e:
             print(f"Failed to reorder filter '{filter_name}' on source '{source_name}': {e}")
+        self.invalidate_filter_cache(source_name)
 
     ### SCREENSHOT FUNCTIONS SIMPLIFIED, CONSIDER ADDING IN WIDTH/HEIGHT, QUALITY + FILE PATH OPTIONS
 
     def get_source_screenshot(self, source_name, img_format, width, height, quality):
-        """Takes a base64 encoded screenshot of a given source"""
+        """Takes a base64 encoded screenshot of a given source and returns the data URI (None on failure)."""
         try:
-            self.ws.get_source_screenshot(source_name, img_format, width, height, quality)
+            return self.ws.get_source_screenshot(source_name, img_format, width, height, quality).image_data
         except Exception as e:
             print(f"Failed to grab screenshot of source '{source_name}': {e}")
+            return None
 
     def save_source_screenshot(self, source_name, img_format, file_path, width, height, quality):
         """Saves a base64 encoded screenshot of a given source"""
@@ -282,6 +896,113 @@ class OBSController:
             print(f"Failed to grab screenshot of source '{source_name}': {e}")
 
 
-
-
-
+# -------------------------------------------------
+# SELF-CHECK
+# -------------------------------------------------
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def check_scene_cache():
+    """Check the scene item cache against a fake OBS: one GetSceneItemList per scene, kept in sync by events."""
+    from fake_obs import FakeOBSServer
+
+    server = FakeOBSServer({"Scene": ["Game A", "Game B", "Game C"]}).start()
+    controller = OBSController(port=server.port, timeout=2)
+    try:
+        for _ in range(3):
+            for source_name in ("Game A", "Game B", "Game C"):
+                assert controller.get_source_id_by_name("Scene", source_name) is not None
+        assert server.requests['GetSceneItemList'] == 1, "lookups were not served from the cache"
+
+        # Shown in the OBS UI: the event updates the cached item without a request
+        server.set_item_enabled("Scene", "Game B", True)
+        assert _wait_for(lambda: controller.get_source_enabled_by_name("Scene", "Game B")), "enable event was not applied"
+        assert server.requests['GetSceneItemList'] == 1
+
+        # Added in the OBS UI: the scene is fetched again on next use
+        server.add_scene_item("Scene", "Game D")
+        assert _wait_for(lambda: controller.cache_stats()['scenes'] == 0), "SceneItemCreated did not invalidate the scene"
+        assert controller.get_source_id_by_name("Scene", "Game D") is not None
+        assert server.requests['GetSceneItemList'] == 2
+
+        # Renamed input: every scene is dropped, and the new name is found
+        server.rename_input("Game A", "Game A (Renamed)")
+        assert _wait_for(lambda: controller.cache_stats()['scenes'] == 0), "InputNameChanged did not invalidate the cache"
+        assert controller.get_source_id_by_name("Scene", "Game A (Renamed)") is not None
+
+        # Warm-up fetches the scene off the caller's thread, then the lookup is a cache hit
+        server.add_scene_item("Scene", "Game E")
+        assert _wait_for(lambda: controller.cache_stats()['scenes'] == 0)
+        controller.warm_up("Scene", "Game E")
+        assert _wait_for(lambda: controller.cache_stats()['scenes'] == 1), "warm_up did not fetch the scene"
+        hits = controller.cache_hits
+        assert controller.get_source_id_by_name("Scene", "Game E") is not None
+        assert controller.cache_hits == hits + 1
+
+        # Visibility: only differences are sent, the second call sends nothing
+        assert controller.apply_visibility("Scene", "Game C") > 0
+        assert controller.apply_visibility("Scene", "Game C") == 0
+        assert server.visible("Scene") == ["Game C"]
+
+        # Transforms sent from here are cached, so reading them back costs no request
+        controller.set_transform_by_source_name("Scene", "Game C", {'positionX': 100.0})
+        assert controller.get_transform_by_source_name("Scene", "Game C")['positionX'] == 100.0
+        assert server.requests['GetSceneItemTransform'] == 0
+    finally:
+        controller.close()
+        server.stop()
+    print(f"Scene item cache: {controller.cache_stats()}, {sum(server.requests.values())} requests to the fake OBS")
+
+
+def check_reconnect():
+    """
+    Check recovery against a fake OBS: closed and restarted, hung until requests time out, and a
+    stray reply waiting on the socket when a batch is sent.
+    """
+    from fake_obs import FakeOBSServer
+
+    server = FakeOBSServer({"Scene": ["Game A", "Game B", "Game C"]}).start()
+    controller = OBSController(port=server.port, timeout=0.5, health_interval=0.2, max_backoff=0.5)
+    try:
+        controller.apply_visibility("Scene", "Game B")
+        assert server.visible("Scene") == ["Game B"]
+
+        # OBS closed: the health ping notices, changes are buffered and replayed once OBS is back
+        server.stop()
+        assert _wait_for(lambda: not controller.connected), "closed connection was not noticed"
+        assert controller.apply_visibility("Scene", "Game C") == 0
+        server.start()
+        assert _wait_for(lambda: controller.connected and server.visible("Scene") == ["Game C"], 5), "state was not replayed"
+        assert controller.reconnects == 1
+
+        # OBS hung: a timed-out request drops the socket, so the late reply cannot be misread later
+        server.hang()
+        try:
+            controller.ws.get_version()
+        except OBSSDKTimeoutError:
+            pass
+        server.unhang()
+        assert _wait_for(lambda: controller.connected and controller.reconnects == 2), "timeout was not treated as a lost connection"
+        assert controller.fetch_sources("Scene") == ["Game A", "Game B", "Game C"]
+
+        # A stray reply on the socket is skipped while waiting for the batch response
+        server.send_stray_reply()
+        time.sleep(0.05)
+        assert controller.apply_visibility("Scene", "Game A") == 2
+        assert server.visible("Scene") == ["Game A"]
+    finally:
+        controller.close()
+        server.stop()
+    print(f"Reconnect: {controller.reconnects} reconnects, {sum(server.requests.values())} requests to the fake OBS")
+
+
+if __name__ == "__main__":
+    check_scene_cache()
+    check_reconnect()
@@ -0,0 +1,311 @@
+import math
+import threading
+import time
+
+# -------------------------------------------------
+# EASING CURVES
+# -------------------------------------------------
+# Each curve maps linear progress t in [0, 1] to eased progress.
+
+def linear(t):
+    return t
+
+def ease_in_quad(t):
+    return t * t
+
+def ease_out_quad(t):
+    return t * (2 - t)
+
+def ease_in_out_quad(t):
+    return 2 * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 2 / 2
+
+def ease_in_out_cubic(t):
+    return 4 * t * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+
+def ease_in_out_sine(t):
+    return -(math.cos(math.pi * t) - 1) / 2
+
+def ease_out_back(t):
+    c1 = 1.70158
+    c3 = c1 + 1
+    return 1 + c3 * (t - 1) ** 3 + c1 * (t - 1) ** 2
+
+EASINGS = {
+    'linear': linear,
+    'ease_in_quad': ease_in_quad,
+    'ease_out_quad': ease_out_quad,
+    'ease_in_out_quad': ease_in_out_quad,
+    'ease_in_out_cubic': ease_in_out_cubic,
+    'ease_in_out_sine': ease_in_out_sine,
+    'ease_out_back': ease_out_back,
+}
+
+# -------------------------------------------------
+# TWEENS
+# -------------------------------------------------
+
+class Tween:
+    """
+    Animate one numeric property of a source from a start value to an end value.
+
+    Without filter_name the property is a scene item transform key (positionX, scaleY, rotation, ...;
+    'scale' drives scaleX and scaleY together). With filter_name it is a setting of that filter,
+    e.g. 'opacity' on a Color Correction filter, since scene items have no opacity of their own.
+
+    :param start: Start value; read from OBS when the animation starts if None.
+    :param delay: Seconds after the animation start before this tween begins.
+    """
+    def __init__(self, scene_name, source_name, prop, end, duration, easing='linear', start=None,
+                 delay=0.0, filter_name=None):
+        self.scene_name = scene_name
+        self.source_name = source_name
+        self.prop = prop
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.delay = delay
+        self.easing = EASINGS[easing] if isinstance(easing, str) else easing
+        self.filter_name = filter_name
+
+    @property
+    def target(self):
+        """Key under which tweens are merged into a single request per tick."""
+        if self.filter_name is not None:
+            return ('filter', self.source_name, self.filter_name)
+        return ('transform', self.scene_name, self.source_name)
+
+    @property
+    def end_time(self):
+        return self.delay + self.duration
+
+    def value_at(self, elapsed):
+        """Return the property value at the given time since the animation started."""
+        if self.duration <= 0:
+            progress = 1.0 if elapsed >= self.delay else 0.0
+        else:
+            progress = min(1.0, max(0.0, (elapsed - self.delay) / self.duration))
+        return self.start + (self.end - self.start) * self.easing(progress)
+
+
+# -------------------------------------------------
+# ANIMATION SCHEDULER
+# -------------------------------------------------
+
+class Animation:
+    """Handle for a running animation: cancellation, completion and timing statistics."""
+    def __init__(self, tweens, duration):
+        self.tweens = tweens
+        self.duration = duration
+        self.frames = 0
+        self.dropped_frames = 0
+        self.started_at = None
+        self.finished_at = None
+        self.cancelled = False
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+
+    def cancel(self):
+        """Stop the animation at its current frame."""
+        self.cancelled = True
+        self._cancel_event.set()
+
+    def wait(self, timeout=None):
+        """Block until the animation finishes or is cancelled."""
+        return self._done_event.wait(timeout)
+
+    @property
+    def done(self):
+        return self._done_event.is_set()
+
+    @property
+    def achieved_fps(self):
+        if self.started_at is None or self.finished_at is None or self.finished_at <= self.started_at:
+            return 0.0
+        return self.frames / (self.finished_at - self.started_at)
+
+    @property
+    def end_time_error(self):
+        """Seconds between the scheduled end of the animation and when its last frame was sent."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - (self.started_at + self.duration)
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+            'achieved_fps': self.achieved_fps,
+            'end_time_error': self.end_time_error,
+            'cancelled': self.cancelled,
+        }
+
+
+class Animator:
+    """
+    Deadline-based animation engine on top of an OBSController.
+
+    Frames are scheduled at fixed offsets from the start time on a monotonic clock, so time spent
+    sending a frame is not added to the animation. When a frame runs late the missed frames are
+    dropped and the next one is computed for the current time, so the animation always ends on time.
+    Every tween of an animation is merged into one batched request per tick.
+    """
+    def __init__(self, controller, fps=60, clock=time.monotonic):
+        self.controller = controller
+        self.fps = fps
+        self.clock = clock
+
+    def animate(self, tweens, block=True):
+        """
+        Run the given tweens together and return the Animation handle.
+
+        :param tweens: List of Tween objects; they may target different sources and properties.
+        :param block: Wait for the animation to finish; otherwise it runs on a background thread.
+        """
+        self._resolve_start_values(tweens)
+        animation = Animation(tweens, max((tween.end_time for tween in tweens), default=0.0))
+        if block:
+            self._run(animation)
+        else:
+            threading.Thread(target=self._run, args=(animation,), daemon=True).start()
+        return animation
+
+    def _resolve_start_values(self, tweens):
+        """Fill in missing start values from the controller's cached transforms and filter settings."""
+        for tween in tweens:
+            if tween.start is not None:
+                continue
+            if tween.filter_name is not None:
+                settings = self.controller.get_source_filter_settings(tween.source_name, tween.filter_name) or {}
+                tween.start = settings.get(tween.prop, tween.end)
+            else:
+                transform = self.controller.get_transform_by_source_name(tween.scene_name, tween.source_name) or {}
+                key = 'scaleX' if tween.prop == 'scale' else tween.prop
+                tween.start = transform.get(key, tween.end)
+
+    def _build_requests(self, tweens, elapsed):
+        """Merge the tween values at the given time into one request per source or filter."""
+        merged = {}
+        for tween in tweens:
+            values = merged.setdefault(tween.target, {})
+            value = tween.value_at(elapsed)
+            if tween.prop == 'scale':
+                values['scaleX'] = value
+                values['scaleY'] = value
+            else:
+                values[tween.prop] = value
+
+        requests = []
+        for target, values in merged.items():
+            if target[0] == 'filter':
+                requests.append({
+                    "requestType": "SetSourceFilterSettings",
+                    "requestData": {"sourceName": target[1], "filterName": target[2], "filterSettings": values, "overlay": True},
+                })
+            else:
+                scene_item_id = self.controller.get_source_id_by_name(target[1], target[2])
+                if scene_item_id is None:
+                    continue
+                requests.append({
+                    "requestType": "SetSceneItemTransform",
+                    "requestData": {"sceneName": target[1], "sceneItemId": scene_item_id, "sceneItemTransform": values},
+                })
+        return merged, requests
+
+    def _send_frame(self, animation, elapsed):
+        merged, requests = self._build_requests(animation.tweens, elapsed)
+        if requests:
+            try:
+                self.controller.send_batch(requests)
+            except Exception as e:
+                print(f"Failed to send animation frame: {e}")
+        animation.frames += 1
+        return merged
+
+    def _run(self, animation):
+        frame_interval = 1.0 / self.fps
+        animation.started_at = start = self.clock()
+        frame = 0
+        merged = {}
+        try:
+            while not animation._cancel_event.is_set():
+                elapsed = self.clock() - start
+                if elapsed >= animation.duration:
+                    break
+                merged = self._send_frame(animation, elapsed)
+
+                # Next deadline on the fixed frame grid; skip any frames we are already late for.
+                frame += 1
+                late_frame = int((self.clock() - start) / frame_interval) + 1
+                if late_frame > frame:
+                    animation.dropped_frames += late_frame - frame
+                    frame = late_frame
+                deadline = start + frame * frame_interval
+                animation._cancel_event.wait(max(0.0, deadline - self.clock()))
+
+            if not animation.cancelled:
+                # Always land exactly on the end values.
+                merged = self._send_frame(animation, animation.duration)
+        finally:
+            animation.finished_at = self.clock()
+            self._store_final_transforms(merged)
+            animation._done_event.set()
+
+    def _store_final_transforms(self, merged):
+        """Write the last sent transform and filter values back into the controller's scene and filter caches."""
+        for target, values in merged.items():
+            if target[0] == 'transform':
+                self.controller._update_cached_transform(target[1], target[2], values)
+            else:
+                self.controller._update_cached_filter_settings(target[1], target[2], values)
+
+
+# -------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------
+
+class _MockController:
+    """Stand-in for OBSController that simulates a round trip per batch."""
+    def __init__(self, latency):
+        self.latency = latency
+        self.batches = 0
+
+    def get_source_id_by_name(self, scene_name, source_name):
+        return 1
+
+    def get_transform_by_source_name(self, scene_name, source_name):
+        return {'positionX': 0.0, 'positionY': 0.0, 'scaleX': 1.0, 'scaleY': 1.0}
+
+    def get_source_filter_settings(self, source_name, filter_name):
+        return {'opacity': 1.0}
+
+    def send_batch(self, requests, execution_type='SerialRealtime', halt_on_failure=False):
+        self.batches += 1
+        time.sleep(self.latency)
+        return [{"requestStatus": {"result": True, "code": 100}} for _ in requests]
+
+    def _update_cached_transform(self, scene_name, source_name, transform):
+        pass
+
+    def _update_cached_filter_settings(self, source_name, filter_name, settings):
+        pass
+
+
+def benchmark(duration=1.0, fps=60, latencies=(0.0, 0.004, 0.012, 0.025)):
+    """Measure achieved fps and end-time error of a combined slide/scale/fade at several round-trip latencies."""
+    for latency in latencies:
+        controller = _MockController(latency)
+        tweens = [
+            Tween("Scene", "Game", 'positionX', 1920, duration, 'ease_in_out_cubic'),
+            Tween("Scene", "Game", 'positionY', 1080, duration, 'ease_in_out_cubic'),
+            Tween("Scene", "Game", 'scale', 0.5, duration, 'ease_out_quad'),
+            Tween("Scene", "Game", 'opacity', 0.0, duration, filter_name="Fade"),
+        ]
+        animation = Animator(controller, fps=fps).animate(tweens)
+        stats = animation.stats()
+        print(f"latency {latency * 1000:5.1f} ms: {stats['achieved_fps']:6.1f} fps, "
+              f"{stats['frames']} frames ({stats['dropped_frames']} dropped), "
+              f"{controller.batches} batches, end error {stats['end_time_error'] * 1000:+.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
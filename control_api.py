@@ -0,0 +1,445 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+from scheduler import START, PAUSE, COMPLETE, UNDO, REDO, SKIP, REFOCUS
+
+# Commands accepted as POST /command/<name> or as a WebSocket message {"command": "<name>"},
+# posted to the scheduler exactly like the matching hotkey
+COMMANDS = {
+    'start': START,
+    'pause': PAUSE,
+    'complete': COMPLETE,
+    'undo': UNDO,
+    'redo': REDO,
+    'skip': SKIP,
+    'refocus': REFOCUS,
+}
+
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OP_CONTINUATION, _OP_TEXT, _OP_CLOSE, _OP_PING, _OP_PONG = 0x0, 0x1, 0x8, 0x9, 0xA
+# Largest message accepted from a WebSocket client, all of its fragments together
+_MAX_MESSAGE = 1 << 16
+_LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+_REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def websocket_frame(payload, opcode=_OP_TEXT):
+    """Encode one final, unmasked (server to client) WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class WebSocketClose(ValueError):
+    """A WebSocket peer broke the protocol; the connection should be closed with `code`."""
+    def __init__(self, code, reason):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+async def read_websocket_frame(reader, max_size=1 << 16, masked=False):
+    """
+    Read one WebSocket frame from an asyncio StreamReader. Returns (fin, opcode, payload), unmasked.
+
+    Raises WebSocketClose with 1009 for a frame larger than max_size and, with masked=True (reading
+    a client's frames, which RFC 6455 requires to be masked), with 1002 for an unmasked frame.
+    """
+    first, second = await reader.readexactly(2)
+    if masked and not second & 0x80:
+        raise WebSocketClose(1002, "client frames must be masked")
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    if length > max_size:
+        raise WebSocketClose(1009, f"frame of {length} bytes is too large")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        # XOR the whole payload as one integer rather than byte by byte
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+        payload = (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+def is_local_origin(origin):
+    """
+    True for requests that may send commands: no Origin header (scripts, stream deck plugins),
+    local files ("null" or file://, eg. an OBS browser source) and pages served from localhost.
+    Any other web page open in a browser could otherwise skip or complete games.
+    """
+    if origin is None or origin == 'null':
+        return True
+    parts = urlsplit(origin)
+    return parts.scheme == 'file' or parts.hostname in _LOCAL_HOSTS
+
+
+class ControlServer:
+    """
+    Local HTTP/WebSocket API for overlays, stream decks and remote operators.
+
+    Runs on its own asyncio event loop thread and binds to localhost. publish() pushes the
+    session's state (current game, remaining and completed games, timer deadline, play time) to
+    every WebSocket client as {"event": "state", "data": {...}}, and GET /state returns the latest
+    one. Commands are posted to the scheduler, so they behave exactly like hotkeys.
+
+    Each state is serialized and framed once, and the same bytes are written to every client. A
+    client that stops reading is disconnected once `max_buffer` bytes are queued for it, so one
+    stalled overlay never holds up the others or grows memory without bound.
+    """
+    def __init__(self, scheduler, port=0, host="127.0.0.1", max_buffer=1 << 20, log=print):
+        """
+        :param scheduler: ShuffleScheduler the commands are posted to.
+        :param port: Port to listen on (0 picks a free one; see self.port after start()).
+        :param max_buffer: Bytes that may be queued for one client before it is disconnected.
+        """
+        self.scheduler = scheduler
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.log = log
+        self.published = 0
+        self.commands = 0
+        self.dropped = 0
+        self._clients = set()
+        self._tasks = set()
+        self._state = b"{}"
+        self._frame = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Bind and start serving on a background thread. Raises OSError if the port is in use."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="control-api", daemon=True)
+        self._thread.start()
+        try:
+            self._server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self._handle, self.host, self.port, backlog=1024), self._loop).result()
+        except BaseException:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+            raise
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    # PUSH
+
+    def publish(self, state):
+        """Push a new state to every client. Safe to call from any thread; serializes on the caller's."""
+        if self._loop is None:
+            return
+        body = json.dumps(state, separators=(",", ":")).encode("utf-8")
+        self._loop.call_soon_threadsafe(self._broadcast, body)
+
+    def _broadcast(self, body):
+        self._state = body
+        self._frame = frame = websocket_frame(b'{"event":"state","data":' + body + b'}')
+        self.published += 1
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self._drop(writer)
+            else:
+                writer.write(frame)
+
+    def _drop(self, writer):
+        self._clients.discard(writer)
+        self.dropped += 1
+        writer.transport.abort()
+
+    # REQUESTS
+
+    async def _handle(self, reader, writer):
+        self._tasks.add(asyncio.current_task())
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            if headers.get('upgrade', '').lower() == 'websocket':
+                await self._websocket(reader, writer, headers)
+            else:
+                self._respond(writer, *self._http(method, path, headers))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        method, target, _ = head[0].split(" ", 2)
+        headers = {}
+        for line in head[1:]:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length > 1 << 16:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, urlsplit(target).path, headers, body
+
+    def _http(self, method, path, headers):
+        """Return (status, body) for a plain HTTP request."""
+        if path in ('/', '/state'):
+            return (200, self._state) if method == 'GET' else (405, {'ok': False, 'error': "Use GET"})
+        if path.startswith('/command/'):
+            if method != 'POST':
+                return 405, {'ok': False, 'error': "Use POST"}
+            if not is_local_origin(headers.get('origin')):
+                return 403, {'ok': False, 'error': "Commands are only accepted from local pages"}
+            reply = self._command(path[len('/command/'):])
+            return (200 if reply['ok'] else 404), reply
+        return 404, {'ok': False, 'error': "Unknown path; use /state, /command/<name> or a WebSocket"}
+
+    @staticmethod
+    def _respond(writer, status, body):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        writer.write((f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                      "Content-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      "Access-Control-Allow-Origin: *\r\n"
+                      "Cache-Control: no-store\r\n"
+                      "Connection: close\r\n\r\n").encode("latin-1") + body)
+
+    def _command(self, name):
+        event = COMMANDS.get(name) if isinstance(name, str) else None
+        if event is None:
+            return {'ok': False, 'error': f"Unknown command {name!r}; expected one of: {', '.join(COMMANDS)}"}
+        self.scheduler.post(event)
+        self.commands += 1
+        return {'ok': True, 'command': name}
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key')
+        if key is None or not is_local_origin(headers.get('origin')):
+            self._respond(writer, 400 if key is None else 403, {'ok': False, 'error': "WebSocket refused"})
+            await writer.drain()
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode("latin-1") + _WEBSOCKET_GUID).digest()).decode("ascii")
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("ascii"))
+        # New clients get the current state straight away instead of waiting for the next change
+        if self._frame is not None:
+            writer.write(self._frame)
+        self._clients.add(writer)
+        try:
+            await self._receive(reader, writer)
+        except WebSocketClose as e:
+            self._clients.discard(writer)
+            writer.write(websocket_frame(struct.pack("!H", e.code) + e.reason.encode("utf-8")[:120], _OP_CLOSE))
+            await writer.drain()
+
+    async def _receive(self, reader, writer):
+        fragments = None  # Payloads of a fragmented text message, until its final frame arrives
+        size = 0
+        while True:
+            fin, opcode, payload = await read_websocket_frame(reader, _MAX_MESSAGE, masked=True)
+            if opcode >= _OP_CLOSE:
+                # Control frames may arrive between the fragments of a message, but are never fragmented themselves
+                if not fin or len(payload) > 125:
+                    raise WebSocketClose(1002, "invalid control frame")
+                if opcode == _OP_CLOSE:
+                    writer.write(websocket_frame(payload[:2], _OP_CLOSE))
+                    return
+                if opcode == _OP_PING:
+                    writer.write(websocket_frame(payload, _OP_PONG))
+                await writer.drain()
+                continue
+            if opcode == _OP_CONTINUATION:
+                if fragments is None:
+                    raise WebSocketClose(1002, "continuation frame without a message to continue")
+            elif fragments is not None:
+                raise WebSocketClose(1002, "new message before the previous one was finished")
+            elif opcode != _OP_TEXT:
+                raise WebSocketClose(1003, "only text messages are accepted")
+            else:
+                fragments, size = [], 0
+            size += len(payload)
+            if size > _MAX_MESSAGE:
+                raise WebSocketClose(1009, f"message of more than {_MAX_MESSAGE} bytes")
+            fragments.append(payload)
+            if not fin:
+                continue
+            message, fragments = b"".join(fragments), None
+            try:
+                message = json.loads(message)
+            except ValueError:
+                message = message.decode("utf-8", "replace").strip()
+            reply = self._command(message.get('command') if isinstance(message, dict) else message)
+            writer.write(websocket_frame(json.dumps({'event': 'reply', **reply}).encode("utf-8")))
+            await writer.drain()
+
+    def stats(self):
+        return {'clients': len(self._clients), 'published': self.published, 'commands': self.commands, 'dropped': self.dropped}
+
+    def close(self):
+        """Say goodbye to every client and stop the loop thread."""
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            for writer in list(self._clients):
+                writer.write(websocket_frame(struct.pack("!H", 1001), _OP_CLOSE))  # going away
+                writer.close()
+            if self._tasks:
+                await asyncio.wait(list(self._tasks), timeout=1.0)
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=2.0)
+        except Exception as e:
+            print(f"Control API did not shut down cleanly: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2.0)
+        self._loop = None
+
+
+# -------------------------------------------------
+# LOAD TEST
+# -------------------------------------------------
+
+def _masked_frame(payload, opcode=_OP_TEXT, fin=True):
+    """A client to server frame (those must be masked)."""
+    mask = os.urandom(4)
+    length = len(payload)
+    key = int.from_bytes((mask * (length // 4 + 1))[:length], "big")
+    masked = (int.from_bytes(payload, "big") ^ key).to_bytes(length, "big")
+    first = (0x80 if fin else 0) | opcode
+    if length < 126:
+        header = struct.pack("!BB", first, 0x80 | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", first, 0x80 | 126, length)
+    else:
+        header = struct.pack("!BBQ", first, 0x80 | 127, length)
+    return header + mask + masked
+
+
+async def _close_code(reader):
+    """Read the server's close frame and return its status code."""
+    _, opcode, payload = await read_websocket_frame(reader)
+    assert opcode == _OP_CLOSE, (opcode, payload)
+    return struct.unpack("!H", payload[:2])[0]
+
+
+async def _connect(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write((f"GET /events HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode("ascii"))
+    response = await reader.readuntil(b"\r\n\r\n")
+    if not response.startswith(b"HTTP/1.1 101"):
+        raise ConnectionError(response.decode("latin-1"))
+    return reader, writer
+
+
+def benchmark(clients=1000, messages=50, interval=0.02):
+    """
+    Fan states out to many WebSocket clients and time how long the slowest one takes to get each;
+    then check a WebSocket command, the HTTP endpoints and the origin check.
+    """
+    import urllib.error
+    import urllib.request
+    from scheduler import ShuffleScheduler
+
+    scheduler = ShuffleScheduler()
+    server = ControlServer(scheduler, log=lambda message: None).start()
+    games = [f"Game {i}" for i in range(30)]
+
+    def state(i):
+        return {'current': games[i % len(games)], 'remaining': games, 'completed': [], 'num_remaining': len(games),
+                'paused': False, 'deadline': time.time() + 20.0, 'play_time': {game: 60.0 for game in games}}
+
+    async def receive(reader, arrivals):
+        for _ in range(messages):
+            await read_websocket_frame(reader, max_size=1 << 20)
+            arrivals.append(time.perf_counter())
+
+    async def run():
+        connections = []
+        start = time.perf_counter()
+        for first in range(0, clients, 100):
+            connections += await asyncio.gather(*(_connect(server.port) for _ in range(min(100, clients - first))))
+        connect_time = time.perf_counter() - start
+        arrivals = [[] for _ in connections]
+        tasks = [asyncio.create_task(receive(reader, times)) for (reader, _), times in zip(connections, arrivals)]
+        sent = []
+        cpu_start = time.process_time()
+        for i in range(messages):
+            sent.append(time.perf_counter())
+            server.publish(state(i))
+            await asyncio.sleep(interval)
+        await asyncio.wait_for(asyncio.gather(*tasks), 30)
+        cpu = time.process_time() - cpu_start
+
+        reader, writer = connections[0]
+        writer.write(_masked_frame(json.dumps({"command": "skip"}).encode("utf-8")))
+        _, _, payload = await read_websocket_frame(reader)
+        assert json.loads(payload) == {'event': 'reply', 'ok': True, 'command': 'skip'}, payload
+        assert scheduler.events.get(timeout=1.0) == SKIP
+
+        # A command split over three frames, with a ping in between, is put back together
+        reader, writer = connections[1]
+        writer.write(_masked_frame(b'{"comm', fin=False) + _masked_frame(b'ping', _OP_PING)
+                     + _masked_frame(b'and": "pau', _OP_CONTINUATION, fin=False) + _masked_frame(b'se"}', _OP_CONTINUATION))
+        assert await read_websocket_frame(reader) == (True, _OP_PONG, b'ping')
+        _, _, payload = await read_websocket_frame(reader)
+        assert json.loads(payload) == {'event': 'reply', 'ok': True, 'command': 'pause'}, payload
+        assert scheduler.events.get(timeout=1.0) == PAUSE
+
+        # Unmasked client frames are a protocol error, and so is a message above the size limit
+        reader, writer = connections[2]
+        writer.write(websocket_frame(b'{"command": "skip"}'))
+        assert await _close_code(reader) == 1002
+        reader, writer = connections[3]
+        writer.write(_masked_frame(b"x" * 40000, fin=False) + _masked_frame(b"x" * 40000, _OP_CONTINUATION))
+        assert await _close_code(reader) == 1009
+        assert scheduler.events.empty()
+        for _, writer in connections:
+            writer.close()
+        return connect_time, sent, arrivals, cpu
+
+    connect_time, sent, arrivals, cpu = asyncio.run(run())
+    fan_out = sorted(max(times[i] for times in arrivals) - sent[i] for i in range(messages))
+    size = len(json.dumps(state(0), separators=(",", ":")))
+
+    url = f"http://127.0.0.1:{server.port}"
+    with urllib.request.urlopen(url + "/state") as response:
+        assert json.loads(response.read())['current'] == games[(messages - 1) % len(games)]
+    with urllib.request.urlopen(urllib.request.Request(url + "/command/pause", method="POST")) as response:
+        assert json.loads(response.read())['ok'] and scheduler.events.get(timeout=1.0) == PAUSE
+    try:
+        urllib.request.urlopen(urllib.request.Request(url + "/command/skip", method="POST", headers={"Origin": "https://example.com"}))
+        raise AssertionError("command from a remote page was accepted")
+    except urllib.error.HTTPError as e:
+        assert e.code == 403
+    server.close()
+
+    print(f"{clients} WebSocket clients connected in {connect_time * 1000:.0f} ms")
+    print(f"{messages} states of {size} bytes pushed to every client ({clients * messages} deliveries, {cpu:.2f} s CPU for server and clients)")
+    print(f"  publish -> last client received: p50 {fan_out[len(fan_out) // 2] * 1000:.1f} ms, max {fan_out[-1] * 1000:.1f} ms")
+    print("WebSocket commands (whole and fragmented), protocol errors, GET /state, POST /command and the origin check all behaved as expected")
+
+
+if __name__ == "__main__":
+    benchmark()
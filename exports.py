@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from play_time import format_duration
+
+
+# -------------------------------------------------
+# RENDERERS
+# -------------------------------------------------
+# Each renderer turns the export state dictionary built by the shuffler into file contents.
+
+def render_game_list(state):
+    return ", ".join(state['remaining'])
+
+def render_num_remaining(state):
+    return "Games left: " + str(state['num_remaining'])
+
+def render_game_lines(state):
+    return "\n".join(state['remaining'])
+
+def render_play_time(state):
+    return "\n".join(f"{game}: {format_duration(seconds)}" for game, seconds in state['play_time'].items())
+
+def render_json(state):
+    return json.dumps(state, indent=2, sort_keys=True)
+
+def template_renderer(template):
+    """Renderer for a str.format template, e.g. '{num_remaining} left, now playing {current}'."""
+    def render(state):
+        return template.format(**state).replace("\\n", "\n")
+    return render
+
+
+def write_atomic(path, content, retries=5, sync=False):
+    """
+    Write content (str, or bytes for binary files) to a temp file next to path and rename it over path,
+    so readers never see a partial file. With sync=True the data is fsynced before the rename, so the
+    new file also survives a power loss.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        binary = not isinstance(content, str)
+        with os.fdopen(fd, "wb" if binary else "w", encoding=None if binary else "utf-8") as temp_file:
+            temp_file.write(content)
+            if sync:
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        for attempt in range(retries):
+            try:
+                os.replace(temp_path, path)
+                return
+            except PermissionError:
+                # On Windows the rename fails while OBS has the file open for reading; retry briefly.
+                if attempt == retries - 1:
+                    raise
+                time.sleep(0.02)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ExportWriter:
+    """
+    Writes the text exports on a background thread.
+
+    submit() only records the newest state. The writer waits until no new state has arrived for
+    `debounce` seconds, so a burst of completion/undo presses results in a single write, renders
+    every export and rewrites only the files whose content actually changed, atomically.
+    """
+    def __init__(self, exports, debounce=0.25):
+        """
+        :param exports: List of (file path, renderer) pairs.
+        :param debounce: Quiet period in seconds before a submitted state is written.
+        """
+        self.exports = list(exports)
+        self.debounce = debounce
+        self.writes = 0
+        self.skipped = 0
+        self._written = {}
+        self._state = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+        if self.exports:
+            self._thread = threading.Thread(target=self._run, name="export-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, state):
+        """Queue a new state for writing; returns immediately."""
+        if not self.exports:
+            return
+        with self._condition:
+            self._state = (state, time.monotonic())
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._state is None and not self._closed:
+                    self._condition.wait()
+                if self._state is None:
+                    return
+                # Coalesce: keep waiting while newer states keep arriving within the debounce window.
+                while not self._closed:
+                    quiet_for = time.monotonic() - self._state[1]
+                    if quiet_for >= self.debounce:
+                        break
+                    self._condition.wait(self.debounce - quiet_for)
+                state, _ = self._state
+                self._state = None
+            self._write(state)
+
+    def _write(self, state):
+        for path, render in self.exports:
+            try:
+                content = render(state)
+                if self._written.get(path) == content:
+                    self.skipped += 1
+                    continue
+                write_atomic(path, content)
+                self._written[path] = content
+                self.writes += 1
+            except Exception as e:
+                print(f"Failed to write export '{path}': {e}")
+
+    def flush(self, state=None):
+        """Write the given (or the pending) state immediately on the calling thread."""
+        with self._condition:
+            if state is None and self._state is not None:
+                state = self._state[0]
+            self._state = None
+        if state is not None:
+            self._write(state)
+
+    def close(self):
+        """Write anything still pending and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
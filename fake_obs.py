@@ -0,0 +1,241 @@
+import json
+import threading
+from collections import Counter
+
+# obs-websocket v5 event subscription bit of every event the fake server sends
+EVENT_SUBSCRIPTIONS = {
+    'SceneNameChanged': 1 << 2,
+    'InputNameChanged': 1 << 3,
+    'InputRemoved': 1 << 3,
+    'SourceFilterCreated': 1 << 5,
+    'SourceFilterRemoved': 1 << 5,
+    'SourceFilterEnableStateChanged': 1 << 5,
+    'SourceFilterSettingsChanged': 1 << 5,
+    'SceneItemCreated': 1 << 7,
+    'SceneItemRemoved': 1 << 7,
+    'SceneItemEnableStateChanged': 1 << 7,
+    'SceneItemTransformChanged': 1 << 19,
+}
+
+
+class FakeOBSServer:
+    """
+    In-process obs-websocket v5 server for the OBS clients' self-checks.
+
+    It keeps scenes, scene items and filters, answers the requests the shuffler sends (single and
+    batched), and sends events to the clients subscribed to them, like OBS does when something is
+    changed in its UI. stop() and start() act like OBS being closed and started again on the same
+    port; hang() makes it read requests without answering them until unhang(), which sends the
+    late replies.
+    """
+    def __init__(self, scenes=None, filters=None):
+        """
+        :param scenes: {scene_name: [source_name, ...]}; the first source of each scene is visible.
+        :param filters: {source_name: {filter_name: settings}}; filters start disabled.
+        """
+        self.scenes = {}
+        self._item_ids = 0
+        for scene_name, sources in (scenes or {}).items():
+            self.scenes[scene_name] = {}
+            for position, source_name in enumerate(sources):
+                self._add_item(scene_name, source_name, position == 0)
+        self.filters = {
+            source_name: {name: {'filterName': name, 'filterEnabled': False, 'filterIndex': index,
+                                 'filterKind': 'color_filter_v2', 'filterSettings': dict(settings)}
+                          for index, (name, settings) in enumerate(source_filters.items())}
+            for source_name, source_filters in (filters or {}).items()
+        }
+        self.requests = Counter()  # requestType -> number received, batched requests included
+        self.batches = 0
+        self.port = 0
+        self.server = None
+        self._clients = {}  # websocket -> event subscriptions
+        self._requesters = set()  # websockets that have sent requests
+        self._hung = False
+        self._late = []  # (websocket, reply) held back while hung
+        self._lock = threading.RLock()
+
+    # -------------------------------------------------
+    # SERVER
+    # -------------------------------------------------
+
+    def start(self):
+        """Listen (again, on the same port after a stop) and serve on a background thread."""
+        from websockets.sync.server import serve
+        self.server = serve(self._handle, "localhost", self.port, max_size=None)
+        self.port = self.server.socket.getsockname()[1]
+        threading.Thread(target=self.server.serve_forever, name="fake-obs", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Close every connection and stop listening, like OBS exiting."""
+        self.server.shutdown()
+        with self._lock:
+            clients, self._clients = list(self._clients), {}
+            self._requesters.clear()
+        for websocket in clients:
+            websocket.close()
+
+    def hang(self):
+        with self._lock:
+            self._hung = True
+
+    def unhang(self):
+        """Answer normally again, after sending the replies that were held back (late, on their old sockets)."""
+        with self._lock:
+            self._hung = False
+            late, self._late = self._late, []
+        for websocket, reply in late:
+            self._send(websocket, reply)
+
+    def _send(self, websocket, message):
+        try:
+            websocket.send(json.dumps(message))
+        except Exception:
+            pass  # the client is gone
+
+    def _handle(self, websocket):
+        self._send(websocket, {"op": 0, "d": {"obsWebSocketVersion": "5.0.0", "rpcVersion": 1}})
+        identify = json.loads(websocket.recv())["d"]
+        self._send(websocket, {"op": 2, "d": {"negotiatedRpcVersion": 1}})
+        with self._lock:
+            self._clients[websocket] = identify.get("eventSubscriptions", 0)
+        try:
+            for message in websocket:
+                payload = json.loads(message)
+                op, data = payload["op"], payload["d"]
+                if op in (6, 8):
+                    with self._lock:
+                        self._requesters.add(websocket)
+                if op == 6:
+                    reply = {"op": 7, "d": {"requestType": data["requestType"], "requestId": data["requestId"],
+                                            **self._execute(data["requestType"], data.get("requestData", {}))}}
+                elif op == 8:
+                    self.batches += 1
+                    results = [{"requestType": request["requestType"],
+                                **self._execute(request["requestType"], request.get("requestData", {}))}
+                               for request in data["requests"]]
+                    reply = {"op": 9, "d": {"requestId": data["requestId"], "results": results}}
+                else:
+                    continue
+                with self._lock:
+                    if self._hung:
+                        self._late.append((websocket, reply))
+                        continue
+                self._send(websocket, reply)
+        except Exception:
+            pass  # connection closed
+        finally:
+            with self._lock:
+                self._clients.pop(websocket, None)
+                self._requesters.discard(websocket)
+
+    def send_stray_reply(self):
+        """Send every requesting client a reply to a request it never made, like a late answer to one that timed out."""
+        with self._lock:
+            clients = list(self._requesters)
+        for websocket in clients:
+            self._send(websocket, {"op": 7, "d": {"requestType": "GetVersion", "requestId": "stray",
+                                                  "requestStatus": {"result": True, "code": 100}, "responseData": {}}})
+
+    def emit(self, event_type, event_data):
+        """Send an event to every client subscribed to it."""
+        message = {"op": 5, "d": {"eventType": event_type, "eventIntent": EVENT_SUBSCRIPTIONS[event_type], "eventData": event_data}}
+        with self._lock:
+            clients = [websocket for websocket, subscriptions in self._clients.items()
+                       if subscriptions & EVENT_SUBSCRIPTIONS[event_type]]
+        for websocket in clients:
+            self._send(websocket, message)
+
+    # -------------------------------------------------
+    # OBS STATE
+    # -------------------------------------------------
+
+    def _add_item(self, scene_name, source_name, enabled):
+        self._item_ids += 1
+        item = {
+            'sceneItemId': self._item_ids, 'sourceName': source_name, 'sceneItemEnabled': enabled,
+            'sceneItemIndex': len(self.scenes[scene_name]),
+            'sceneItemTransform': {'positionX': 0.0, 'positionY': 0.0, 'scaleX': 1.0, 'scaleY': 1.0,
+                                   'width': 1920.0, 'height': 1080.0, 'sourceWidth': 1920.0, 'sourceHeight': 1080.0},
+        }
+        self.scenes[scene_name][source_name] = item
+        return item
+
+    def add_scene_item(self, scene_name, source_name):
+        """Add a source to a scene from the 'OBS UI'."""
+        with self._lock:
+            item = self._add_item(scene_name, source_name, True)
+        self.emit('SceneItemCreated', {'sceneName': scene_name, 'sourceName': source_name,
+                                       'sceneItemId': item['sceneItemId'], 'sceneItemIndex': item['sceneItemIndex']})
+
+    def set_item_enabled(self, scene_name, source_name, enabled):
+        """Show or hide a source from the 'OBS UI'."""
+        with self._lock:
+            item = self.scenes[scene_name][source_name]
+            item['sceneItemEnabled'] = enabled
+        self.emit('SceneItemEnableStateChanged', {'sceneName': scene_name, 'sceneItemId': item['sceneItemId'],
+                                                  'sceneItemEnabled': enabled})
+
+    def rename_input(self, old_name, new_name):
+        with self._lock:
+            for index in self.scenes.values():
+                if old_name in index:
+                    index[new_name] = index.pop(old_name)
+                    index[new_name]['sourceName'] = new_name
+        self.emit('InputNameChanged', {'oldInputName': old_name, 'inputName': new_name})
+
+    def visible(self, scene_name):
+        """Names of the visible sources in a scene."""
+        with self._lock:
+            return [name for name, item in self.scenes[scene_name].items() if item['sceneItemEnabled']]
+
+    def _item_by_id(self, scene_name, scene_item_id):
+        for item in self.scenes.get(scene_name, {}).values():
+            if item['sceneItemId'] == scene_item_id:
+                return item
+        return None
+
+    def _execute(self, request_type, data):
+        """Run one request. Returns {'requestStatus': ..., 'responseData': ...}."""
+        self.requests[request_type] += 1
+        events = []
+        with self._lock:
+            response = None
+            if request_type == 'GetVersion':
+                response = {'obsVersion': '30.0.0', 'obsWebSocketVersion': '5.0.0', 'rpcVersion': 1}
+            elif request_type == 'GetSceneItemList' and data.get('sceneName') in self.scenes:
+                response = {'sceneItems': [dict(item, sceneItemTransform=dict(item['sceneItemTransform']))
+                                           for item in self.scenes[data['sceneName']].values()]}
+            elif request_type in ('GetSceneItemTransform', 'SetSceneItemTransform', 'SetSceneItemEnabled'):
+                item = self._item_by_id(data.get('sceneName'), data.get('sceneItemId'))
+                if item is not None:
+                    if request_type == 'GetSceneItemTransform':
+                        response = {'sceneItemTransform': dict(item['sceneItemTransform'])}
+                    elif request_type == 'SetSceneItemTransform':
+                        item['sceneItemTransform'].update(data['sceneItemTransform'])
+                        response = {}
+                        events.append(('SceneItemTransformChanged', {'sceneName': data['sceneName'], 'sceneItemId': item['sceneItemId'],
+                                                                     'sceneItemTransform': dict(item['sceneItemTransform'])}))
+                    else:
+                        item['sceneItemEnabled'] = data['sceneItemEnabled']
+                        response = {}
+                        events.append(('SceneItemEnableStateChanged', {'sceneName': data['sceneName'], 'sceneItemId': item['sceneItemId'],
+                                                                       'sceneItemEnabled': data['sceneItemEnabled']}))
+            elif request_type == 'GetSourceFilterList' and data.get('sourceName') in self.filters:
+                response = {'filters': [dict(item, filterSettings=dict(item['filterSettings']))
+                                        for item in self.filters[data['sourceName']].values()]}
+            elif request_type in ('SetSourceFilterEnabled', 'SetSourceFilterSettings'):
+                item = self.filters.get(data.get('sourceName'), {}).get(data.get('filterName'))
+                if item is not None:
+                    if request_type == 'SetSourceFilterEnabled':
+                        item['filterEnabled'] = data['filterEnabled']
+                    else:
+                        item['filterSettings'].update(data['filterSettings'])
+                    response = {}
+        for event in events:
+            self.emit(*event)
+        if response is None:
+            # 600 is ResourceNotFound; requests the fake does not know are reported the same way
+            return {'requestStatus': {'result': False, 'code': 600, 'comment': f"{request_type}: not found"}}
+        return {'requestStatus': {'result': True, 'code': 100}, 'responseData': response}
@@ -0,0 +1,96 @@
+import bisect
+import time
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; percentiles are reported as the upper bound of their bucket."""
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)  # last bucket is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, milliseconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound in seconds of the bucket containing the p-th percentile, or None if empty."""
+        if not self.count:
+            return None
+        target = p / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                if index == len(self.buckets_ms):
+                    return self.max
+                return self.buckets_ms[index] / 1000
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        if not self.count:
+            return "no samples"
+        return (f"{self.count} swaps, mean {self.mean * 1000:.1f} ms, p50 <= {self.percentile(50) * 1000:.0f} ms, "
+                f"p95 <= {self.percentile(95) * 1000:.0f} ms, max {self.max * 1000:.1f} ms")
+
+
+class FocusController:
+    """
+    Switches the foreground game window through a WindowBackend.
+
+    switch() focuses the new window first (so there is never a moment with no game in front) and then
+    minimizes the previous one, and records how long the pair took in a latency histogram.
+    With a metrics.Metrics the focus and minimize steps are also reported as separate spans.
+    """
+    def __init__(self, backend, clock=time.perf_counter, metrics=None):
+        self.backend = backend
+        self.clock = clock
+        self.metrics = metrics
+        self.latency = LatencyHistogram()
+        self.failures = 0
+
+    def switch(self, new_hwnd, old_hwnd=None):
+        """Bring new_hwnd to the foreground and minimize old_hwnd. Returns True if focusing succeeded."""
+        start = self.clock()
+        try:
+            self.backend.focus_window(new_hwnd)
+            focused = True
+        except Exception as e:
+            print(f"Failed to bring window to the foreground: {e}")
+            self.failures += 1
+            focused = False
+        focused_at = self.clock()
+        if old_hwnd is not None and old_hwnd != new_hwnd:
+            try:
+                self.backend.minimize_window(old_hwnd)
+            except Exception as e:
+                print(f"Failed to minimize window: {e}")
+        end = self.clock()
+        self.latency.observe(end - start)
+        if self.metrics is not None:
+            self.metrics.observe("focus", focused_at - start)
+            self.metrics.observe("minimize", end - focused_at)
+        return focused
+
+    def prepare(self, hwnd):
+        """Warm up a window that is about to be focused, so the swap does not pay for it. Failures are left to switch()."""
+        try:
+            self.backend.prepare_window(hwnd)
+        except Exception:
+            pass
+
+    def forget(self, hwnd):
+        """Drop cached state for a window that has closed."""
+        self.backend.forget_window(hwnd)
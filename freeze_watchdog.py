@@ -0,0 +1,250 @@
+import threading
+import time
+
+import numpy as np
+
+from scheduler import SKIP, REFOCUS
+
+
+def bmp_pixels(data):
+    """
+    View the pixels of a 24 or 32-bit BMP (what OBS sends for img_format='bmp') as a
+    (height, width, channels) uint8 array in BGR(A) order, without copying. Rows are left in file
+    order (usually bottom-up), which makes no difference for frame statistics.
+    """
+    offset = int.from_bytes(data[10:14], "little")
+    width = int.from_bytes(data[18:22], "little", signed=True)
+    height = abs(int.from_bytes(data[22:26], "little", signed=True))
+    channels = int.from_bytes(data[28:30], "little") // 8
+    if channels not in (3, 4) or width <= 0:
+        raise ValueError(f"Unsupported BMP: {width}x{height}, {channels * 8} bits per pixel")
+    stride = (width * channels + 3) & ~3
+    rows = np.frombuffer(data, np.uint8, count=stride * height, offset=offset).reshape(height, stride)
+    return rows[:, :width * channels].reshape(height, width, channels)
+
+
+def synthetic_bmp(pixels):
+    """Encode a (height, width, 3) uint8 BGR array as a 24-bit BMP, for tests and benchmarks."""
+    height, width = pixels.shape[:2]
+    stride = (width * 3 + 3) & ~3
+    rows = np.zeros((height, stride), np.uint8)
+    rows[:, :width * 3] = pixels[::-1].reshape(height, width * 3)
+    size = 54 + rows.nbytes
+    header = (b"BM" + size.to_bytes(4, "little") + bytes(4) + (54).to_bytes(4, "little")
+              + (40).to_bytes(4, "little") + width.to_bytes(4, "little") + height.to_bytes(4, "little")
+              + (1).to_bytes(2, "little") + (24).to_bytes(2, "little") + bytes(24))
+    return header + rows.tobytes()
+
+
+class FrameAnalyzer:
+    """
+    Brightness of a thumbnail and how much it changed since the previous one.
+
+    Frames are converted to 8-bit grayscale with integer weights into arrays that are allocated
+    once per thumbnail size and reused, so analysing a sample allocates nothing per pixel.
+    """
+    def __init__(self):
+        self._shape = None
+        self._has_previous = False
+
+    def _allocate(self, shape):
+        self._shape = shape
+        self._gray = np.empty(shape, np.uint16)
+        self._previous = np.empty(shape, np.uint16)
+        self._scratch = np.empty(shape, np.uint16)
+        self._diff = np.empty(shape, np.int16)
+        self._has_previous = False
+
+    def reset(self):
+        """Forget the previous frame, eg. when a different source is being watched."""
+        self._has_previous = False
+
+    def analyze(self, pixels):
+        """
+        :param pixels: (height, width, channels) uint8 array in BGR(A) order.
+        :return: (mean brightness 0-255, mean absolute change from the previous frame or None for the first frame).
+        """
+        if pixels.shape[:2] != self._shape:
+            self._allocate(pixels.shape[:2])
+        # The last frame's buffer becomes the previous frame; the old previous one is overwritten
+        self._gray, self._previous = self._previous, self._gray
+        gray, scratch = self._gray, self._scratch
+
+        # Rec. 601 luma with weights summing to 256: (29 B + 150 G + 77 R) >> 8
+        np.multiply(pixels[..., 0], 29, out=gray, dtype=np.uint16)
+        np.multiply(pixels[..., 1], 150, out=scratch, dtype=np.uint16)
+        np.add(gray, scratch, out=gray)
+        np.multiply(pixels[..., 2], 77, out=scratch, dtype=np.uint16)
+        np.add(gray, scratch, out=gray)
+        np.right_shift(gray, 8, out=gray)
+        brightness = float(gray.mean())
+
+        motion = None
+        if self._has_previous:
+            np.subtract(gray, self._previous, out=self._diff, dtype=np.int16)
+            np.abs(self._diff, out=self._diff)
+            motion = float(self._diff.mean())
+        self._has_previous = True
+        return brightness, motion
+
+
+class FreezeWatchdog:
+    """
+    Notices when the game on screen is frozen or black and nudges the shuffler.
+
+    Every `interval` seconds a tiny BMP thumbnail of the active source is grabbed and compared with
+    the previous one. After `samples` stalled samples in a row the watchdog posts REFOCUS to the
+    scheduler (or SKIP with action='skip'); if the game is still stalled after a refocus, it posts
+    SKIP. Nothing is sampled while the shuffler is paused, and the count restarts on every swap.
+    """
+    def __init__(self, grab, scheduler, samples=5, interval=1.0, action='refocus', black_level=16.0,
+                 still_level=0.5, log=print):
+        """
+        :param grab: Callable(source_name) returning BMP bytes of a small thumbnail, or None.
+        :param scheduler: ShuffleScheduler the REFOCUS/SKIP events are posted to.
+        :param samples: Consecutive stalled samples before acting.
+        :param action: 'refocus' (refocus first, skip if that did not help) or 'skip'.
+        :param black_level: Mean brightness (0-255) below which a frame counts as black.
+        :param still_level: Mean change per pixel (0-255) below which two frames count as identical.
+        """
+        if action not in ('refocus', 'skip'):
+            raise ValueError(f"Unknown watchdog action '{action}', expected 'refocus' or 'skip'")
+        self.grab = grab
+        self.scheduler = scheduler
+        self.samples = samples
+        self.interval = interval
+        self.action = action
+        self.black_level = black_level
+        self.still_level = still_level
+        self.log = log
+        self.analyzer = FrameAnalyzer()
+        self.active = None
+        self.triggers = 0
+        self._stalled = 0
+        self._refocused = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_active(self, source_name):
+        """Watch a new source (None to stop watching); called after every swap."""
+        with self._lock:
+            self.active = source_name
+            self.analyzer.reset()
+            self._stalled = 0
+            self._refocused = False
+
+    def sample(self):
+        """Take and judge one sample. Returns 'black' or 'frozen' when it made the watchdog act, otherwise None."""
+        source = self.active
+        if source is None or self.scheduler.paused:
+            return None
+        image = self.grab(source)
+        if image is None:
+            return None
+        with self._lock:
+            if source != self.active:
+                return None  # swapped while grabbing
+            brightness, motion = self.analyzer.analyze(bmp_pixels(image))
+            if brightness < self.black_level:
+                reason = 'black'
+            elif motion is not None and motion < self.still_level:
+                reason = 'frozen'
+            else:
+                self._stalled = 0
+                return None
+            self._stalled += 1
+            if self._stalled < self.samples:
+                return None
+            self._stalled = 0
+            event = SKIP if self.action == 'skip' or self._refocused else REFOCUS
+            self._refocused = event == REFOCUS
+            self.triggers += 1
+        self.log(f"{source} looks {reason}; {'re-focusing it' if event == REFOCUS else 'skipping to the next game'}.")
+        self.scheduler.post(event)
+        return reason
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="freeze-watchdog", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Frozen-game watchdog failed to check a sample: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+# -------------------------------------------------
+# SELF-CHECK AND BENCHMARK
+# -------------------------------------------------
+
+def check_synthetic_sequences(samples=3):
+    """Feed synthetic frame sequences through the watchdog and check when it acts."""
+    from scheduler import ShuffleScheduler
+
+    rng = np.random.default_rng(0)
+    frames = {}
+
+    def grab(source):
+        return synthetic_bmp(frames[source]())
+
+    def run(source, count):
+        scheduler = ShuffleScheduler()
+        watchdog = FreezeWatchdog(grab, scheduler, samples=samples, log=lambda message: None)
+        watchdog.set_active(source)
+        events = []
+        for _ in range(count):
+            watchdog.sample()
+            while not scheduler.events.empty():
+                events.append(scheduler.events.get())
+        return events
+
+    still = rng.integers(0, 256, (36, 64, 3), dtype=np.uint8)
+    frames['moving'] = lambda: rng.integers(0, 256, (36, 64, 3), dtype=np.uint8)
+    frames['frozen'] = lambda: still
+    frames['black'] = lambda: np.zeros((36, 64, 3), np.uint8)
+    frames['noisy still'] = lambda: np.clip(still + rng.integers(0, 2, still.shape), 0, 255).astype(np.uint8)
+
+    assert run('moving', 20) == [], "moving picture triggered the watchdog"
+    # The first frame has nothing to compare with, so a frozen game is caught one sample later than a black one
+    assert run('frozen', samples + 1) == [REFOCUS], "frozen picture was not re-focused"
+    assert run('frozen', 2 * samples + 1) == [REFOCUS, SKIP], "frozen picture was not skipped after re-focusing"
+    assert run('black', samples) == [REFOCUS], "black screen was not re-focused"
+    assert run('noisy still', samples + 1) == [REFOCUS], "still picture with capture noise was not caught"
+
+    # A swap restarts the count
+    scheduler = ShuffleScheduler()
+    watchdog = FreezeWatchdog(grab, scheduler, samples=samples, log=lambda message: None)
+    watchdog.set_active('frozen')
+    for _ in range(samples):
+        watchdog.sample()
+    watchdog.set_active('frozen')
+    watchdog.sample()
+    assert scheduler.events.empty(), "count carried over a swap"
+    print("Synthetic sequences: moving, frozen, black and noisy-still frames all handled as expected")
+
+
+def benchmark(repeats=2000):
+    """CPU time per sample for a few thumbnail sizes."""
+    rng = np.random.default_rng(0)
+    for width, height in ((64, 36), (160, 90), (320, 180)):
+        images = [synthetic_bmp(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)) for _ in range(2)]
+        analyzer = FrameAnalyzer()
+        start = time.process_time()
+        for i in range(repeats):
+            analyzer.analyze(bmp_pixels(images[i % 2]))
+        per_sample = (time.process_time() - start) / repeats
+        print(f"  {width}x{height}: {per_sample * 1e6:7.1f} us CPU per sample")
+
+
+if __name__ == "__main__":
+    check_synthetic_sequences()
+    benchmark()
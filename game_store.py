@@ -0,0 +1,189 @@
+import time
+from collections import deque
+
+
+class GameStore:
+    """
+    Completion state of every game in the shuffle.
+
+    Games are indexed by title, the active games are kept as a set that is updated on every change,
+    and completions go on a bounded undo stack (with a redo stack that is cleared by any new
+    completion), so membership, completion, undo, redo and the remaining count are all O(1). The
+    ordered active and completed lists are built once per change, not on every export.
+    """
+    __slots__ = ('_index', '_active', '_undo', '_redo', '_lists', 'completions', 'undos', 'redos')
+
+    def __init__(self, games, undo_limit=100):
+        self._index = {title: position for position, title in enumerate(dict.fromkeys(games))}
+        self._active = set(self._index)
+        self._undo = deque(maxlen=undo_limit)
+        self._redo = deque(maxlen=undo_limit)
+        self._lists = None  # (active, completed) in configuration order, until the next change
+        self.completions = 0
+        self.undos = 0
+        self.redos = 0
+
+    def __contains__(self, title):
+        return title in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def active(self):
+        """Set of active titles. Treat as read-only."""
+        return self._active
+
+    @property
+    def active_count(self):
+        return len(self._active)
+
+    @property
+    def completed_count(self):
+        return len(self._index) - len(self._active)
+
+    def is_active(self, title):
+        return title in self._active
+
+    def _ordered(self):
+        if self._lists is None:
+            active = []
+            completed = []
+            for title in self._index:
+                (active if title in self._active else completed).append(title)
+            self._lists = (active, completed)
+        return self._lists
+
+    def active_games(self):
+        """Active titles in configuration order. Treat as read-only."""
+        return self._ordered()[0]
+
+    def completed_games(self):
+        """Completed titles in configuration order. Treat as read-only."""
+        return self._ordered()[1]
+
+    def set_games(self, games):
+        """
+        Switch to a new game list, keeping the state of every game that is in both lists. New games
+        start active and removed games are dropped (undo and redo skip them). Returns (added, removed).
+        """
+        index = {title: position for position, title in enumerate(dict.fromkeys(games))}
+        added = [title for title in index if title not in self._index]
+        removed = [title for title in self._index if title not in index]
+        self._index = index
+        self._active.difference_update(removed)
+        self._active.update(added)
+        self._lists = None
+        return added, removed
+
+    def complete(self, title):
+        """Mark an active game as done. Returns False if it is unknown or already completed."""
+        if title not in self._active:
+            return False
+        self._active.discard(title)
+        self._lists = None
+        self._undo.append(title)
+        self._redo.clear()
+        self.completions += 1
+        return True
+
+    def undo(self):
+        """Move the most recently completed game back to the active pool and return it, or None."""
+        while self._undo:
+            title = self._undo.pop()
+            if title in self._index and title not in self._active:
+                self._active.add(title)
+                self._lists = None
+                self._redo.append(title)
+                self.undos += 1
+                return title
+        return None
+
+    def redo(self):
+        """Complete the most recently undone game again and return it, or None."""
+        while self._redo:
+            title = self._redo.pop()
+            if title in self._active:
+                self._active.discard(title)
+                self._lists = None
+                self._undo.append(title)
+                self.redos += 1
+                return title
+        return None
+
+    def state(self):
+        """JSON-serializable copy of the completion state, for the session journal."""
+        return {
+            'completed': self.completed_games(),
+            'undo': list(self._undo),
+            'redo': list(self._redo),
+            'completions': self.completions,
+            'undos': self.undos,
+            'redos': self.redos,
+        }
+
+    def restore(self, state):
+        """Load a state() dict. Titles that are no longer in the game list are ignored; new ones stay active."""
+        self._active = set(self._index) - set(state.get('completed', ()))
+        self._lists = None
+        self._undo = deque((title for title in state.get('undo', ()) if title in self._index), maxlen=self._undo.maxlen)
+        self._redo = deque((title for title in state.get('redo', ()) if title in self._index), maxlen=self._redo.maxlen)
+        self.completions = state.get('completions', 0)
+        self.undos = state.get('undos', 0)
+        self.redos = state.get('redos', 0)
+
+    def stats(self):
+        return {
+            'games': len(self._index),
+            'active': len(self._active),
+            'completed': self.completed_count,
+            'completions': self.completions,
+            'undos': self.undos,
+            'redos': self.redos,
+        }
+
+
+# -------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------
+
+def benchmark(num_games=5000, operations=2000):
+    """Compare the old deque-of-tuples state against GameStore for a marathon-sized game list."""
+    games = [f"Game {i}" for i in range(num_games)]
+    targets = games[::max(1, num_games // operations)][:operations]
+
+    statuses = deque([(game, True) for game in games])
+    completed = deque()
+    start = time.perf_counter()
+    for title in targets:
+        for i, (game, status) in enumerate(statuses):
+            if game == title and status:
+                statuses[i] = (game, False)
+                completed.append(game)
+                break
+        sum(1 for game, status in statuses if status)
+    for _ in targets:
+        last = completed.pop()
+        for i, (game, status) in enumerate(statuses):
+            if game == last:
+                statuses[i] = (game, True)
+                break
+    naive = time.perf_counter() - start
+
+    store = GameStore(games, undo_limit=operations)
+    start = time.perf_counter()
+    for title in targets:
+        store.complete(title)
+        store.active_count
+    for _ in targets:
+        store.undo()
+    indexed = time.perf_counter() - start
+
+    assert store.active_count == num_games
+    print(f"{num_games} games, {len(targets)} completions + undos")
+    print(f"  deque scan: {naive * 1000:8.2f} ms")
+    print(f"  GameStore:  {indexed * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,431 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from settings import split_command_line
+from window_registry import WindowRegistry
+
+
+def dolphin_command(dolphin_path, dolphin_args, game_path):
+    """Command line that boots Dolphin straight into a game; with -b in dolphin_args it closes when the game stops."""
+    return [dolphin_path, *split_command_line(dolphin_args), '-e', game_path]
+
+
+class DolphinInstance:
+    """
+    One Dolphin process and the game it runs. process is the Popen object for a Dolphin started
+    here, and None for one that was already open and was adopted through its window.
+    """
+    def __init__(self, game, process=None, pid=None):
+        self.game = game
+        self.process = process
+        self.pid = process.pid if process is not None else pid
+        self.hwnd = None
+        self.hung_since = None
+
+    def running(self, process_windows):
+        if self.process is not None:
+            return self.process.poll() is None
+        # Without a handle on the process, an adopted Dolphin is running for as long as it has a window
+        return self.pid in process_windows
+
+
+class InstanceManager:
+    """
+    Starts a Dolphin for every game and finds their windows by process id.
+
+    It is a drop-in for WindowRegistry (refresh, windows, hwnd_for, set_games). launch_all() adopts
+    the Dolphins that are already open and starts the rest all at once, so they boot side by side
+    while the shuffler waits for the start key. Each window is then known by the process that owns
+    it, and no titles need to be read. Games without a Dolphin of ours (no file in paths, started
+    by hand later, or given up on) are matched by title as before, and adopted once found.
+
+    A monitor thread polls the processes every `interval` seconds. A Dolphin started here that
+    crashes (exits with an error) or whose window stops responding for `hang_timeout` seconds is
+    started again, up to max_relaunches times per game. One that exits cleanly (the game was
+    stopped or the window closed) is left closed.
+    """
+    def __init__(self, games, backend, paths, command, max_relaunches=3, hang_timeout=30.0, interval=1.0,
+                 wanted=None, on_exit=None, launch_workers=8, log=print):
+        """
+        :param paths: {game: file to boot}; games without one are only found by window title.
+        :param command: Callable(path) returning the command line for a game file, eg. dolphin_command with the first two arguments bound.
+        :param wanted: Callable(game) telling whether a crashed game should be started again (eg. it is not completed).
+        :param on_exit: Callable(game) called on the monitor thread when a game's Dolphin exits or is killed.
+        :param launch_workers: Processes created at the same time (creating one can take a while on Windows).
+        """
+        self.backend = backend
+        self.paths = dict(paths)
+        self.command = command
+        self.max_relaunches = max_relaunches
+        self.hang_timeout = hang_timeout
+        self.interval = interval
+        self.wanted = wanted or (lambda game: True)
+        self.on_exit = on_exit
+        self.launch_workers = launch_workers
+        self.log = log
+        self.games = []
+        self.instances = {}  # game -> DolphinInstance
+        self.relaunches = {}  # game -> number of times its Dolphin was started again
+        self._process_windows = {}  # pid -> [hwnd] from the last window list
+        self._titles = WindowRegistry([], backend)
+        self._launched = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.set_games(games)
+
+    # -------------------------------------------------
+    # WINDOW REGISTRY INTERFACE
+    # -------------------------------------------------
+
+    def set_games(self, games):
+        """
+        Adopt a new game list. Removed games are no longer watched (their Dolphin is left running);
+        added games with a file are started once launch_all() has run.
+        """
+        with self._lock:
+            added = [game for game in games if game not in self.games]
+            self.games = list(games)
+            for game in [game for game in self.instances if game not in self.games]:
+                del self.instances[game]
+            self._update_titles()
+        if self._launched:
+            self._launch([game for game in added if game in self.paths])
+
+    def _update_titles(self):
+        unmanaged = [game for game in self.games if game not in self.instances]
+        if unmanaged != self._titles.games:
+            self._titles.set_games(unmanaged)
+
+    def refresh(self):
+        """Re-read which window belongs to which Dolphin. Returns the number of games whose window changed."""
+        listing = self.backend.list_process_windows()
+        with self._lock:
+            changed = self._map_windows(listing)
+            if self._titles.games:
+                changed += self._titles.refresh()
+                self._adopt(dict(listing))
+        return changed
+
+    def _map_windows(self, listing):
+        process_windows = {}
+        for hwnd, pid in listing:
+            process_windows.setdefault(pid, []).append(hwnd)
+        self._process_windows = process_windows
+        changed = 0
+        for instance in self.instances.values():
+            hwnds = process_windows.get(instance.pid, ())
+            # Keep the same window while it exists, in case a Dolphin has several (eg. a separate render window)
+            hwnd = instance.hwnd if instance.hwnd in hwnds else (hwnds[0] if hwnds else None)
+            if hwnd != instance.hwnd:
+                instance.hwnd = hwnd
+                changed += 1
+        return changed
+
+    def _adopt(self, pids):
+        """Watch the Dolphins found by title from now on by their process id."""
+        adopted = False
+        for hwnd, game in self._titles.windows():
+            pid = pids.get(hwnd)
+            if pid is None or game in self.instances:
+                continue
+            instance = self.instances[game] = DolphinInstance(game, pid=pid)
+            instance.hwnd = hwnd
+            adopted = True
+        if adopted:
+            self._update_titles()
+
+    def windows(self):
+        """Return [(hwnd, game)] for every game with a window."""
+        with self._lock:
+            managed = [(instance.hwnd, game) for game, instance in self.instances.items() if instance.hwnd is not None]
+            return managed + self._titles.windows()
+
+    def hwnd_for(self, game):
+        """Return the window handle for a game, or None if it has no window."""
+        with self._lock:
+            instance = self.instances.get(game)
+            return instance.hwnd if instance is not None else self._titles.hwnd_for(game)
+
+    # -------------------------------------------------
+    # LAUNCHING
+    # -------------------------------------------------
+
+    def launch_all(self):
+        """Adopt the Dolphins that are already open and start one for every other game with a file. Returns the games started."""
+        self.refresh()
+        self._launched = True
+        with self._lock:
+            missing = [game for game in self.games if game not in self.instances and game in self.paths]
+        return self._launch(missing)
+
+    def _launch(self, games):
+        if not games:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.launch_workers, len(games))) as pool:
+            started = [instance for instance in pool.map(self._start, games) if instance is not None]
+        with self._lock:
+            for instance in started:
+                if instance.game in self.games:
+                    self.instances[instance.game] = instance
+            self._update_titles()
+        return [instance.game for instance in started]
+
+    def _start(self, game):
+        try:
+            process = subprocess.Popen(self.command(self.paths[game]), stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, ValueError) as e:
+            self.log(f"Failed to start Dolphin for {game}: {e}")
+            return None
+        return DolphinInstance(game, process)
+
+    # -------------------------------------------------
+    # HEALTH MONITORING
+    # -------------------------------------------------
+
+    def check(self):
+        """Look for Dolphins that exited or stopped responding and start crashed ones again. Returns the games that exited."""
+        listing = self.backend.list_process_windows()
+        now = time.monotonic()
+        exited = []
+        with self._lock:
+            self._map_windows(listing)
+            for game, instance in list(self.instances.items()):
+                if instance.running(self._process_windows):
+                    if not self._hung(instance, now):
+                        continue
+                    self.log(f"Dolphin for {game} has not responded for {self.hang_timeout:g} seconds; closing it.")
+                    instance.process.kill()
+                    instance.process.wait()
+                    crashed = True
+                else:
+                    crashed = instance.process is not None and instance.process.returncode != 0
+                del self.instances[game]
+                exited.append((game, instance, crashed))
+            self._update_titles()
+
+        relaunch = []
+        for game, instance, crashed in exited:
+            if self.on_exit is not None:
+                self.on_exit(game)
+            if not crashed:
+                self.log(f"Dolphin for {game} was closed.")
+            elif not self.wanted(game) or game not in self.paths:
+                self.log(f"Dolphin for {game} crashed (exit code {instance.process.returncode}).")
+            elif self.relaunches.get(game, 0) >= self.max_relaunches:
+                self.log(f"Dolphin for {game} crashed again (exit code {instance.process.returncode}); "
+                         f"not starting it after {self.max_relaunches} relaunches.")
+            else:
+                self.relaunches[game] = self.relaunches.get(game, 0) + 1
+                self.log(f"Dolphin for {game} crashed (exit code {instance.process.returncode}); "
+                         f"starting it again ({self.relaunches[game]}/{self.max_relaunches}).")
+                relaunch.append(game)
+        self._launch(relaunch)
+        return [game for game, instance, crashed in exited]
+
+    def _hung(self, instance, now):
+        # Only Dolphins started here are restarted; one the user opened is left alone
+        if not self.hang_timeout or instance.process is None or instance.hwnd is None or not self.backend.is_hung(instance.hwnd):
+            instance.hung_since = None
+            return False
+        if instance.hung_since is None:
+            instance.hung_since = now
+        return now - instance.hung_since >= self.hang_timeout
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dolphin-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Dolphin monitor failed to check the processes: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': len(self.instances),
+                'started_here': sum(instance.process is not None for instance in self.instances.values()),
+                'relaunches': sum(self.relaunches.values()),
+                'matched_by_title': len(self._titles.games),
+            }
+
+    def close(self):
+        """Stop watching. The Dolphins keep running."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+# -------------------------------------------------
+# SELF-CHECK AND BENCHMARK
+# -------------------------------------------------
+
+def _stub_dolphin(argv):
+    """
+    Stand-in for Dolphin.exe, run as `python instances.py --stub-dolphin ... -e <game file>`. It
+    boots for --boot seconds, then "opens its window" by writing <pid>.window (holding the window
+    title) to --window-dir, and runs until it is killed, or exits cleanly once <pid>.quit appears.
+    """
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--boot', type=float, default=0.0)
+    parser.add_argument('--window-dir', required=True)
+    parser.add_argument('-b', '--batch', action='store_true')
+    parser.add_argument('-e', '--exec', required=True)
+    args, unknown = parser.parse_known_args(argv)
+    time.sleep(args.boot)
+    window = os.path.join(args.window_dir, f"{os.getpid()}.window")
+    with open(window + '.tmp', 'w', encoding='utf-8') as window_file:
+        window_file.write(f"Dolphin stub | {os.path.splitext(os.path.basename(args.exec))[0]}")
+    os.replace(window + '.tmp', window)
+    quit_file = os.path.join(args.window_dir, f"{os.getpid()}.quit")
+    while not os.path.exists(quit_file):
+        time.sleep(0.02)
+
+
+def _stub_desktop(window_dir, alive):
+    """FakeWindowBackend whose windows are those of the stub Dolphins that have booted and are alive(pid)."""
+    from platform_backend import FakeWindowBackend
+
+    class StubDesktop(FakeWindowBackend):
+        def _sync(self):
+            for name in os.listdir(window_dir):
+                if name.endswith('.window'):
+                    pid = int(name.split('.')[0])
+                    if pid not in self.pids.values() and alive(pid):
+                        with open(os.path.join(window_dir, name), encoding='utf-8') as window_file:
+                            self.add_window(pid, window_file.read(), pid=pid)
+            for hwnd, pid in list(self.pids.items()):
+                if not alive(pid):
+                    self.remove_window(hwnd)
+
+        def list_windows(self):
+            self._sync()
+            return super().list_windows()
+
+        def list_process_windows(self):
+            self._sync()
+            return super().list_process_windows()
+
+    return StubDesktop()
+
+
+def check_instances(num_games=12, boot=0.3, timeout=20.0):
+    """
+    Launch stub Dolphins one after another (waiting for each window, as when starting them by hand)
+    and all at once through InstanceManager, then crash, close and hang some of them and check
+    that the manager relaunches exactly the crashed and hung ones.
+    """
+    import tempfile
+
+    games = [f"Game {i:02}" for i in range(num_games)]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {game: os.path.join(directory, f"{game}.iso") for game in games}
+
+        def command(path):
+            return [sys.executable, os.path.abspath(__file__), '--stub-dolphin', '--boot', str(boot),
+                    '--window-dir', directory, '-b', '-e', path]
+
+        by_hand = []
+        manager = None
+
+        def processes():
+            started = [instance.process for instance in list(manager.instances.values())] if manager else []
+            return [process for process in by_hand + started if process is not None]
+
+        def alive(pid):
+            return any(process.pid == pid and process.poll() is None for process in processes())
+
+        def wait_until(condition, what):
+            deadline = time.perf_counter() + timeout
+            while not condition():
+                assert time.perf_counter() < deadline, f"timed out waiting for {what}"
+                time.sleep(0.005)
+
+        try:
+            # One after another, each waiting for its window
+            desktop = _stub_desktop(directory, alive)
+            start = time.perf_counter()
+            for game in games:
+                by_hand.append(subprocess.Popen(command(paths[game])))
+                wait_until(lambda: any(pid == by_hand[-1].pid for hwnd, pid in desktop.list_process_windows()), f"{game} to boot")
+            serial = time.perf_counter() - start
+            for process in by_hand:
+                process.kill()
+                process.wait()
+            by_hand.clear()
+
+            # All at once, with the first game already open (it is adopted, not started twice)
+            by_hand.append(subprocess.Popen(command(paths[games[0]])))
+            desktop = _stub_desktop(directory, alive)
+            wait_until(lambda: desktop.list_windows(), "the Dolphin opened by hand")
+            exits = []
+            manager = InstanceManager(games, desktop, paths, command, max_relaunches=1, hang_timeout=0.05,
+                                      on_exit=exits.append, log=lambda message: None)
+            start = time.perf_counter()
+            started = manager.launch_all()
+            launch = time.perf_counter() - start
+            wait_until(lambda: manager.refresh() is not None and len(manager.windows()) == num_games, "every window")
+            parallel = time.perf_counter() - start
+            assert started == games[1:], "the open Dolphin was started again"
+            assert manager.instances[games[0]].process is None, "the open Dolphin was not adopted"
+            assert manager.stats()['matched_by_title'] == 0
+            for hwnd, game in manager.windows():
+                assert desktop.pids[hwnd] == manager.instances[game].pid, f"{game} mapped to another process's window"
+
+            # A crash is relaunched and its new window found
+            crashed = games[3]
+            old_pid = manager.instances[crashed].pid
+            manager.instances[crashed].process.kill()
+            manager.instances[crashed].process.wait()
+            assert manager.check() == [crashed] and exits == [crashed]
+            assert manager.instances[crashed].pid != old_pid, "crashed Dolphin was not relaunched"
+            wait_until(lambda: manager.refresh() is not None and manager.hwnd_for(crashed) == manager.instances[crashed].pid,
+                       "the relaunched window")
+
+            # A second crash goes over max_relaunches; the game is matched by title again
+            manager.instances[crashed].process.kill()
+            manager.instances[crashed].process.wait()
+            assert manager.check() == [crashed] and crashed not in manager.instances
+            assert manager.stats()['matched_by_title'] == 1
+
+            # A clean exit is not relaunched
+            closed = games[5]
+            pid = manager.instances[closed].pid
+            open(os.path.join(directory, f"{pid}.quit"), 'w').close()
+            wait_until(lambda: manager.instances[closed].process.poll() is not None, "the clean exit")
+            assert manager.check() == [closed] and closed not in manager.instances
+
+            # A window that stops responding gets its Dolphin killed and relaunched
+            hung = games[7]
+            old_pid = manager.instances[hung].pid
+            desktop.hung.add(manager.instances[hung].hwnd)
+            assert manager.check() == []
+            time.sleep(0.06)
+            assert manager.check() == [hung] and manager.instances[hung].pid != old_pid, "hung Dolphin was not relaunched"
+            assert manager.relaunches == {crashed: 1, hung: 1}
+        finally:
+            for process in processes():
+                process.kill()
+                process.wait()
+
+    print(f"{num_games} stub Dolphins booting in {boot:.1f} s each:")
+    print(f"  one after another:  {serial * 1000:7.0f} ms until every window is open")
+    print(f"  all at once:        {parallel * 1000:7.0f} ms ({launch * 1000:.0f} ms to start the processes)")
+    print("  crash, clean exit, relaunch limit and hang handled as expected")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--stub-dolphin']:
+        _stub_dolphin(sys.argv[2:])
+    else:
+        check_instances()
@@ -0,0 +1,379 @@
+import json
+import os
+import threading
+import time
+
+from exports import write_atomic
+from game_store import GameStore
+
+
+class SessionJournal:
+    """
+    Append-only log of a session's progress, so a crash or restart picks up where it left off.
+
+    Every completion, undo, redo and swap is appended as one JSON line and flushed to the OS right
+    away, which is enough to survive the shuffler being killed. The fsyncs that also protect against
+    a power loss are batched on a background thread, at most one every sync_interval seconds.
+    Every snapshot_every records the whole state is written to a snapshot file and the journal is
+    emptied, so resuming reads one small snapshot plus at most snapshot_every records no matter how
+    long the marathon has been running.
+    """
+    def __init__(self, path, game_store, snapshot_every=200, sync_interval=1.0):
+        """
+        :param path: Journal file; the snapshot is written next to it as <path>.snapshot.
+        :param game_store: GameStore to restore on resume and to snapshot.
+        :param snapshot_every: Records between snapshots, which bounds the work done on resume.
+        :param sync_interval: Seconds between batched fsyncs (0 to fsync every record).
+        """
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.game_store = game_store
+        self.snapshot_every = snapshot_every
+        self.sync_interval = sync_interval
+        self.play_time = {}
+        self.current = None
+        self.swaps = 0
+        self.seq = 0
+        self.pending = 0  # records appended since the last snapshot
+        self.syncs = 0
+        self.snapshots = 0
+        self._file = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------------------------------
+    # OPEN / RESUME
+    # -------------------------------------------------
+
+    def open(self, resume=True):
+        """
+        Open the journal for appending. With resume=True the game store, play times and current game
+        are restored from the snapshot and journal first; returns True if there was anything to restore.
+        """
+        restored = False
+        good_offset = 0
+        if resume:
+            restored = self._load_snapshot()
+            restored, good_offset = self._replay(restored)
+        else:
+            self._remove_snapshot()
+
+        # Cut off a record torn by a crash mid-write, so new records don't run into it
+        self._file = open(self.path, "a+b")
+        self._file.truncate(good_offset)
+        self._file.seek(good_offset)
+
+        if self.sync_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._sync_loop, name="journal-sync", daemon=True)
+            self._thread.start()
+        return restored
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except FileNotFoundError:
+            return False
+        except ValueError as e:
+            # Snapshots are replaced atomically, so this only happens if the file was edited by hand
+            print(f"Ignoring unreadable session snapshot '{self.snapshot_path}': {e}")
+            return False
+        self.game_store.restore(snapshot['store'])
+        self.play_time = dict(snapshot.get('play_time', {}))
+        self.current = snapshot.get('current')
+        self.swaps = snapshot.get('swaps', 0)
+        self.seq = snapshot.get('seq', 0)
+        return True
+
+    def _replay(self, restored):
+        """Apply the records after the snapshot. Returns (restored, offset just past the last whole record)."""
+        good_offset = 0
+        try:
+            journal_file = open(self.path, "rb")
+        except FileNotFoundError:
+            return restored, 0
+        with journal_file:
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_offset += len(line)
+                # Records up to the snapshot's seq are left over from a crash between writing the
+                # snapshot and emptying the journal; they are already part of the snapshot.
+                if record['seq'] > self.seq:
+                    self._apply(record)
+                    self.seq = record['seq']
+                    self.pending += 1
+                    restored = True
+        return restored, good_offset
+
+    def _apply(self, record):
+        op = record['op']
+        if op == 'complete':
+            self.game_store.complete(record['game'])
+        elif op == 'undo':
+            self.game_store.undo()
+        elif op == 'redo':
+            self.game_store.redo()
+        elif op == 'swap':
+            previous = record.get('previous')
+            if previous is not None:
+                self.play_time[previous] = self.play_time.get(previous, 0.0) + record.get('played', 0.0)
+            self.current = record.get('game')
+            self.swaps += 1
+
+    # -------------------------------------------------
+    # RECORDING
+    # -------------------------------------------------
+
+    def record_complete(self, game):
+        self._append({'op': 'complete', 'game': game})
+
+    def record_undo(self, game):
+        self._append({'op': 'undo', 'game': game})
+
+    def record_redo(self, game):
+        self._append({'op': 'redo', 'game': game})
+
+    def record_swap(self, game, previous=None, played=0.0):
+        """Record a swap to game (None when the session ends), crediting previous with played seconds."""
+        self._append({'op': 'swap', 'game': game, 'previous': previous, 'played': round(played, 3)})
+
+    def _append(self, record):
+        with self._lock:
+            self.seq += 1
+            record = {'seq': self.seq, 'time': round(time.time(), 3), **record}
+            # The store has already been updated by the caller; only the journal's own fields need applying
+            if record['op'] == 'swap':
+                self._apply(record)
+            self._file.write(json.dumps(record).encode("utf-8") + b"\n")
+            self._file.flush()
+            self._dirty = True
+            self.pending += 1
+            if self.sync_interval <= 0:
+                self._sync()
+            if self.pending >= self.snapshot_every:
+                self._snapshot()
+
+    # -------------------------------------------------
+    # SNAPSHOTS AND SYNCING
+    # -------------------------------------------------
+
+    def snapshot(self):
+        """Write the full state to the snapshot file and empty the journal."""
+        with self._lock:
+            self._snapshot()
+
+    def _snapshot(self):
+        snapshot = {
+            'seq': self.seq,
+            'store': self.game_store.state(),
+            'play_time': self.play_time,
+            'current': self.current,
+            'swaps': self.swaps,
+        }
+        # The snapshot must be durable before the records it replaces are thrown away
+        write_atomic(self.snapshot_path, json.dumps(snapshot), sync=True)
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self.pending = 0
+        self.snapshots += 1
+
+    def _sync(self):
+        if self._dirty:
+            os.fsync(self._file.fileno())
+            self._dirty = False
+            self.syncs += 1
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            with self._lock:
+                if self._file is not None:
+                    self._sync()
+
+    def reset(self):
+        """Start a new session: clear the store, play times and both files."""
+        with self._lock:
+            self.game_store.restore({})
+            self.play_time = {}
+            self.current = None
+            self.swaps = 0
+            self.pending = 0
+            self._remove_snapshot()
+            if self._file is not None:
+                self._file.seek(0)
+                self._file.truncate()
+                self._file.flush()
+
+    def _remove_snapshot(self):
+        if os.path.exists(self.snapshot_path):
+            os.remove(self.snapshot_path)
+
+    def close(self):
+        """fsync anything outstanding and close the journal."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+
+# -------------------------------------------------
+# CRASH SIMULATION AND BENCHMARK
+# -------------------------------------------------
+
+def _run_ops(journal, store, games, operations, rng, history):
+    """Drive a journal with random completions, undos, redos and swaps, remembering the state after each record."""
+    current = None
+    for _ in range(operations):
+        roll = rng.random()
+        if roll < 0.15 and store.active_count > 1:
+            game = rng.choice(store.active_games())
+            store.complete(game)
+            journal.record_complete(game)
+        elif roll < 0.2:
+            game = store.undo()
+            if game is None:
+                continue
+            journal.record_undo(game)
+        elif roll < 0.25:
+            game = store.redo()
+            if game is None:
+                continue
+            journal.record_redo(game)
+        else:
+            game = rng.choice(games)
+            journal.record_swap(game, current, rng.uniform(10, 30))
+            current = game
+        history[journal.seq] = (store.state(), dict(journal.play_time))
+
+
+def simulate_crashes(num_games=40, operations=300, snapshot_every=25, seed=0):
+    """
+    Kill the writer at every byte of the journal (and between a snapshot and the journal truncation)
+    and check that resuming always gives exactly the state after the last whole record.
+    """
+    # Only needed by the self-checks, so the shuffler does not import them at startup
+    import random
+    import shutil
+    import tempfile
+    rng = random.Random(seed)
+    games = [f"Game {i:02}" for i in range(num_games)]
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "session.jsonl")
+        store = GameStore(games)
+        journal = SessionJournal(path, store, snapshot_every=snapshot_every, sync_interval=0)
+        journal.open(resume=False)
+        history = {0: (store.state(), {})}
+        _run_ops(journal, store, games, operations, rng, history)
+        journal.close()
+
+        with open(path, "rb") as journal_file:
+            journal_bytes = journal_file.read()
+        with open(path + ".snapshot", "rb") as snapshot_file:
+            snapshot_bytes = snapshot_file.read()
+        snapshot_seq = json.loads(snapshot_bytes)['seq']
+
+        def resume_from(content, snapshot, append=None):
+            crash_path = os.path.join(directory, "crash.jsonl")
+            with open(crash_path, "wb") as crash_file:
+                crash_file.write(content)
+            with open(crash_path + ".snapshot", "wb") as crash_file:
+                crash_file.write(snapshot)
+            crash_store = GameStore(games)
+            resumed = SessionJournal(crash_path, crash_store, snapshot_every=snapshot_every, sync_interval=0)
+            resumed.open()
+            if append is not None:
+                crash_store.complete(append)
+                resumed.record_complete(append)
+                resumed.close()
+                crash_store = GameStore(games)
+                resumed = SessionJournal(crash_path, crash_store, snapshot_every=snapshot_every, sync_interval=0)
+                resumed.open()
+            state = (crash_store.state(), resumed.play_time)
+            seq = resumed.seq
+            resumed.close()
+            return seq, state
+
+        # Killed mid-record: every prefix of the journal resumes to the last whole record
+        cuts = 0
+        for cut in range(len(journal_bytes) + 1):
+            seq, state = resume_from(journal_bytes[:cut], snapshot_bytes)
+            assert seq == snapshot_seq + journal_bytes[:cut].count(b"\n"), f"lost a whole record cutting at byte {cut}"
+            assert state == history[seq], f"state mismatch after cutting the journal at byte {cut}"
+            cuts += 1
+
+        # Killed after a snapshot was written but before the journal was emptied
+        journal_path = os.path.join(directory, "stale.jsonl")
+        store = GameStore(games)
+        journal = SessionJournal(journal_path, store, snapshot_every=10 ** 9, sync_interval=0)
+        journal.open(resume=False)
+        stale_history = {0: (store.state(), {})}
+        _run_ops(journal, store, games, 50, rng, stale_history)
+        with open(journal_path, "rb") as journal_file:
+            stale = journal_file.read()
+        journal.snapshot()
+        with open(journal_path + ".snapshot", "rb") as snapshot_file:
+            stale_snapshot = snapshot_file.read()
+        journal.close()
+        seq, state = resume_from(stale, stale_snapshot)
+        assert state == stale_history[seq] and seq == max(stale_history), "stale records were applied twice"
+
+        # A record appended after resuming a torn journal starts on a line of its own
+        torn = journal_bytes[:journal_bytes.rindex(b"\n", 0, len(journal_bytes) - 1) + 5]
+        last_whole = snapshot_seq + torn.count(b"\n")
+        fresh = next(game for game in games if game not in history[last_whole][0]['completed'])
+        seq, state = resume_from(torn, snapshot_bytes, append=fresh)
+        assert seq == last_whole + 1 and fresh in state[0]['completed'], "record after a torn tail was lost"
+
+        print(f"Resumed correctly from {cuts} crash points ({len(journal_bytes)} journal bytes)")
+    finally:
+        shutil.rmtree(directory)
+
+
+def benchmark(num_games=40, lengths=(1000, 10000, 100000)):
+    """Resume time with periodic snapshots against replaying the whole journal."""
+    import random
+    import shutil
+    import tempfile
+    rng = random.Random(0)
+    games = [f"Game {i:02}" for i in range(num_games)]
+    directory = tempfile.mkdtemp()
+    try:
+        for operations in lengths:
+            timings = []
+            for snapshot_every in (200, 10 ** 9):
+                path = os.path.join(directory, f"session-{operations}-{snapshot_every}.jsonl")
+                store = GameStore(games)
+                journal = SessionJournal(path, store, snapshot_every=snapshot_every, sync_interval=60)
+                journal.open(resume=False)
+                _run_ops(journal, store, games, operations, rng, {})
+                journal.close()
+
+                start = time.perf_counter()
+                resumed = SessionJournal(path, GameStore(games), sync_interval=60)
+                resumed.open()
+                timings.append(time.perf_counter() - start)
+                resumed.close()
+            print(f"{operations:7} records: resume with snapshots {timings[0] * 1000:7.2f} ms, "
+                  f"full replay {timings[1] * 1000:8.2f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    simulate_crashes()
+    benchmark()
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Metrics:
+    """
+    Timing spans with rolling percentiles.
+
+    Every span keeps its last `window` durations, so percentiles follow recent behaviour rather
+    than the whole run. Observations can also be appended to a JSONL log, and serve() exposes
+    everything in Prometheus text format on a local HTTP port.
+    """
+    def __init__(self, window=500, log_path=None):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._sums = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._log = open(log_path, "a", encoding="utf-8", buffering=1) if log_path else None
+        self._server = None
+
+    @contextmanager
+    def span(self, name, **tags):
+        """Time the body of a with-block as one observation of the named span."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **tags)
+
+    def observe(self, name, seconds, **tags):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+                self._sums[name] = 0.0
+            samples.append(seconds)
+            self._counts[name] += 1
+            self._sums[name] += seconds
+            if self._log is not None:
+                self._log.write(json.dumps({"time": time.time(), "span": name, "seconds": round(seconds, 6), **tags}) + "\n")
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def percentiles(self, name, quantiles=QUANTILES):
+        """Return {quantile: seconds} over the rolling window of a span (empty if never observed)."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles}
+
+    def summary(self):
+        """One line per span with its rolling median and p99, for printing."""
+        lines = []
+        for name, count, _ in self._snapshot():
+            p = self.percentiles(name)
+            lines.append(f"{name}: n={count} p50={p[0.5] * 1000:.1f} ms p99={p[0.99] * 1000:.1f} ms")
+        return "\n".join(lines)
+
+    def _snapshot(self):
+        # Spans are added from other threads (OBS workers, the HTTP handler), so iterate over a copy
+        with self._lock:
+            return [(name, self._counts[name], self._sums[name]) for name in sorted(self._samples)]
+
+    def prometheus_text(self):
+        """Render all spans and gauges in the Prometheus text exposition format."""
+        lines = ["# TYPE shuffler_span_seconds summary"]
+        for name, count, total in self._snapshot():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q, value in self.percentiles(name).items():
+                lines.append(f'shuffler_span_seconds{{span="{label}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'shuffler_span_seconds_count{{span="{label}"}} {count}')
+            lines.append(f'shuffler_span_seconds_sum{{span="{label}"}} {total:.6f}')
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        for name, value in gauges:
+            lines.append(f"# TYPE shuffler_{name} gauge")
+            lines.append(f"shuffler_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics on a background thread. Binds to localhost by default."""
+        # http.server pulls in the email package, so it is only imported when the endpoint is enabled
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
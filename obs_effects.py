@@ -0,0 +1,254 @@
+import time
+
+# Filter kinds and settings of the Move Transition plugin (https://obsproject.com/forum/resources/move.913/),
+# which animates inside OBS: a Move Source filter on a scene moves one of its items, a Move Value filter
+# on a source animates a setting of another filter. Enabling either one starts its animation.
+MOVE_SOURCE_KIND = "move_source_filter"
+MOVE_VALUE_KIND = "move_value_filter"
+OPACITY_KIND = "color_filter_v2"
+
+EASE_NONE, EASE_IN, EASE_OUT, EASE_IN_OUT = 0, 1, 2, 3
+EASING_QUADRATIC, EASING_CUBIC, EASING_SINE, EASING_BACK = 0, 1, 4, 9
+
+# animation.EASINGS names mapped to the plugin's (easing_match, easing_function_match)
+MOVE_EASINGS = {
+    'linear': (EASE_NONE, EASING_QUADRATIC),
+    'ease_in_quad': (EASE_IN, EASING_QUADRATIC),
+    'ease_out_quad': (EASE_OUT, EASING_QUADRATIC),
+    'ease_in_out_quad': (EASE_IN_OUT, EASING_QUADRATIC),
+    'ease_in_out_cubic': (EASE_IN_OUT, EASING_CUBIC),
+    'ease_in_out_sine': (EASE_IN_OUT, EASING_SINE),
+    'ease_out_back': (EASE_OUT, EASING_BACK),
+}
+
+
+def _timing_settings(duration, easing):
+    easing_match, easing_function = MOVE_EASINGS.get(easing, MOVE_EASINGS['linear'])
+    return {"duration": int(round(duration * 1000)), "easing_match": easing_match, "easing_function_match": easing_function}
+
+
+class ServerEffects:
+    """
+    Slides and fades that OBS animates itself.
+
+    OBSController.slide_source() and client-side fades (an animation.Tween on an opacity filter
+    setting) send one request per frame from Python, so they cost a round trip every 16 ms and
+    stutter whenever this process is busy. Here each effect is a Move plugin filter that is
+    created once (with add_filter_to_source) and then started with a single batch: changed
+    settings, if any, plus a disable/enable pair that restarts the filter. OBS renders every
+    frame, so an effect costs one message however long it runs. When the plugin is not
+    installed, effects fall back to the client-side animator.
+    """
+    def __init__(self, controller, prefix="Shuffler"):
+        """
+        :param controller: OBSController; its filter cache is used to find existing presets.
+        :param prefix: Start of the names of the filters created here, so they are easy to spot in OBS.
+        """
+        self.controller = controller
+        self.prefix = prefix
+        self.available = None  # None until a preset has been created (or failed to be)
+        self.batches = 0
+
+    # PRESETS
+
+    def _has_filter(self, source_name, filter_name):
+        filters = self.controller.get_source_filters(source_name) or []
+        return any(item['filterName'] == filter_name for item in filters)
+
+    def _ensure(self, source_name, filter_name, kind, settings):
+        """Create a filter preset if it does not exist yet. Returns True if it exists afterwards."""
+        if self.available is False and kind != OPACITY_KIND:
+            return False
+        if self._has_filter(source_name, filter_name):
+            return True
+        self.controller.add_filter_to_source(source_name, filter_name, kind, settings)
+        if not self._has_filter(source_name, filter_name):
+            if kind in (MOVE_SOURCE_KIND, MOVE_VALUE_KIND):
+                print("OBS has no Move filters (is the Move Transition plugin installed?); "
+                      "animations are sent frame by frame instead.")
+                self.available = False
+            return False
+        # New filters start enabled, which would set off a Move filter straight away
+        if kind != OPACITY_KIND:
+            self.controller.set_filter_enabled(source_name, filter_name, False)
+        self.available = True
+        return True
+
+    def move_filter_name(self, source_name):
+        return f"{self.prefix} Move {source_name}"
+
+    def ensure_fade(self, source_name, direction, duration=0.5, easing='linear'):
+        """
+        Set up the filters that fade a source: a Color Correction filter holding its opacity and a
+        Move Value filter animating that opacity. direction is 'in', 'out' or 'to' (arbitrary target).
+        Returns the Move Value filter's name, or None if it could not be created.
+        """
+        opacity_filter = f"{self.prefix} Opacity"
+        fade_filter = f"{self.prefix} Fade {direction.capitalize()}"
+        if not self._ensure(source_name, opacity_filter, OPACITY_KIND, {"opacity": 1.0}):
+            return None
+        settings = {
+            "filter": opacity_filter,
+            "setting_name": "opacity",
+            "setting_float": {'in': 1.0, 'out': 0.0}.get(direction, 1.0),
+            **_timing_settings(duration, easing),
+        }
+        return fade_filter if self._ensure(source_name, fade_filter, MOVE_VALUE_KIND, settings) else None
+
+    def prepare_fades(self, source_names, duration=0.5, easing='linear'):
+        """Create the fade-in and fade-out presets on every source up front (eg. all game sources at startup)."""
+        for source_name in source_names:
+            if self.ensure_fade(source_name, 'in', duration, easing) is None:
+                break
+            self.ensure_fade(source_name, 'out', duration, easing)
+
+    # TRIGGERING
+
+    def trigger(self, presets):
+        """
+        Start several filter presets in one batched request.
+
+        :param presets: List of (source_name, filter_name, settings); settings that differ from the
+                        cached ones are sent first in the same batch, None leaves them alone.
+        :return: Number of requests sent.
+        """
+        requests = []
+        updates = []
+        for source_name, filter_name, settings in presets:
+            if settings:
+                current = self.controller.get_source_filter_settings(source_name, filter_name) or {}
+                if any(current.get(key) != value for key, value in settings.items()):
+                    requests.append({
+                        "requestType": "SetSourceFilterSettings",
+                        "requestData": {"sourceName": source_name, "filterName": filter_name, "filterSettings": settings, "overlay": True},
+                    })
+                    updates.append((len(requests) - 1, source_name, filter_name, settings))
+            # Disabling first restarts a Move filter that is still running (or did not switch itself off)
+            for enable in (False, True):
+                requests.append({
+                    "requestType": "SetSourceFilterEnabled",
+                    "requestData": {"sourceName": source_name, "filterName": filter_name, "filterEnabled": enable},
+                })
+        if not requests:
+            return 0
+        try:
+            results = self.controller.send_batch(requests)
+        except Exception as e:
+            print(f"Failed to start OBS effects: {e}")
+            return 0
+        self.batches += 1
+        for position, source_name, filter_name, settings in updates:
+            if results[position]["requestStatus"]["result"]:
+                self.controller._update_cached_filter_settings(source_name, filter_name, settings)
+        for request, result in zip(requests, results):
+            status = result["requestStatus"]
+            if not status["result"]:
+                print(f"Failed to start effect '{request['requestData']['filterName']}': {status.get('comment', status['code'])}")
+        return len(requests)
+
+    # EFFECTS
+
+    def slide_source(self, scene_name, source_name, end_position, duration, easing='linear'):
+        """Slide a scene item to end_position (x, y) over duration seconds, animated by OBS."""
+        filter_name = self.move_filter_name(source_name)
+        settings = {
+            "source": source_name,
+            "transform": True,
+            "pos": {"x": end_position[0], "y": end_position[1]},
+            **_timing_settings(duration, easing),
+        }
+        if not self._ensure(scene_name, filter_name, MOVE_SOURCE_KIND, settings):
+            return self.controller.slide_source(scene_name, source_name, end_position, duration, easing=easing, block=False)
+        return self.trigger([(scene_name, filter_name, settings)])
+
+    def fade_source(self, source_name, opacity, duration, easing='linear'):
+        """Fade a source to opacity (0.0 - 1.0) over duration seconds, animated by OBS."""
+        filter_name = self.ensure_fade(source_name, 'to', duration, easing)
+        if filter_name is None:
+            from animation import Animator, Tween
+            tween = Tween(None, source_name, 'opacity', opacity, duration, easing, filter_name=f"{self.prefix} Opacity")
+            return Animator(self.controller).animate([tween], block=False)
+        return self.trigger([(source_name, filter_name, {"setting_float": opacity, **_timing_settings(duration, easing)})])
+
+    def crossfade(self, outgoing, incoming, duration=None):
+        """
+        Fade outgoing out and incoming in with one request, using the presets from prepare_fades().
+        duration (seconds) overrides the preset's duration for both.
+        """
+        timing = {"duration": int(round(duration * 1000))} if duration is not None else None
+        presets = []
+        if outgoing is not None and self.ensure_fade(outgoing, 'out'):
+            presets.append((outgoing, f"{self.prefix} Fade Out", timing))
+        if incoming is not None and self.ensure_fade(incoming, 'in'):
+            presets.append((incoming, f"{self.prefix} Fade In", timing))
+        return self.trigger(presets)
+
+
+# -------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------
+
+class _MockController:
+    """Stand-in for OBSController with every preset already in place; counts messages sent."""
+    def __init__(self):
+        self.batches = 0
+        self.settings = {}
+
+    def get_source_filters(self, source_name):
+        return [{'filterName': name} for (source, name) in self.settings if source == source_name]
+
+    def add_filter_to_source(self, source_name, filter_name, filter_type, filter_settings):
+        self.batches += 1
+        self.settings[(source_name, filter_name)] = dict(filter_settings)
+
+    def set_filter_enabled(self, source_name, filter_name, enable):
+        self.batches += 1
+
+    def get_source_filter_settings(self, source_name, filter_name):
+        return dict(self.settings.get((source_name, filter_name), {}))
+
+    def _update_cached_filter_settings(self, source_name, filter_name, settings):
+        self.settings[(source_name, filter_name)].update(settings)
+
+    def get_transform_by_source_name(self, scene_name, source_name):
+        return {'positionX': 0.0, 'positionY': 0.0}
+
+    def get_source_id_by_name(self, scene_name, source_name):
+        return 1
+
+    def send_batch(self, requests, execution_type='SerialRealtime', halt_on_failure=False):
+        self.batches += 1
+        return [{"requestStatus": {"result": True, "code": 100}} for _ in requests]
+
+    def _update_cached_transform(self, scene_name, source_name, transform):
+        pass
+
+
+def benchmark(duration=1.0, fps=60):
+    """Messages and client CPU for one slide: frames pushed from Python against a server-side Move filter."""
+    from animation import Animator, Tween
+
+    controller = _MockController()
+    start = time.process_time()
+    Animator(controller, fps=fps).animate([
+        Tween("Scene", "Game", 'positionX', 1920, duration, 'ease_in_out_cubic'),
+        Tween("Scene", "Game", 'positionY', 1080, duration, 'ease_in_out_cubic'),
+    ])
+    client_cpu = time.process_time() - start
+    client_batches = controller.batches
+
+    controller = _MockController()
+    effects = ServerEffects(controller)
+    effects.slide_source("Scene", "Game", (0, 0), duration)  # creates the preset
+    controller.batches = 0
+    start = time.process_time()
+    for position in ((1920, 1080), (0, 0), (1920, 1080)):
+        effects.slide_source("Scene", "Game", position, duration, 'ease_in_out_cubic')
+    server_cpu = (time.process_time() - start) / 3
+    print(f"{duration:.1f} s slide at {fps} fps")
+    print(f"  frames pushed from Python: {client_batches:4d} messages, {client_cpu * 1000:6.2f} ms CPU")
+    print(f"  Move filter in OBS:        {controller.batches // 3:4d} message,  {server_cpu * 1000:6.2f} ms CPU")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,178 @@
+import threading
+import time
+
+
+class FanoutTarget:
+    """
+    One OBS connection and the scenes on it that mirror the active game.
+
+    Updates run on the target's own thread. Only the newest update per scene is kept while one is
+    in flight, so a slow or dead instance falls behind by at most one update instead of queueing
+    every swap, and it never holds up the other targets. The queued scenes are sent together, in
+    one batched request. Scene item lookups queued with warm_up() run on the same thread, after
+    any pending update.
+    """
+    def __init__(self, name, controller, scenes=None, metrics=None):
+        """
+        :param name: Label used in logs and results, e.g. 'main' or the config section name.
+        :param controller: OBSController or BackgroundOBSController for this instance.
+        :param scenes: Scenes to update on this instance; None means the scene passed to apply_visibility.
+        :param metrics: Optional metrics.Metrics; the time of each send to OBS is observed as obs_visibility.<name>.
+        """
+        self.name = name
+        self.controller = controller
+        self.scenes = list(scenes) if scenes else None
+        self.metrics = metrics
+        self.sent = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_error = None
+        self.last_seconds = None
+        self._pending = {}
+        self._warm_ups = {}  # scene_name -> source_name, newest first to be looked up
+        self._busy = False
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"obs-fanout-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, scene_name, visible_source, sources):
+        """Queue an update, replacing one for the same scene that has not started yet."""
+        with self._condition:
+            if scene_name in self._pending:
+                self.dropped += 1
+            self._pending[scene_name] = (visible_source, sources)
+            self._condition.notify_all()
+
+    def warm_up(self, scene_name, source_name):
+        """Queue a lookup of a source's scene item, so the next update for it does not have to fetch the scene."""
+        with self._condition:
+            self._warm_ups[scene_name] = source_name
+            self._condition.notify_all()
+
+    def wait(self, timeout):
+        """Wait until every queued update has been applied. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._condition.wait(left)
+            return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._warm_ups and not self._closed:
+                    self._condition.wait()
+                if not self._pending and self._closed:
+                    return
+                # Updates go first; lookups only run once nothing is waiting to be shown
+                updates, self._pending = self._pending, {}
+                warm_ups = {} if updates else self._warm_ups
+                if not updates:
+                    self._warm_ups = {}
+                self._busy = bool(updates)
+            if updates:
+                self._apply(updates)
+            for scene_name, source_name in warm_ups.items():
+                self._warm_up(scene_name, source_name)
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def _warm_up(self, scene_name, source_name):
+        try:
+            result = self.controller.get_source_id_by_name(scene_name, source_name)
+            if hasattr(result, 'result'):
+                # BackgroundOBSController returns a future
+                result.result()
+        except Exception:
+            pass  # OBS is down; the next update reports it
+
+    def _apply(self, updates):
+        start = time.perf_counter()
+        try:
+            result = self.controller.apply_scenes_visibility(updates)
+            if hasattr(result, 'result'):
+                # BackgroundOBSController returns a future
+                result = result.result()
+            self.sent += result or 0
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = e
+            print(f"OBS target '{self.name}' failed to update {', '.join(repr(name) for name in updates)}: {e}")
+        self.last_seconds = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.observe(f"obs_visibility.{self.name}", self.last_seconds)
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'last_error': str(self.last_error) if self.last_error else None,
+            'last_ms': round(self.last_seconds * 1000, 1) if self.last_seconds is not None else None,
+        }
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout=1.0)
+        self.controller.close()
+
+
+class OBSFanout:
+    """
+    Mirrors visibility changes to several scenes and OBS instances at once.
+
+    apply_visibility() hands the update to every target's thread and returns without waiting, so
+    the swap costs the same with one target or ten, and a slow or dead instance never blocks it.
+    Nothing is forwarded to the controllers on the caller's thread; scripts that animate sources or
+    change filters use the main instance's controller, `main`, directly.
+    """
+    def __init__(self, targets):
+        """
+        :param targets: FanoutTarget list; the first one is the main instance.
+        """
+        self.targets = list(targets)
+        self.main = self.targets[0].controller
+
+    def apply_visibility(self, scene_name, visible_source, sources=None, wait=0.0):
+        """
+        Queue the change on every target.
+
+        Like OBSController.apply_visibility(), returns the number of requests sent: the ones sent
+        within `wait` seconds, so 0 when not waiting (the change is still queued, as the controller
+        buffers it while disconnected). Per-target counts, failures and times are in stats() and the
+        obs_visibility.<target> metrics.
+        """
+        sources = list(sources) if sources is not None else None
+        sent_before = sum(target.sent for target in self.targets)
+        for target in self.targets:
+            for scene in target.scenes or [scene_name]:
+                target.submit(scene, visible_source, sources)
+        if wait <= 0:
+            return 0
+
+        deadline = time.monotonic() + wait
+        for target in self.targets:
+            target.wait(max(0.0, deadline - time.monotonic()))
+        return sum(target.sent for target in self.targets) - sent_before
+
+    def warm_up(self, scene_name, source_name):
+        """Look up a source's scene item on every target in the background, ahead of the swap that shows it."""
+        for target in self.targets:
+            for scene in target.scenes or [scene_name]:
+                target.warm_up(scene, source_name)
+
+    def stats(self):
+        """Per-target counters: requests sent, failures, updates dropped for a newer one, last error and time."""
+        return {target.name: target.stats() for target in self.targets}
+
+    def close(self):
+        for target in self.targets:
+            target.close()
@@ -0,0 +1,185 @@
+import time
+
+# -------------------------------------------------
+# WINDOW BACKENDS
+# -------------------------------------------------
+# The shuffler talks to the window manager only through these classes, so everything above
+# them (window matching, selection, the main loop) can run and be benchmarked off Windows.
+
+class WindowBackend:
+    """Interface to the operating system's top-level windows."""
+    def list_windows(self):
+        """Return a list of (hwnd, title) for every visible top-level window."""
+        raise NotImplementedError
+
+    def list_process_windows(self):
+        """Return a list of (hwnd, process id) for every visible top-level window, without reading titles."""
+        raise NotImplementedError
+
+    def is_hung(self, hwnd):
+        """True if the window has stopped handling messages (its program is not responding)."""
+        return False
+
+    def focus_window(self, hwnd):
+        """Restore the window if it is minimized and bring it to the foreground."""
+        raise NotImplementedError
+
+    def minimize_window(self, hwnd):
+        """Minimize the window without activating another one."""
+        raise NotImplementedError
+
+    def prepare_window(self, hwnd):
+        """Do the slow setup for a window that is about to be focused (eg. create its wrapper) ahead of time."""
+
+    def forget_window(self, hwnd):
+        """Drop anything cached for a window that has closed."""
+
+
+class Win32WindowBackend(WindowBackend):
+    """Windows implementation on top of pywin32 and pywinauto."""
+    ASFW_ANY = -1
+
+    def __init__(self):
+        import ctypes
+        import win32con
+        import win32gui
+        import win32process
+        from pywinauto.controls.hwndwrapper import HwndWrapper
+        self.user32 = ctypes.windll.user32
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.win32process = win32process
+        self.HwndWrapper = HwndWrapper
+        # Wrapping an hwnd directly avoids Application().connect(), which attaches to the whole
+        # process and was the slowest part of a swap. Wrappers are reused until the window closes.
+        self._wrappers = {}
+
+    def list_windows(self):
+        windows = []
+        def enum_window_callback(hwnd, extra):
+            if self.win32gui.IsWindowVisible(hwnd):
+                windows.append((hwnd, self.win32gui.GetWindowText(hwnd)))
+        self.win32gui.EnumWindows(enum_window_callback, None)
+        return windows
+
+    def list_process_windows(self):
+        # GetWindowText sends the window a message and waits while its program is busy; the process id does not
+        windows = []
+        def enum_window_callback(hwnd, extra):
+            if self.win32gui.IsWindowVisible(hwnd):
+                windows.append((hwnd, self.win32process.GetWindowThreadProcessId(hwnd)[1]))
+        self.win32gui.EnumWindows(enum_window_callback, None)
+        return windows
+
+    def is_hung(self, hwnd):
+        return bool(self.user32.IsHungAppWindow(hwnd))
+
+    def _wrapper(self, hwnd):
+        wrapper = self._wrappers.get(hwnd)
+        if wrapper is None:
+            wrapper = self._wrappers[hwnd] = self.HwndWrapper(hwnd)
+        return wrapper
+
+    def focus_window(self, hwnd):
+        self.user32.AllowSetForegroundWindow(self.ASFW_ANY)
+        try:
+            window = self._wrapper(hwnd)
+            if window.is_minimized():
+                window.restore()
+            window.set_focus()
+        except Exception:
+            # The cached wrapper may belong to a window that was closed and reopened; retry once fresh.
+            self.forget_window(hwnd)
+            window = self._wrapper(hwnd)
+            if window.is_minimized():
+                window.restore()
+            window.set_focus()
+
+    def prepare_window(self, hwnd):
+        # A handle can be reused after its window closes, so a stale wrapper is dropped here rather than mid-swap
+        if not self.win32gui.IsWindow(hwnd):
+            self.forget_window(hwnd)
+            return
+        self._wrapper(hwnd)
+
+    def minimize_window(self, hwnd):
+        # SW_SHOWMINNOACTIVE leaves the newly focused window active, unlike SW_MINIMIZE which
+        # activates the next window in the z-order.
+        self.win32gui.ShowWindow(hwnd, self.win32con.SW_SHOWMINNOACTIVE)
+
+    def forget_window(self, hwnd):
+        self._wrappers.pop(hwnd, None)
+
+
+class FakeWindowBackend(WindowBackend):
+    """
+    In-memory window list for simulations and benchmarks.
+
+    focus_window/minimize_window update foreground and minimized state and log each call;
+    focus_latency and minimize_latency optionally simulate how long the real calls take, and
+    wrap_latency the one-off cost of the first call for a window (creating its wrapper). Windows
+    can be given the id of the process that owns them and be marked as hung.
+    """
+    def __init__(self, windows=None, focus_latency=0.0, minimize_latency=0.0, wrap_latency=0.0):
+        self.windows = dict(windows or {})
+        self.focus_latency = focus_latency
+        self.minimize_latency = minimize_latency
+        self.wrap_latency = wrap_latency
+        self._wrapped = set()
+        self.pids = {}
+        self.hung = set()
+        self.foreground = None
+        self.minimized = set()
+        self.calls = []
+
+    def add_window(self, hwnd, title, pid=None):
+        self.windows[hwnd] = title
+        if pid is not None:
+            self.pids[hwnd] = pid
+
+    def remove_window(self, hwnd):
+        self.windows.pop(hwnd, None)
+        self.pids.pop(hwnd, None)
+        self.hung.discard(hwnd)
+        self._wrapped.discard(hwnd)
+        self.minimized.discard(hwnd)
+        if self.foreground == hwnd:
+            self.foreground = None
+
+    def set_title(self, hwnd, title):
+        self.windows[hwnd] = title
+
+    def list_windows(self):
+        return list(self.windows.items())
+
+    def list_process_windows(self):
+        return [(hwnd, self.pids.get(hwnd)) for hwnd in self.windows]
+
+    def is_hung(self, hwnd):
+        return hwnd in self.hung
+
+    def focus_window(self, hwnd):
+        if hwnd not in self.windows:
+            raise RuntimeError(f"No window with handle {hwnd}")
+        self.prepare_window(hwnd)
+        if self.focus_latency:
+            time.sleep(self.focus_latency)
+        self.calls.append(('focus', hwnd))
+        self.minimized.discard(hwnd)
+        self.foreground = hwnd
+
+    def minimize_window(self, hwnd):
+        if self.minimize_latency:
+            time.sleep(self.minimize_latency)
+        self.calls.append(('minimize', hwnd))
+        if hwnd in self.windows:
+            self.minimized.add(hwnd)
+
+    def prepare_window(self, hwnd):
+        if hwnd in self.windows and hwnd not in self._wrapped:
+            if self.wrap_latency:
+                time.sleep(self.wrap_latency)
+            self._wrapped.add(hwnd)
+
+    def forget_window(self, hwnd):
+        self._wrapped.discard(hwnd)
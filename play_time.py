@@ -0,0 +1,75 @@
+class PlayTimeTracker:
+    """
+    Accumulated on-screen time per game.
+
+    Time is read from the scheduler's clock (monotonic, or virtual in simulations) and only counts
+    while the shuffler is running: pause() stops the clock for the current game and resume() starts
+    it again. Every operation is O(1).
+    """
+    def __init__(self, clock, totals=None):
+        """
+        :param clock: Object with a now() method, normally ShuffleScheduler.clock.
+        :param totals: Seconds already played per game, e.g. restored from the session journal.
+        """
+        self.clock = clock
+        self.totals = dict(totals or {})
+        self.current = None
+        self.paused = False
+        self._since = None   # when the running part of the current segment started
+        self._segment = 0.0  # time in the current segment before the last pause
+
+    def switch(self, game):
+        """
+        Stop timing the current game and start timing game (None to stop). Returns (previous game,
+        seconds it was on screen since it was switched to, not counting pauses).
+        """
+        previous = self.current
+        self._stop_running()
+        played, self._segment = self._segment, 0.0
+        self.current = game
+        if game is not None and not self.paused:
+            self._since = self.clock.now()
+        return previous, played
+
+    def pause(self):
+        self._stop_running()
+        self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            if self.current is not None:
+                self._since = self.clock.now()
+
+    def _stop_running(self):
+        if self._since is not None:
+            elapsed = self.clock.now() - self._since
+            self.totals[self.current] = self.totals.get(self.current, 0.0) + elapsed
+            self._segment += elapsed
+            self._since = None
+
+    def total(self, game):
+        """Seconds game has been on screen, including the segment that is running now."""
+        seconds = self.totals.get(game, 0.0)
+        if game == self.current and self._since is not None:
+            seconds += self.clock.now() - self._since
+        return seconds
+
+    def stats(self, games, active):
+        """
+        {game: seconds} for every game, plus the spread between the most and least played of the
+        active games (completed games stop accumulating, so they would dominate the spread).
+        """
+        totals = {game: round(self.total(game), 1) for game in games}
+        active_totals = [totals[game] for game in active if game in totals]
+        return {
+            'play_time': totals,
+            'play_time_spread': round(max(active_totals) - min(active_totals), 1) if active_totals else 0.0,
+        }
+
+
+def format_duration(seconds):
+    """Seconds as H:MM:SS (or M:SS under an hour)."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
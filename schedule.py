@@ -0,0 +1,351 @@
+import json
+import random
+
+from play_time import PlayTimeTracker
+from scheduler import FakeClock, ShuffleScheduler
+
+
+def new_seed():
+    """A random seed for runs that do not set one; it is printed at startup so the run can be repeated."""
+    return str(random.SystemRandom().randrange(10 ** 9))
+
+
+class ShuffleSchedule:
+    """
+    Every random decision of a shuffle, derived from one seed.
+
+    Game picks and swap durations use separate generators, so durations depend only on the seed
+    and the swap number and can be listed ahead of time; the same seed and the same key presses
+    (at the same point of each swap) give the same shuffle, swap for swap.
+
+    The next game is picked by plan() as soon as a swap is done, which gives the session a whole
+    swap to get that game's window and OBS source ready. At the deadline take() uses the planned
+    game if it is still eligible and no game has joined the pool since; games dropping out only
+    reject draws that became impossible, so the odds of the remaining games are unchanged.
+    Otherwise the game is picked again.
+    """
+    def __init__(self, seed=None):
+        self.seed = str(seed) if seed not in (None, '') else new_seed()
+        # String seeds are hashed with SHA-512, so they give the same numbers on every platform and run
+        self.pick_rng = random.Random(f"{self.seed}/pick")
+        self.position = 0   # timed swaps taken so far
+        self.history = []   # (game, tenths) of every swap, tenths None when only one game was left
+        self.planned = None
+        self.replans = 0
+        self._planned_pool = None
+        self._log = None
+
+    def duration(self, position, min_time, max_time):
+        """Tenths of a second that timed swap number `position` lasts."""
+        return random.Random(f"{self.seed}/duration/{position}").randrange(min_time * 10, max_time * 10)
+
+    # PICKING
+
+    def plan(self, strategy, current):
+        """Pick the game to follow current ahead of its deadline. Returns it, or None if nothing else is eligible."""
+        self.planned = strategy.pick(current)
+        self._planned_pool = frozenset(strategy.eligible) if self.planned is not None else None
+        return self.planned
+
+    def forget_plan(self):
+        """Drop the planned game, eg. after the strategy or game list was replaced."""
+        self.planned = self._planned_pool = None
+
+    def take(self, strategy, current):
+        """Return the game for the swap that is due: the planned one if it is still valid, otherwise a new pick."""
+        planned, pool = self.planned, self._planned_pool
+        self.forget_plan()
+        if planned is not None:
+            eligible = strategy.eligible
+            if planned != current and planned in eligible and len(eligible) <= len(pool) and eligible <= pool:
+                return planned
+            self.replans += 1
+        return strategy.pick(current)
+
+    def commit(self, min_time, max_time):
+        """Start the next timed swap. Returns its duration in tenths of a second."""
+        tenths = self.duration(self.position, min_time, max_time)
+        self.position += 1
+        return tenths
+
+    def upcoming(self, strategy, current, min_time, max_time):
+        """
+        Lazily yield the swaps after current as (game, tenths), assuming nothing else happens on the
+        way: no key presses and no windows opening or closing. Works on a copy of the strategy (and
+        of its generator), so the real shuffle is not affected.
+        """
+        import copy  # only the look-ahead needs it, keep it out of the shuffler's startup
+        strategy = copy.deepcopy(strategy)
+        game = self.planned if self.planned is not None else strategy.pick(current)
+        current_tenths = self.history[-1][1] if self.history else None
+        position = self.position
+        while game is not None:
+            tenths = self.duration(position, min_time, max_time)
+            yield game, tenths
+            strategy.played(game)
+            if current is not None and current_tenths is not None:
+                strategy.credit(current, current_tenths / 10)
+            current, current_tenths, position = game, tenths, position + 1
+            game = strategy.pick(current)
+
+    # RECORDING
+
+    def open_log(self, path, header):
+        """
+        Record the run to a JSON lines file that replay() can repeat: the seed and header (game
+        list, strategy settings, restored state), then every swap and every handled key press.
+        """
+        self._log = open(path, "w", encoding="utf-8", buffering=1)
+        self._write({'op': 'start', 'seed': self.seed, **header})
+
+    def _write(self, record):
+        if self._log is not None:
+            self._log.write(json.dumps(record) + "\n")
+
+    def record_swap(self, game, played, tenths=None):
+        """Record a swap to game (None at the end) after the previous game was on screen for played seconds."""
+        self.history.append((game, tenths))
+        self._write({'op': 'swap', 'game': game, 'tenths': tenths, 'played': played})
+
+    def record_event(self, event, remaining):
+        """Record a key press handled while swap number self.position was running, with the seconds left on its timer."""
+        self._write({'op': 'event', 'swap': self.position, 'event': event, 'remaining': remaining})
+
+    def digest(self):
+        """Short hash of every swap so far, to compare runs at a glance."""
+        import hashlib
+        return hashlib.sha256(json.dumps(self.history).encode("utf-8")).hexdigest()[:16]
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+# -------------------------------------------------
+# REPLAY
+# -------------------------------------------------
+
+def read_log(path):
+    """Return (start record, [swap records], {swap number: [(remaining, event)]}) from a recorded run."""
+    start, swaps, events = None, [], {}
+    with open(path, encoding="utf-8") as log_file:
+        for line in log_file:
+            if not line.endswith("\n"):
+                break  # cut off by a crash
+            record = json.loads(line)
+            if record['op'] == 'start':
+                start = record
+            elif record['op'] == 'swap':
+                swaps.append(record)
+            elif record['op'] == 'event':
+                events.setdefault(record['swap'], []).append((record['remaining'], record['event']))
+    if start is None:
+        raise ValueError(f"'{path}' is not a shuffle log")
+    return start, swaps, events
+
+
+class _RecordedPlayTime(PlayTimeTracker):
+    """Credits the play time measured in the recorded run, so strategies see exactly the same numbers."""
+    def __init__(self, clock, totals, played):
+        super().__init__(clock, totals)
+        self._played = iter(played)
+
+    def switch(self, game):
+        previous, _ = super().switch(game)
+        return previous, next(self._played, 0.0)
+
+
+class _ReplayScheduler(ShuffleScheduler):
+    """Delivers each swap's recorded key presses at the same point of that swap's timer."""
+    def __init__(self, clock, schedule, events):
+        super().__init__(clock)
+        self.schedule = schedule
+        self._timed = {}
+        self._untimed = {}
+        for position, recorded in events.items():
+            self._timed[position] = [(remaining, event) for remaining, event in recorded if remaining is not None]
+            self._untimed[position] = [event for remaining, event in recorded if remaining is None]
+
+    def start_timer(self, seconds):
+        super().start_timer(seconds)
+        now = self.clock.now()
+        for remaining, event in self._timed.pop(self.schedule.position, ()):
+            # Strictly before the deadline, or the swap would win the tie
+            self.clock.post_at(now + min(max(0.0, seconds - remaining), seconds - 1e-6), event)
+
+    def clear_timer(self):
+        super().clear_timer()
+        # Presses with only one game left are handled one per step, in the order they came in
+        for event in self._untimed.pop(self.schedule.position, ()):
+            self.post(event)
+
+
+def replay(path):
+    """
+    Run a recorded shuffle again, headless and on a virtual clock, with every game's window open.
+    Returns (replayed schedule, recorded [(game, tenths)]). Runs that reloaded config.ini or lost
+    windows part ways with the recording at that point.
+    """
+    from focus import FocusController
+    from game_store import GameStore
+    from platform_backend import FakeWindowBackend
+    from selection import create_strategy
+    from shuffle_session import ShuffleSession
+    from window_registry import WindowRegistry
+
+    start, swaps, events = read_log(path)
+    games = start['games']
+    backend = FakeWindowBackend({hwnd: f"Dolphin | {game}" for hwnd, game in enumerate(games, start=1)})
+    game_store = GameStore(games)
+    game_store.restore(start['store'])
+    schedule = ShuffleSchedule(start['seed'])
+    clock = FakeClock()
+    play_time = _RecordedPlayTime(clock, start['play_time'], [swap['played'] for swap in swaps])
+    strategy = create_strategy(start['selection'], games, weights=start['weights'], no_repeat=start['no_repeat'],
+                               lru_pool=start['lru_pool'], play_time=play_time.totals, fair_slack=start['fair_slack'],
+                               rng=schedule.pick_rng)
+    session = ShuffleSession(
+        list(games), game_store, strategy, WindowRegistry(games, backend), FocusController(backend),
+        _ReplayScheduler(clock, schedule, events),
+        play_time=play_time, min_time=start['min_time'], max_time=start['max_time'], countdown=0,
+        schedule=schedule, log=lambda *args: None,
+    )
+    session.start()
+    try:
+        while len(schedule.history) < len(swaps) and session.step():
+            pass
+    except RuntimeError:
+        pass  # FakeClock has no recorded presses left to wait for
+    return schedule, [(swap['game'], swap['tenths']) for swap in swaps]
+
+
+def compare(replayed, recorded):
+    """Index of the first swap where two runs differ, or None if they are identical."""
+    for index, (a, b) in enumerate(zip(replayed, recorded)):
+        if tuple(a) != tuple(b):
+            return index
+    return None if len(replayed) == len(recorded) else min(len(replayed), len(recorded))
+
+
+# -------------------------------------------------
+# SELF-CHECK AND BENCHMARK
+# -------------------------------------------------
+
+def check_replay(num_games=40, seed="check"):
+    """
+    Record simulated runs with random key presses and a clock that loses a few milliseconds per
+    swap (like a real one), then replay them twice, once in a fresh interpreter with a different
+    hash seed, and check every swap comes out identical.
+    """
+    import os
+    import subprocess
+    import sys
+    import tempfile
+    from simulation import build_session, SimulationClock
+
+    class OverheadClock(SimulationClock):
+        # Time spent handling a swap, so measured play times are not round numbers
+        def __init__(self, rng):
+            super().__init__()
+            self.rng = rng
+
+        def wait(self, events, timeout):
+            self.time += self.rng.uniform(0.001, 0.01)
+            return super().wait(events, timeout)
+
+    from selection import STRATEGIES
+    with tempfile.TemporaryDirectory() as directory:
+        for strategy in STRATEGIES:
+            path = os.path.join(directory, f"{strategy}.jsonl")
+            session = build_session(num_games, strategy, seed=seed, clock=OverheadClock(random.Random(seed)))
+            session.schedule.open_log(path, session_header(session, strategy, no_repeat=2))
+            session.run()
+            session.schedule.close()
+            recorded = session.schedule.history
+            first, _ = replay(path)
+            second, logged = replay(path)
+            assert logged == recorded, "log does not match the run"
+            mismatch = compare(first.history, recorded)
+            assert mismatch is None, f"{strategy}: replay differs from the recording at swap {mismatch}"
+            assert second.history == first.history, f"{strategy}: two replays differ"
+            fresh = subprocess.run([sys.executable, os.path.abspath(__file__), path], capture_output=True, text=True,
+                                   env={**os.environ, 'PYTHONHASHSEED': '1'})
+            assert "Replay matches" in fresh.stdout, f"{strategy}: replay in a new process differs\n{fresh.stdout}{fresh.stderr}"
+            print(f"  {strategy:12} {len(recorded):5} swaps replayed identically (digest {first.digest()}, "
+                  f"{session.schedule.replans} replans)")
+
+
+def session_header(session, selection, weights=None, no_repeat=0, lru_pool=3, fair_slack=30.0):
+    """Header for ShuffleSchedule.open_log() describing a session about to start."""
+    return {
+        'games': list(session.games),
+        'selection': selection,
+        'weights': dict(weights or {}),
+        'no_repeat': no_repeat,
+        'lru_pool': lru_pool,
+        'fair_slack': fair_slack,
+        'min_time': session.min_time,
+        'max_time': session.max_time,
+        'store': session.game_store.state(),
+        'play_time': dict(session.play_time.totals),
+    }
+
+
+def check_upcoming(num_games=30, count=50):
+    """With no key presses, the precomputed stream must match what the shuffle then does."""
+    from selection import create_strategy, STRATEGIES
+    for name in STRATEGIES:
+        games = [f"Game {i}" for i in range(num_games)]
+        schedule = ShuffleSchedule("upcoming")
+        strategy = create_strategy(name, games, no_repeat=3, rng=schedule.pick_rng)
+        strategy.sync(games)
+        predicted = list(zip(range(count), schedule.upcoming(strategy, None, 10, 30)))
+        current, current_tenths, actual = None, None, []
+        for _ in range(count):
+            game = schedule.take(strategy, current)
+            strategy.played(game)
+            tenths = schedule.commit(10, 30)
+            if current is not None:
+                strategy.credit(current, current_tenths / 10)
+            schedule.record_swap(game, 0.0, tenths)
+            schedule.plan(strategy, game)
+            actual.append((game, tenths))
+            current, current_tenths = game, tenths
+        assert [swap for _, swap in predicted] == actual, f"{name}: upcoming() did not match the shuffle"
+    print(f"  upcoming() predicted {count} swaps exactly for every strategy")
+
+
+def benchmark_prefetch(num_games=30, swaps=200, wrap_latency=0.02):
+    """Focus latency when each window's wrapper is created during its first swap, against ahead of it."""
+    from simulation import build_session
+    for prefetch in (False, True):
+        session = build_session(num_games, 'uniform', seed=0, wrap_latency=wrap_latency)
+        session.prefetch = prefetch
+        session.start()
+        while session.swaps < swaps and session.step():
+            pass
+        latency = session.focus_controller.latency
+        # The very first swap has nothing planned yet, so the worst case is the same either way
+        print(f"  {'prefetch' if prefetch else 'no prefetch':12} focus takes {latency.total / latency.count * 1000:6.2f} ms "
+              f"per swap on average over {latency.count} swaps, worst {latency.max * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    # Imported here rather than at the top, since the shuffler imports this module at startup
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a recorded shuffle, or check that replays are exact.")
+    parser.add_argument("log", nargs="?", help="replay_log file written by the shuffler")
+    args = parser.parse_args()
+    if args.log:
+        replayed, recorded = replay(args.log)
+        mismatch = compare(replayed.history, recorded)
+        print(f"Seed {replayed.seed}: {len(recorded)} recorded swaps, {len(replayed.history)} replayed (digest {replayed.digest()})")
+        print("Replay matches the recording." if mismatch is None else f"Replay differs from swap {mismatch} on: "
+              f"recorded {recorded[mismatch] if mismatch < len(recorded) else None}, "
+              f"replayed {replayed.history[mismatch] if mismatch < len(replayed.history) else None}")
+    else:
+        check_upcoming()
+        check_replay()
+        print("Pre-warming the next window (window wrappers take 20 ms to create):")
+        benchmark_prefetch()
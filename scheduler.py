@@ -0,0 +1,158 @@
+import heapq
+import queue
+import time
+
+# Events posted by the hotkey callbacks
+START = 'start'
+PAUSE = 'pause'
+COMPLETE = 'complete'
+UNDO = 'undo'
+REDO = 'redo'
+# Posted by the frozen-game watchdog (and usable by anything else): swap right away / re-focus the current game
+SKIP = 'skip'
+REFOCUS = 'refocus'
+# Posted when config.ini changed on disk, so the new settings are applied on the main loop
+RELOAD = 'reload'
+
+# Returned by ShuffleScheduler.wait() when the swap deadline is reached
+SWAP = 'swap'
+
+
+class MonotonicClock:
+    """Real clock: monotonic time, and waits that block on the event queue."""
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, events, timeout):
+        """Return the next queued event, or None if the timeout expires first."""
+        try:
+            return events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class FakeClock:
+    """
+    Virtual clock for driving the scheduler without real waiting.
+
+    Synthetic key events are scripted with post_at(); a wait jumps straight to the next scripted
+    event or to the end of its timeout, whichever comes first, so minutes of shuffling run instantly.
+    """
+    def __init__(self, start=0.0):
+        self.time = start
+        self._scripted = []
+        self._sequence = 0
+
+    def now(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
+
+    def post_at(self, at, event):
+        """Deliver event once the virtual time reaches at."""
+        heapq.heappush(self._scripted, (at, self._sequence, event))
+        self._sequence += 1
+
+    def wait(self, events, timeout):
+        try:
+            return events.get_nowait()
+        except queue.Empty:
+            pass
+        if self._scripted and (timeout is None or self._scripted[0][0] <= self.time + timeout):
+            at, _, event = heapq.heappop(self._scripted)
+            self.time = max(self.time, at)
+            return event
+        if timeout is None:
+            raise RuntimeError("FakeClock would wait forever: no queued or scripted events")
+        self.time += timeout
+        return None
+
+
+class ShuffleScheduler:
+    """
+    Event-driven replacement for the shuffler's polling loops.
+
+    Hotkey callbacks post() events from the keyboard thread; the main loop blocks in wait() until
+    an event arrives or the swap deadline passes. The deadline is an absolute time on the clock, so
+    time spent handling events does not stretch the countdown, and pausing stores the exact time
+    remaining and restores it on resume.
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.events = queue.Queue()
+        self.paused = False
+        self.deadline = None
+        self.remaining = None
+
+    def post(self, event):
+        """Queue an event; safe to call from any thread."""
+        self.events.put(event)
+
+    def start_timer(self, seconds):
+        """Schedule the next swap seconds from now (or from resume, if paused)."""
+        if self.paused:
+            self.deadline, self.remaining = None, seconds
+        else:
+            self.deadline, self.remaining = self.clock.now() + seconds, None
+
+    def clear_timer(self):
+        """Cancel the pending swap, e.g. when only one game is left."""
+        self.deadline = self.remaining = None
+
+    def time_remaining(self):
+        """Seconds until the next swap, or None if no swap is scheduled."""
+        if self.paused:
+            return self.remaining
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock.now())
+
+    def sleep(self, seconds):
+        """Wait for the given time without consuming events; they stay queued for wait()."""
+        end = self.clock.now() + seconds
+        pending = []
+        while (left := end - self.clock.now()) > 0:
+            event = self.clock.wait(self.events, left)
+            if event is not None:
+                pending.append(event)
+        for event in pending:
+            self.events.put(event)
+
+    def wait(self):
+        """
+        Block until something needs handling and return it: SWAP when the deadline passes,
+        otherwise the event name. PAUSE is applied before it is returned; SKIP moves the deadline
+        to now (it is returned only when no swap is scheduled); COMPLETE, UNDO, REDO, SKIP and
+        REFOCUS are dropped while paused.
+        """
+        while True:
+            if not self.paused and self.deadline is not None:
+                timeout = self.deadline - self.clock.now()
+                if timeout <= 0:
+                    self.deadline = None
+                    return SWAP
+            else:
+                timeout = None
+
+            event = self.clock.wait(self.events, timeout)
+            if event is None:
+                continue
+            if event == PAUSE:
+                self._toggle_pause()
+            elif self.paused and event in (COMPLETE, UNDO, REDO, SKIP, REFOCUS):
+                continue
+            elif event == SKIP and self.deadline is not None:
+                self.deadline = self.clock.now()
+                continue
+            return event
+
+    def _toggle_pause(self):
+        self.paused = not self.paused
+        if self.paused:
+            if self.deadline is not None:
+                self.remaining = max(0.0, self.deadline - self.clock.now())
+                self.deadline = None
+        elif self.remaining is not None:
+            self.deadline = self.clock.now() + self.remaining
+            self.remaining = None
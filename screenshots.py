@@ -0,0 +1,270 @@
+import binascii
+import os
+import queue
+import re
+import threading
+import time
+
+from exports import write_atomic
+
+
+def decode_data_uri(data_uri):
+    """
+    Decode an OBS screenshot ("data:image/png;base64,...") to image bytes.
+
+    binascii decodes the ASCII text directly, skipping the extra encode-to-bytes copy that
+    base64.b64decode makes of a multi-megabyte payload.
+    """
+    return binascii.a2b_base64(data_uri[data_uri.find(",") + 1:])
+
+
+def screenshot_filename(source_name, img_format):
+    """File name for a source's thumbnail; game titles can contain characters Windows does not allow."""
+    return re.sub(r'[<>:"/\\|?*]', "_", source_name) + "." + img_format
+
+
+class ScreenshotPipeline:
+    """
+    Periodic thumbnails of every game source, captured off the main loop.
+
+    A dispatcher thread walks the sources round-robin so each one is captured about once per
+    `interval` seconds, but never more than `max_per_second` captures overall. Captures are handed
+    to a small pool of worker threads that request, decode and (optionally) save the image
+    atomically. If the workers fall behind, captures are skipped rather than queued, so capture
+    load stays bounded. Give the pipeline its own OBS connection: requests on one connection are
+    serialized, and a large screenshot would otherwise hold up the swap's visibility change.
+
+    Images are downscaled by OBS itself (width/height are sent with the request), which is far
+    cheaper than fetching full-size frames and resizing them here.
+    """
+    def __init__(self, controller, sources, interval=5.0, workers=2, max_per_second=2.0, img_format="png",
+                 width=320, height=180, quality=-1, output_dir=None, on_capture=None, metrics=None):
+        """
+        :param controller: OBSController (or BackgroundOBSController) used only for screenshots.
+        :param sources: Names of the sources to capture.
+        :param interval: Seconds between two captures of the same source.
+        :param workers: Worker threads requesting and decoding screenshots.
+        :param max_per_second: Upper bound on captures per second across all sources.
+        :param output_dir: Directory the latest thumbnail of each source is written to (None to keep them in memory only).
+        :param on_capture: Optional callback(source_name, image_bytes, timestamp), called on a worker thread.
+        :param metrics: Optional metrics.Metrics; each capture is observed as the "screenshot" span.
+        """
+        self.controller = controller
+        self.sources = list(sources)
+        self.interval = interval
+        self.workers = max(1, workers)
+        self.max_per_second = max_per_second
+        self.img_format = img_format
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.output_dir = output_dir
+        self.on_capture = on_capture
+        self.metrics = metrics
+        self.captures = 0
+        self.failures = 0
+        self.skipped = 0
+        self.bytes_decoded = 0
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self.workers)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self._threads = [threading.Thread(target=self._dispatch, name="screenshot-dispatch", daemon=True)]
+        self._threads += [threading.Thread(target=self._work, name=f"screenshot-{i}", daemon=True) for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def set_sources(self, sources):
+        """Replace the captured sources. The shuffler passes the active games on every state change."""
+        self.sources = list(sources)
+
+    def latest(self, source_name):
+        """(timestamp, image bytes) of the newest capture of a source, or None."""
+        with self._lock:
+            return self._latest.get(source_name)
+
+    def _dispatch(self):
+        position = 0
+        next_at = time.monotonic()
+        while True:
+            sources = self.sources
+            if sources:
+                source = sources[position % len(sources)]
+                position += 1
+                try:
+                    self._queue.put_nowait(source)
+                except queue.Full:
+                    self.skipped += 1
+            # Spread the sources evenly over the interval, capped by the overall rate limit
+            spacing = max(self.interval / max(1, len(sources)), 1.0 / self.max_per_second if self.max_per_second > 0 else 0.0)
+            next_at = max(next_at + spacing, time.monotonic())
+            if self._stop.wait(next_at - time.monotonic()):
+                return
+
+    def _work(self):
+        while True:
+            source = self._queue.get()
+            if source is None:
+                return
+            if getattr(self.controller, "connected", True) is False:
+                # OBS is down; the controller reconnects on its own, so just wait for it
+                self.skipped += 1
+                continue
+            self.capture(source)
+
+    def capture(self, source_name):
+        """Capture, decode and store one screenshot now, on the calling thread. Returns the image bytes or None."""
+        start = time.perf_counter()
+        data_uri = self.controller.get_source_screenshot(source_name, self.img_format, self.width, self.height, self.quality)
+        if hasattr(data_uri, "result"):
+            # BackgroundOBSController returns a future
+            data_uri = data_uri.result()
+        if not data_uri:
+            self.failures += 1
+            return None
+        try:
+            image = decode_data_uri(data_uri)
+        except (binascii.Error, ValueError) as e:
+            print(f"Failed to decode screenshot of source '{source_name}': {e}")
+            self.failures += 1
+            return None
+        del data_uri
+
+        timestamp = time.time()
+        with self._lock:
+            self._latest[source_name] = (timestamp, image)
+            self.captures += 1
+            self.bytes_decoded += len(image)
+        if self.output_dir:
+            try:
+                write_atomic(os.path.join(self.output_dir, screenshot_filename(source_name, self.img_format)), image)
+            except OSError as e:
+                print(f"Failed to save screenshot of source '{source_name}': {e}")
+        if self.on_capture is not None:
+            self.on_capture(source_name, image, timestamp)
+        if self.metrics is not None:
+            self.metrics.observe("screenshot", time.perf_counter() - start)
+        return image
+
+    def stats(self):
+        return {
+            'captures': self.captures,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'megabytes_decoded': round(self.bytes_decoded / 1e6, 1),
+        }
+
+    def close(self):
+        self._stop.set()
+        for _ in range(self.workers):
+            try:
+                self._queue.put(None, timeout=1.0)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+
+# -------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------
+
+class _FakeScreenshotServer:
+    """Minimal obs-websocket v5 server that answers GetSourceScreenshot with a large fixed payload."""
+    def __init__(self, payload_bytes, delay=0.0):
+        import base64
+        self.data_uri = "data:image/png;base64," + base64.b64encode(os.urandom(payload_bytes)).decode("ascii")
+        self.delay = delay
+        self.requests = 0
+
+    def _handle(self, websocket):
+        import json
+        websocket.send(json.dumps({"op": 0, "d": {"obsWebSocketVersion": "5.0.0", "rpcVersion": 1}}))
+        websocket.recv()
+        websocket.send(json.dumps({"op": 2, "d": {"negotiatedRpcVersion": 1}}))
+        for message in websocket:
+            request = json.loads(message)["d"]
+            self.requests += 1
+            if self.delay:
+                time.sleep(self.delay)
+            data = {"imageData": self.data_uri} if request["requestType"] == "GetSourceScreenshot" else {}
+            websocket.send(json.dumps({"op": 7, "d": {
+                "requestType": request["requestType"], "requestId": request["requestId"],
+                "requestStatus": {"result": True, "code": 100}, "responseData": data,
+            }}))
+
+    def start(self):
+        from websockets.sync.server import serve
+        self.server = serve(self._handle, "localhost", 0, max_size=None)
+        self.port = self.server.socket.getsockname()[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def benchmark(payload_mb=4, captures=40):
+    """Fetch large screenshots from a fake server: blocking decode-and-save against the pipeline."""
+    import base64
+    import tempfile
+    from OBS_Websocket_Encapsulation import OBSController
+
+    server = _FakeScreenshotServer(int(payload_mb * 1e6)).start()
+    controller = OBSController(port=server.port, listen_events=False)
+    swap_controller = OBSController(port=server.port, listen_events=False)
+    sources = [f"Game {i}" for i in range(8)]
+    with tempfile.TemporaryDirectory() as directory:
+        # Old approach: fetch, split, b64decode and write on the calling thread
+        start = time.perf_counter()
+        for i in range(captures):
+            data_uri = controller.get_source_screenshot(sources[i % len(sources)], "png", 320, 180, -1)
+            with open(os.path.join(directory, "naive.png"), "wb") as image_file:
+                image_file.write(base64.b64decode(data_uri.split(",", 1)[1]))
+        naive = (time.perf_counter() - start) / captures
+
+        data_uri = controller.get_source_screenshot(sources[0], "png", 320, 180, -1)
+        start = time.perf_counter()
+        for _ in range(10):
+            base64.b64decode(data_uri.split(",", 1)[1])
+        split_decode = (time.perf_counter() - start) / 10
+        start = time.perf_counter()
+        for _ in range(10):
+            decode_data_uri(data_uri)
+        view_decode = (time.perf_counter() - start) / 10
+
+        # Pipeline running flat out while another connection keeps issuing swap-sized requests
+        pipeline = ScreenshotPipeline(controller, sources, interval=0.0, workers=2, max_per_second=1000,
+                                      output_dir=directory)
+        pipeline.start()
+        swap_latencies = []
+        start = time.perf_counter()
+        while pipeline.captures < captures:
+            request_start = time.perf_counter()
+            swap_controller.ws.get_version()
+            swap_latencies.append(time.perf_counter() - request_start)
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        pipeline.close()
+        swap_latencies.sort()
+
+    controller.close()
+    swap_controller.close()
+    server.stop()
+    print(f"{payload_mb} MB screenshots, {captures} captures")
+    print(f"  blocking fetch+decode+save: {naive * 1000:8.1f} ms per capture on the caller's thread")
+    print(f"  decode (split + b64decode): {split_decode * 1000:8.1f} ms")
+    print(f"  decode (decode_data_uri):   {view_decode * 1000:8.1f} ms")
+    print(f"  pipeline: {pipeline.captures / elapsed:.1f} captures/s, {pipeline.stats()}")
+    print(f"  swap request on its own connection meanwhile: p50 {swap_latencies[len(swap_latencies) // 2] * 1000:.1f} ms, "
+          f"max {swap_latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,295 @@
+import heapq
+import random
+from collections import OrderedDict, deque
+
+
+class FenwickTree:
+    """Binary indexed tree of non-negative weights supporting O(log n) updates and weighted sampling."""
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0.0] * (size + 1)
+        self.total = 0.0
+
+    def add(self, index, delta):
+        self.total += delta
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, count):
+        """Sum of the first count weights, as the tree holds them (total can drift from it)."""
+        result = 0.0
+        while count > 0:
+            result += self.tree[count]
+            count -= count & -count
+        return result
+
+    def find(self, value):
+        """Return the index whose cumulative weight range contains value (0 <= value < prefix_sum(size))."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            next_position = position + step
+            if next_position <= self.size and self.tree[next_position] <= value:
+                position = next_position
+                value -= self.tree[next_position]
+            step >>= 1
+        return min(position, self.size - 1)
+
+
+class SelectionStrategy:
+    """
+    Picks the next game directly from the eligible pool, never returning the current game.
+
+    The pool is updated incrementally with set_eligible()/sync() as games gain or lose a window or
+    are completed, and played() is called after every swap.
+    """
+    def __init__(self, games, rng=None):
+        self.games = list(dict.fromkeys(games))
+        self.rng = rng or random.Random()
+        self.eligible = set()
+        self._rank = {game: position for position, game in enumerate(self.games)}
+
+    def _in_order(self, games):
+        # Set order depends on the per-process string hash seed; applying changes in game list order
+        # keeps a seeded shuffle identical from one run to the next
+        return sorted(games, key=lambda game: self._rank.get(game, len(self._rank)))
+
+    def sync(self, eligible_games):
+        """Make the eligible pool equal to the given games, touching only the differences."""
+        eligible_games = set(eligible_games)
+        for game in self._in_order(self.eligible - eligible_games):
+            self.set_eligible(game, False)
+        for game in self._in_order(eligible_games - self.eligible):
+            self.set_eligible(game, True)
+
+    def set_games(self, games):
+        """Adopt a new game list: removed games leave the eligible pool, new ones can join it at the next sync()."""
+        self.games = list(dict.fromkeys(games))
+        removed = self._in_order(self.eligible.difference(self.games))
+        self._rank = {game: position for position, game in enumerate(self.games)}
+        for game in removed:
+            self.set_eligible(game, False)
+
+    def set_eligible(self, game, eligible):
+        raise NotImplementedError
+
+    def pick(self, current=None):
+        """Return the next game, or None if no game other than current is eligible."""
+        raise NotImplementedError
+
+    def played(self, game):
+        """Record that game was just swapped to."""
+
+    def credit(self, game, seconds):
+        """Record that game was just on screen for the given seconds."""
+
+
+class WeightedStrategy(SelectionStrategy):
+    """
+    Weighted random pick in O(log n) from a Fenwick tree of per-game weights.
+
+    The current game is excluded by temporarily zeroing its weight. With no_repeat > 0, the last
+    no_repeat games played are also excluded until they fall out of that window (unless that would
+    leave nothing to pick). Equal weights give a uniform shuffle.
+    """
+    def __init__(self, games, weights=None, no_repeat=0, rng=None):
+        super().__init__(games, rng)
+        self._weights = dict(weights or {})
+        self._position = {game: position for position, game in enumerate(self.games)}
+        self._base = [max(0.0, float(self._weights.get(game, 1.0))) for game in self.games]
+        self._tree = FenwickTree(len(self.games))
+        self._recent = deque(maxlen=no_repeat) if no_repeat > 0 else None
+
+    def set_games(self, games):
+        super().set_games(games)
+        # Tree positions follow the game list, so the tree is rebuilt: O(n), once per config change
+        self._position = {game: position for position, game in enumerate(self.games)}
+        self._base = [max(0.0, float(self._weights.get(game, 1.0))) for game in self.games]
+        if self._recent is not None:
+            self._recent = deque((game for game in self._recent if game in self._position), maxlen=self._recent.maxlen)
+        self._tree = FenwickTree(len(self.games))
+        for game in self._in_order(self.eligible):
+            weight = self._weight(game)
+            if weight:
+                self._tree.add(self._position[game], weight)
+
+    def _weight(self, game):
+        """Weight the tree should currently hold for a game."""
+        if game not in self.eligible or (self._recent is not None and game in self._recent):
+            return 0.0
+        return self._base[self._position[game]]
+
+    def _set_weight(self, game, update):
+        before = self._weight(game)
+        update()
+        after = self._weight(game)
+        if after != before:
+            self._tree.add(self._position[game], after - before)
+
+    def set_eligible(self, game, eligible):
+        if game not in self._position:
+            return
+        self._set_weight(game, lambda: self.eligible.add(game) if eligible else self.eligible.discard(game))
+
+    def _sample(self, current=None):
+        # Search with the sum the tree actually holds: the running total drifts after many float
+        # updates, and a value past the real end lands on the last game whatever its weight.
+        total = self._tree.prefix_sum(self._tree.size)
+        if total <= 1e-9:  # allow for float drift from repeated updates
+            return None
+        for _ in range(8):
+            game = self.games[self._tree.find(self.rng.random() * total)]
+            if game != current and self._weight(game) > 0:
+                return game
+        # Only drift residue left on zero-weight games: pick among the real candidates instead
+        candidates = [game for game in self._in_order(self.eligible) if game != current and self._weight(game) > 0]
+        return self.rng.choice(candidates) if candidates else None
+
+    def pick(self, current=None):
+        excluded = self._weight(current) if current in self._position else 0.0
+        if excluded:
+            self._tree.add(self._position[current], -excluded)
+        try:
+            game = self._sample(current)
+            if game is None and self._recent:
+                # Everything eligible was played recently; fall back to any game but the current one.
+                recent = [g for g in self._recent if g != current and g in self.eligible]
+                if recent:
+                    return self.rng.choice(recent)
+            return game
+        finally:
+            if excluded:
+                self._tree.add(self._position[current], excluded)
+
+    def played(self, game):
+        if self._recent is None or game not in self._position:
+            return
+        if game in self._recent:
+            self._set_weight(game, lambda: self._recent.remove(game))
+        if len(self._recent) == self._recent.maxlen:
+            oldest = self._recent[0]
+            self._set_weight(oldest, self._recent.popleft)
+        self._set_weight(game, lambda: self._recent.append(game))
+
+
+class LeastRecentStrategy(SelectionStrategy):
+    """
+    Bias towards the games that have waited longest: pick uniformly among the pool_size eligible
+    games that were played least recently. Eligible games are kept in last-played order, so a pick
+    costs O(pool_size) and recording a swap is O(1).
+    """
+    def __init__(self, games, pool_size=3, rng=None):
+        super().__init__(games, rng)
+        self.pool_size = max(1, pool_size)
+        self._order = OrderedDict()  # eligible games, least recently played first
+
+    def set_eligible(self, game, eligible):
+        if eligible:
+            if game not in self.eligible:
+                self.eligible.add(game)
+                # A game rejoining the pool (window reopened, completion undone) has been waiting
+                # at least as long as anything else, so it goes to the front of the line.
+                self._order[game] = None
+                self._order.move_to_end(game, last=False)
+        else:
+            self.eligible.discard(game)
+            self._order.pop(game, None)
+
+    def pick(self, current=None):
+        candidates = []
+        for game in self._order:
+            if game != current:
+                candidates.append(game)
+                if len(candidates) == self.pool_size:
+                    break
+        return self.rng.choice(candidates) if candidates else None
+
+    def played(self, game):
+        if game in self._order:
+            self._order.move_to_end(game)
+
+
+class FairShareStrategy(SelectionStrategy):
+    """
+    Keep screen time even: always pick the eligible game with the least accumulated play time.
+
+    Play times are grouped into buckets of `slack` seconds and games in the same bucket are tied, with
+    ties broken by a random key drawn whenever a game's entry is pushed. This keeps the order
+    unpredictable while bounding the spread between any two games to about slack plus one swap.
+    Games live in a min-heap with lazy deletion, so pick, credit and eligibility changes are O(log n).
+    """
+    def __init__(self, games, play_time=None, slack=30.0, rng=None):
+        super().__init__(games, rng)
+        self.slack = max(1e-9, float(slack))
+        self.play_time = {game: float((play_time or {}).get(game, 0.0)) for game in self.games}
+        self._heap = []
+        self._version = dict.fromkeys(self.games, 0)
+
+    def set_games(self, games):
+        super().set_games(games)
+        for game in self.games:
+            if game not in self._version:
+                self._version[game] = 0
+                self.play_time.setdefault(game, 0.0)
+
+    def _push(self, game):
+        self._version[game] += 1
+        entry = (int(self.play_time[game] // self.slack), self.rng.random(), game, self._version[game])
+        heapq.heappush(self._heap, entry)
+        # Stale entries are only skipped when they reach the top; rebuild if they pile up
+        if len(self._heap) > 2 * len(self.eligible) + 16:
+            self._heap = [entry for entry in self._heap if self._valid(entry)]
+            heapq.heapify(self._heap)
+
+    def _valid(self, entry):
+        game, version = entry[2], entry[3]
+        return game in self.eligible and self._version[game] == version
+
+    def set_eligible(self, game, eligible):
+        if game not in self._version:
+            return
+        if eligible and game not in self.eligible:
+            self.eligible.add(game)
+            self._push(game)
+        elif not eligible:
+            self.eligible.discard(game)
+
+    def pick(self, current=None):
+        held = None
+        while self._heap:
+            entry = self._heap[0]
+            if not self._valid(entry):
+                heapq.heappop(self._heap)
+            elif entry[2] == current and held is None:
+                held = heapq.heappop(self._heap)
+            else:
+                break
+        game = self._heap[0][2] if self._heap else None
+        if held is not None:
+            heapq.heappush(self._heap, held)
+        return game
+
+    def credit(self, game, seconds):
+        if game not in self.play_time:
+            return
+        self.play_time[game] += seconds
+        if game in self.eligible:
+            self._push(game)
+
+
+STRATEGIES = ('uniform', 'weighted', 'least_recent', 'fair')
+
+
+def create_strategy(name, games, weights=None, no_repeat=0, lru_pool=3, play_time=None, fair_slack=30.0, rng=None):
+    """Build the selection strategy named in config.ini."""
+    if name == 'uniform':
+        return WeightedStrategy(games, no_repeat=no_repeat, rng=rng)
+    if name == 'weighted':
+        return WeightedStrategy(games, weights=weights, no_repeat=no_repeat, rng=rng)
+    if name == 'least_recent':
+        return LeastRecentStrategy(games, pool_size=lru_pool, rng=rng)
+    if name == 'fair':
+        return FairShareStrategy(games, play_time=play_time, slack=fair_slack, rng=rng)
+    raise ValueError(f"Unknown selection strategy '{name}', expected one of: {', '.join(STRATEGIES)}")
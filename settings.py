@@ -0,0 +1,366 @@
+import configparser
+import dataclasses
+import os
+import threading
+import types
+
+from selection import STRATEGIES
+
+WATCHDOG_ACTIONS = ('refocus', 'skip')
+SCREENSHOT_FORMATS = ('png', 'jpg', 'jpeg', 'bmp')
+
+DEFAULT_GAMES = (
+    "Mario Golf: Toadstool Tour",
+    "Mario Kart: Double Dash!!",
+    "Mario Superstar Baseball",
+    "Mario Power Tennis",
+    "Super Mario Strikers",
+)
+
+
+class ConfigError(Exception):
+    """config.ini could not be read or has invalid values; str() lists every problem found."""
+    def __init__(self, problems):
+        super().__init__("\n".join(f"  - {problem}" for problem in problems))
+        self.problems = list(problems)
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    """
+    Every setting from config.ini, parsed and validated once.
+
+    Instances are immutable (lists are tuples and weights a read-only mapping), so a reloaded
+    config is a new Settings object that can be compared with the old one field by field.
+    """
+    # [General]
+    min_time: int = 10
+    max_time: int = 30
+    selection: str = 'uniform'
+    no_repeat: int = 0
+    lru_pool: int = 3
+    fair_slack: float = 30.0
+    watch_config: bool = True
+    seed: str = ''
+    # [OBS]
+    obs_integration: bool = True
+    scene_name: str = "Dolphin Shuffler"
+    extra_scenes: tuple = ()
+    export_game_list: bool = True
+    export_num_remaining: bool = True
+    export_game_lines: bool = False
+    export_json: bool = False
+    export_play_time: bool = False
+    export_template: str = ''
+    export_debounce: float = 0.25
+    obs_port: int = 4455
+    obs_password: str = ''
+    obs_async: bool = False
+    obs_targets: tuple = ()  # ((name, host, port, password, scenes), ...) from [OBS Target <name>] sections
+    # [Hotkeys]
+    pause_key: str = 'p'
+    completion_key: str = 'space'
+    undo_key: str = 'u'
+    redo_key: str = ''
+    start_key: str = 's'
+    # [Session]
+    resume_session: bool = True
+    journal_file: str = 'shuffler_session.jsonl'
+    replay_log: str = ''
+    # [Screenshots]
+    screenshots: bool = False
+    screenshot_interval: float = 10.0
+    screenshot_max_per_second: float = 2.0
+    screenshot_width: int = 320
+    screenshot_height: int = 180
+    screenshot_format: str = 'png'
+    screenshot_dir: str = 'thumbnails'
+    # [Watchdog]
+    watchdog_enabled: bool = False
+    watchdog_interval: float = 1.0
+    watchdog_samples: int = 5
+    watchdog_action: str = 'refocus'
+    # [Metrics]
+    metrics_port: int = 0
+    metrics_log: str = ''
+    # [Control]
+    control_port: int = 0
+    # [Instances]
+    launch_dolphin: bool = False
+    dolphin_path: str = ''
+    dolphin_args: str = '-b'
+    max_relaunches: int = 3
+    hang_timeout: float = 30.0
+    # [Games], [Weights] and [Paths]
+    games: tuple = DEFAULT_GAMES
+    weights: types.MappingProxyType = dataclasses.field(default_factory=lambda: types.MappingProxyType({}))
+    game_paths: types.MappingProxyType = dataclasses.field(default_factory=lambda: types.MappingProxyType({}))
+
+    def changed(self, other):
+        """Names of the fields whose values differ between this and other."""
+        return [field.name for field in dataclasses.fields(self) if getattr(self, field.name) != getattr(other, field.name)]
+
+
+# (section, option in config.ini, Settings field, type) for every plain option
+_OPTIONS = (
+    ('General', 'min_time', 'min_time', int),
+    ('General', 'max_time', 'max_time', int),
+    ('General', 'selection', 'selection', str),
+    ('General', 'no_repeat', 'no_repeat', int),
+    ('General', 'lru_pool', 'lru_pool', int),
+    ('General', 'fair_slack', 'fair_slack', float),
+    ('General', 'watch_config', 'watch_config', bool),
+    ('General', 'seed', 'seed', str),
+    ('OBS', 'obs_integration', 'obs_integration', bool),
+    ('OBS', 'scene_name', 'scene_name', str),
+    ('OBS', 'extra_scenes', 'extra_scenes', tuple),
+    ('OBS', 'export_game_list', 'export_game_list', bool),
+    ('OBS', 'export_num_remaining', 'export_num_remaining', bool),
+    ('OBS', 'export_game_lines', 'export_game_lines', bool),
+    ('OBS', 'export_json', 'export_json', bool),
+    ('OBS', 'export_play_time', 'export_play_time', bool),
+    ('OBS', 'export_template', 'export_template', str),
+    ('OBS', 'export_debounce', 'export_debounce', float),
+    ('OBS', 'obs_port', 'obs_port', int),
+    ('OBS', 'obs_password', 'obs_password', str),
+    ('OBS', 'obs_async', 'obs_async', bool),
+    ('Hotkeys', 'pause_key', 'pause_key', str),
+    ('Hotkeys', 'completion_key', 'completion_key', str),
+    ('Hotkeys', 'undo_key', 'undo_key', str),
+    ('Hotkeys', 'redo_key', 'redo_key', str),
+    ('Hotkeys', 'start_key', 'start_key', str),
+    ('Session', 'resume_session', 'resume_session', bool),
+    ('Session', 'journal_file', 'journal_file', str),
+    ('Session', 'replay_log', 'replay_log', str),
+    ('Screenshots', 'screenshots', 'screenshots', bool),
+    ('Screenshots', 'screenshot_interval', 'screenshot_interval', float),
+    ('Screenshots', 'screenshot_max_per_second', 'screenshot_max_per_second', float),
+    ('Screenshots', 'screenshot_width', 'screenshot_width', int),
+    ('Screenshots', 'screenshot_height', 'screenshot_height', int),
+    ('Screenshots', 'screenshot_format', 'screenshot_format', str),
+    ('Screenshots', 'screenshot_dir', 'screenshot_dir', str),
+    ('Watchdog', 'watchdog', 'watchdog_enabled', bool),
+    ('Watchdog', 'watchdog_interval', 'watchdog_interval', float),
+    ('Watchdog', 'watchdog_samples', 'watchdog_samples', int),
+    ('Watchdog', 'watchdog_action', 'watchdog_action', str),
+    ('Metrics', 'metrics_port', 'metrics_port', int),
+    ('Metrics', 'metrics_log', 'metrics_log', str),
+    ('Control', 'control_port', 'control_port', int),
+    ('Instances', 'launch_dolphin', 'launch_dolphin', bool),
+    ('Instances', 'dolphin_path', 'dolphin_path', str),
+    ('Instances', 'dolphin_args', 'dolphin_args', str),
+    ('Instances', 'max_relaunches', 'max_relaunches', int),
+    ('Instances', 'hang_timeout', 'hang_timeout', float),
+)
+
+_GETTERS = {int: 'getint', float: 'getfloat', bool: 'getboolean', str: 'get', tuple: 'get'}
+
+
+def _split_list(text):
+    return tuple(item.strip() for item in text.split(',') if item.strip())
+
+
+def split_command_line(text):
+    """Split command line options like a shell would, except that backslashes (eg. in Windows paths) are kept."""
+    import shlex  # only needed when Dolphin is launched by the shuffler
+    return shlex.split(text.replace('\\', '\\\\'))
+
+
+def parse_settings(text):
+    """
+    Parse config.ini text into Settings. Raises ConfigError listing every invalid value, so one
+    edit can fix them all.
+    """
+    # No interpolation: a '%' in a game title, a path or a template is just a character
+    config = configparser.ConfigParser(interpolation=None)
+    problems = []
+    try:
+        config.read_string(text)
+    except configparser.Error as e:
+        raise ConfigError([str(e)]) from None
+
+    values = {}
+    for section, option, field, kind in _OPTIONS:
+        if not config.has_option(section, option):
+            continue
+        try:
+            value = getattr(config, _GETTERS[kind])(section, option)
+        except ValueError:
+            problems.append(f"[{section}] {option} = {config.get(section, option)!r} is not a valid {kind.__name__ if kind is not tuple else 'list'}")
+            continue
+        except configparser.Error as e:
+            problems.append(f"[{section}] {option}: {e}")
+            continue
+        values[field] = _split_list(value) if kind is tuple else value
+
+    targets = []
+    for section in config.sections():
+        if section.startswith('OBS Target '):
+            try:
+                port = config.getint(section, 'port', fallback=4455)
+            except ValueError:
+                problems.append(f"[{section}] port = {config.get(section, 'port')!r} is not a valid int")
+                continue
+            targets.append((
+                section[len('OBS Target '):],
+                config.get(section, 'host', fallback='localhost'),
+                port,
+                config.get(section, 'password', fallback=''),
+                _split_list(config.get(section, 'scenes', fallback='')) or (values.get('scene_name', Settings.scene_name),),
+            ))
+    values['obs_targets'] = tuple(targets)
+
+    # Games: load in order (sorted by key)
+    if config.has_section('Games'):
+        game_entries = sorted(config.items('Games'), key=lambda item: item[0])
+        values['games'] = tuple(value for key, value in game_entries)
+        # Weights are keyed like [Games] since game names can contain ':' and '='
+        weights = {}
+        for key, value in game_entries:
+            if config.has_option('Weights', key):
+                try:
+                    weights[value] = config.getfloat('Weights', key)
+                except ValueError:
+                    problems.append(f"[Weights] {key} = {config.get('Weights', key)!r} is not a valid float")
+        values['weights'] = types.MappingProxyType(weights)
+        values['game_paths'] = types.MappingProxyType({
+            value: config.get('Paths', key) for key, value in game_entries
+            if config.has_option('Paths', key) and config.get('Paths', key).strip()
+        })
+
+    # Values that could not be read keep their defaults, so the remaining checks still run
+    settings = Settings(**values)
+    problems += find_problems(settings)
+    if problems:
+        raise ConfigError(problems)
+    return settings
+
+
+def find_problems(settings):
+    """Return a description of every value that is out of range or inconsistent with another."""
+    problems = []
+    if settings.min_time < 1:
+        problems.append(f"[General] min_time must be at least 1 second (got {settings.min_time})")
+    if settings.min_time >= settings.max_time:
+        problems.append(f"[General] min_time ({settings.min_time}) must be less than max_time ({settings.max_time})")
+    if settings.selection not in STRATEGIES:
+        problems.append(f"[General] selection = {settings.selection!r} must be one of: {', '.join(STRATEGIES)}")
+    if settings.no_repeat < 0:
+        problems.append("[General] no_repeat must not be negative")
+    if settings.lru_pool < 1:
+        problems.append("[General] lru_pool must be at least 1")
+    if settings.fair_slack <= 0:
+        problems.append("[General] fair_slack must be greater than 0")
+    if settings.export_debounce < 0:
+        problems.append("[OBS] export_debounce must not be negative")
+    for name, port in [('[OBS] obs_port', settings.obs_port)] + [(f"[OBS Target {target[0]}] port", target[2]) for target in settings.obs_targets]:
+        if not 0 < port < 65536:
+            problems.append(f"{name} = {port} is not a valid port")
+    if not 0 <= settings.metrics_port < 65536:
+        problems.append(f"[Metrics] metrics_port = {settings.metrics_port} is not a valid port")
+    if not 0 <= settings.control_port < 65536:
+        problems.append(f"[Control] control_port = {settings.control_port} is not a valid port")
+    if settings.control_port and settings.control_port == settings.metrics_port:
+        problems.append("[Control] control_port and [Metrics] metrics_port must be different ports")
+    if settings.launch_dolphin and not settings.dolphin_path:
+        problems.append("[Instances] dolphin_path must point to Dolphin.exe when launch_dolphin is on")
+    if settings.launch_dolphin and not settings.game_paths:
+        problems.append("[Instances] launch_dolphin is on but [Paths] lists no game files")
+    try:
+        split_command_line(settings.dolphin_args)
+    except ValueError as e:
+        problems.append(f"[Instances] dolphin_args = {settings.dolphin_args!r} cannot be split into options: {e}")
+    if settings.max_relaunches < 0 or settings.hang_timeout < 0:
+        problems.append("[Instances] max_relaunches and hang_timeout must not be negative")
+    for option in ('pause_key', 'completion_key', 'undo_key', 'start_key'):
+        if not getattr(settings, option):
+            problems.append(f"[Hotkeys] {option} must not be empty")
+    if settings.screenshot_interval <= 0 or settings.screenshot_max_per_second <= 0:
+        problems.append("[Screenshots] screenshot_interval and screenshot_max_per_second must be greater than 0")
+    if settings.screenshot_width <= 0 or settings.screenshot_height <= 0:
+        problems.append("[Screenshots] screenshot_width and screenshot_height must be greater than 0")
+    if settings.screenshot_format not in SCREENSHOT_FORMATS:
+        problems.append(f"[Screenshots] screenshot_format = {settings.screenshot_format!r} must be one of: {', '.join(SCREENSHOT_FORMATS)}")
+    if settings.watchdog_interval <= 0 or settings.watchdog_samples < 1:
+        problems.append("[Watchdog] watchdog_interval must be greater than 0 and watchdog_samples at least 1")
+    if settings.watchdog_action not in WATCHDOG_ACTIONS:
+        problems.append(f"[Watchdog] watchdog_action = {settings.watchdog_action!r} must be one of: {', '.join(WATCHDOG_ACTIONS)}")
+    if not settings.games:
+        problems.append("[Games] lists no games")
+    duplicates = sorted({game for game in settings.games if settings.games.count(game) > 1})
+    if duplicates:
+        problems.append(f"[Games] lists the same game more than once: {', '.join(duplicates)}")
+    negative = [game for game, weight in settings.weights.items() if weight < 0]
+    if negative:
+        problems.append(f"[Weights] weights must not be negative: {', '.join(negative)}")
+    return problems
+
+
+def load_settings(filename):
+    """Read and validate a config file. Raises ConfigError (or OSError if it cannot be read)."""
+    with open(filename, encoding='utf-8') as config_file:
+        return parse_settings(config_file.read())
+
+
+class ConfigWatcher:
+    """
+    Reloads config.ini when it changes on disk.
+
+    A background thread compares the file's modification time and size every `interval` seconds,
+    which costs one stat() call. A change is only read once the file has stopped changing for one
+    interval, so a half-saved file is not picked up. Valid settings are passed to
+    on_change(settings) on the watcher thread; invalid ones are reported and ignored, keeping the
+    settings that are in use.
+    """
+    def __init__(self, filename, on_change, interval=1.0, log=print):
+        self.filename = filename
+        self.on_change = on_change
+        self.interval = interval
+        self.log = log
+        self.reloads = 0
+        self.rejected = 0
+        self._stat = self._read_stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_stat(self):
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.interval):
+            stat = self._read_stat()
+            if stat is None or stat == self._stat:
+                pending = None
+                continue
+            if stat != pending:
+                pending = stat  # changed since the last look; wait for it to settle
+                continue
+            self._stat, pending = stat, None
+            self.check()
+
+    def check(self):
+        """Read the file now. Returns the new Settings, or None if it was invalid."""
+        try:
+            settings = load_settings(self.filename)
+        except (ConfigError, OSError, UnicodeDecodeError) as e:
+            self.rejected += 1
+            self.log(f"Ignoring the changes to {self.filename}, keeping the current settings:\n{e}")
+            return None
+        self.reloads += 1
+        self.on_change(settings)
+        return settings
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
@@ -0,0 +1,318 @@
+import time
+from play_time import PlayTimeTracker
+from schedule import ShuffleSchedule
+from scheduler import START, PAUSE, COMPLETE, UNDO, REDO, REFOCUS, RELOAD, SWAP
+
+
+class ShuffleSession:
+    """
+    The shuffler's main loop, with every outside dependency passed in.
+
+    shuffler.main() builds one from config.ini with the Windows backends, real clock and OBS;
+    simulation.py builds one from fake backends and a virtual clock. The loop itself does not
+    know the difference.
+    """
+    def __init__(self, games, game_store, selection_strategy, window_registry, focus_controller, scheduler,
+                 export_writer=None, obs_control=None, scene_name=None, metrics=None,
+                 journal=None, play_time=None, min_time=10, max_time=30, countdown=5, schedule=None, log=print,
+                 on_reload=None, prefetch=True):
+        self.games = games
+        self.game_store = game_store
+        self.selection_strategy = selection_strategy
+        self.window_registry = window_registry
+        self.focus_controller = focus_controller
+        self.scheduler = scheduler
+        self.export_writer = export_writer
+        self.obs_control = obs_control
+        self.scene_name = scene_name
+        self.metrics = metrics
+        self.journal = journal
+        self.play_time = play_time or PlayTimeTracker(scheduler.clock)
+        self.min_time = min_time
+        self.max_time = max_time
+        self.countdown = countdown
+        # Seeded picks and durations; the selection strategy should draw from schedule.pick_rng
+        self.schedule = schedule or ShuffleSchedule()
+        # Pick the next game right after a swap and get its window and OBS source ready in the meantime
+        self.prefetch = prefetch
+        self.log = log
+        # Called on the main loop when the scheduler delivers RELOAD (config.ini changed)
+        self.on_reload = on_reload
+
+        self.current_game = None
+        self.current_window = None
+        self.previous_window = None
+        self.swaps = 0
+        # Called with the new game after every swap (None once the shuffle is over), eg. by the watchdog
+        self.swap_listeners = []
+        # Called with the state dictionary whenever it changes, eg. by the control API
+        self.state_listeners = []
+
+    # -------------------------------------------------
+    # GAME STATE
+    # -------------------------------------------------
+
+    def state(self):
+        """Snapshot of the shuffle for the exports and the control API."""
+        remaining = self.game_store.active_games()
+        completed = self.game_store.completed_games()
+        time_remaining = self.scheduler.time_remaining()
+        return {
+            'current': self.current_game or '',
+            'remaining': remaining,
+            'completed': completed,
+            'num_remaining': self.game_store.active_count,
+            'num_completed': self.game_store.completed_count,
+            'num_games': len(self.games),
+            'paused': self.scheduler.paused,
+            'time_remaining': round(time_remaining, 1) if time_remaining is not None else None,
+            # Wall-clock time of the next swap, so overlays can count down on their own
+            'deadline': round(time.time() + time_remaining, 3) if time_remaining is not None and not self.scheduler.paused else None,
+            **self.play_time.stats(self.games, remaining),
+        }
+
+    def update_exports(self):
+        if self.export_writer is None and not self.state_listeners:
+            return
+        state = self.state()
+        if self.export_writer is not None:
+            self.export_writer.submit(state)
+        for listener in self.state_listeners:
+            listener(state)
+
+    def mark_game_as_done(self, current_game):
+        if self.game_store.complete(current_game):
+            if self.journal is not None:
+                self.journal.record_complete(current_game)
+            self.log(f"{current_game} marked as done and removed from the pool.")
+            self.update_exports()
+        else:
+            self.log(f"{current_game} is not active or already completed.")
+
+    def undo_last_completion(self):
+        last_completed = self.game_store.undo()
+        if last_completed is not None:
+            if self.journal is not None:
+                self.journal.record_undo(last_completed)
+            self.log(f"Undo: {last_completed} moved back to active games.")
+            self.update_exports()
+        else:
+            self.log("No games to undo.")
+
+    def redo_last_undo(self):
+        redone = self.game_store.redo()
+        if redone is not None:
+            if self.journal is not None:
+                self.journal.record_redo(redone)
+            self.log(f"Redo: {redone} marked as done again.")
+            self.update_exports()
+        else:
+            self.log("No undo to redo.")
+
+    def handle_event(self, event, current_game):
+        """Apply a hotkey event returned by the scheduler to the current game."""
+        if event == COMPLETE:
+            self.mark_game_as_done(current_game)
+        elif event == UNDO:
+            self.undo_last_completion()
+        elif event == REDO:
+            self.redo_last_undo()
+        elif event == REFOCUS:
+            self.refocus()
+        elif event == RELOAD:
+            if self.on_reload is not None:
+                self.on_reload()
+        elif event == PAUSE:
+            if self.scheduler.paused:
+                self.play_time.pause()
+                self.log("Shuffler paused.")
+            else:
+                self.play_time.resume()
+                self.log("Shuffler resumed.")
+            self.update_exports()
+
+    def set_games(self, games):
+        """
+        Switch to a new game list mid-session. Completion state, play time and the window index are
+        kept for games in both lists, and only the differences are applied. Returns (added, removed).
+        """
+        added, removed = self.game_store.set_games(games)
+        self.games = list(games)
+        self.window_registry.set_games(self.games)
+        self.selection_strategy.set_games(self.games)
+        self.update_exports()
+        return added, removed
+
+    def refocus(self):
+        """Bring the current game's window to the foreground again, eg. when it did not resume after a swap."""
+        if self.current_window is not None:
+            self.log(f"Re-focusing {self.current_window[1]}.")
+            self.focus_controller.switch(self.current_window[0], None)
+
+    def get_dolphin_windows(self):
+        self.window_registry.refresh()
+        return self.window_registry.windows()
+
+    def _record_swap(self, game, tenths=None):
+        """
+        Move the play-time clock to game (None at the end), credit the previous game's time and notify
+        listeners. tenths is how long the swap is scheduled to last (None when only one game is left).
+        """
+        for listener in self.swap_listeners:
+            listener(game)
+        previous, played = self.play_time.switch(game)
+        if previous is not None:
+            self.selection_strategy.credit(previous, played)
+        self.schedule.record_swap(game, played, tenths)
+        if self.journal is not None:
+            self.journal.record_swap(game, previous, played)
+
+    def _dispatch(self, event, current_game):
+        """Record a key event for replays and handle it."""
+        self.schedule.record_event(event, self.scheduler.time_remaining())
+        self.handle_event(event, current_game)
+
+    def _prepare_next(self, current_game, dolphin_windows):
+        """Pick the game after current_game now and warm up its window wrapper and OBS scene item."""
+        next_game = self.schedule.plan(self.selection_strategy, current_game)
+        if next_game is None:
+            return
+        hwnd = next((hwnd for hwnd, game in dolphin_windows if game == next_game), None)
+        if hwnd is not None:
+            self.focus_controller.prepare(hwnd)
+        # Only queues the scene item lookup: the fanout runs it on its target threads, OBSController on a
+        # background thread and the asynchronous client on its loop. Controllers without warm_up are skipped.
+        warm_up = getattr(self.obs_control, 'warm_up', None)
+        if warm_up is not None:
+            warm_up(self.scene_name, next_game)
+
+    def _span(self, name):
+        return self.metrics.span(name) if self.metrics is not None else _NO_SPAN
+
+    # -------------------------------------------------
+    # MAIN LOOP
+    # -------------------------------------------------
+
+    def wait_for_start(self, start_key):
+        self.log(f"Shuffler is paused. Press '{start_key}' to start.")
+        while (event := self.scheduler.wait()) != START:
+            self.handle_event(event, None)
+
+        # Countdown before starting; the first (cold) window scan runs during it rather than after it
+        clock = self.scheduler.clock
+        countdown_end = clock.now() + self.countdown
+        for i in range(self.countdown, 0, -1):
+            self.log(f"Starting in {i}...")
+            if i == self.countdown:
+                self.get_dolphin_windows()
+            self.scheduler.sleep(countdown_end - (i - 1) - clock.now())
+        self.log("Shuffler starting!")
+
+    def start(self):
+        """Hide every game source and write the initial exports."""
+        if self.obs_control is not None:
+            initial_dolphin_windows = self.get_dolphin_windows()
+            self.obs_control.apply_visibility(self.scene_name, None, [game for hwnd, game in initial_dolphin_windows])
+        self.update_exports()
+
+    def step(self):
+        """Run one swap (or one key event when a single game is left). Returns False once every game is done."""
+        swap_started = time.perf_counter()
+        with self._span("enumerate"):
+            dolphin_windows = self.get_dolphin_windows()
+
+        # Filter active windows based on game status
+        active_windows = [w for w in dolphin_windows if w[1] in self.game_store.active]
+
+        if len(active_windows) == 0:
+            self.log("No active games remaining.")
+            self.log(f"Swap latency: {self.focus_controller.latency.summary()}")
+            self._record_swap(None)
+            self.current_game = self.current_window = None
+            self.update_exports()
+            return False
+
+        # Choose a random active window (or the only one available)
+        if len(active_windows) == 1:
+            selected_window = active_windows[0]
+            selected_handle, selected_game = selected_window
+
+            # If this is the first iteration or if the active game has changed, swap once.
+            if self.previous_window is None or selected_handle != self.previous_window[0]:
+                self.log(f"Only one active game remains: {selected_game}")
+                self.focus_controller.switch(selected_handle, self.previous_window[0] if self.previous_window else None)
+                self._record_swap(selected_game)
+                self.previous_window = self.current_window = selected_window
+                self.current_game = selected_game
+                self.update_exports()
+
+            # Instead of re-swapping, just wait for the next key event.
+            self.scheduler.clear_timer()
+            self._dispatch(self.scheduler.wait(), selected_game)
+            return True
+
+        # Pick straight from the eligible games, excluding the one currently playing
+        with self._span("select"):
+            self.selection_strategy.sync(game for hwnd, game in active_windows)
+            selected_game = self.schedule.take(self.selection_strategy, self.previous_window[1] if self.previous_window else None)
+            selected_window = next((w for w in active_windows if w[1] == selected_game), None)
+            if selected_window is None:
+                # Nothing the strategy may pick (e.g. every other game weighted 0): take any other window
+                selected_window = self.selection_strategy.rng.choice([w for w in active_windows if w != self.previous_window])
+        selected_handle, selected_game = selected_window
+        self.selection_strategy.played(selected_game)
+        # How long the new game stays on screen, in tenths of a second
+        time_to_switch = self.schedule.commit(self.min_time, self.max_time)
+
+        # Print the game name to indicate what will be swapped to
+        self.log(f"Swapping to: {selected_game}")
+        self.current_game = selected_game
+
+        # Bring the new window to the foreground, then minimize the previous window if it exists
+        self.focus_controller.switch(selected_handle, self.previous_window[0] if self.previous_window else None)
+        self.current_window = selected_window
+        self._record_swap(selected_game, time_to_switch)
+
+        # Set OBS sources' visibility if OBS integration is enabled. With several scenes or instances this
+        # only queues the change for the fanout threads, which time each send as obs_visibility.<target>.
+        if self.obs_control is not None:
+            with self._span("obs_submit"):
+                self.obs_control.apply_visibility(self.scene_name, selected_game, [game for hwnd, game in dolphin_windows])
+
+        # The timer starts before the exports are written so they carry the new deadline
+        self.log(f"Switching in {time_to_switch / 10} seconds.")
+        self.scheduler.start_timer(time_to_switch / 10)
+
+        with self._span("export"):
+            self.update_exports()
+        self.swaps += 1
+        if self.metrics is not None:
+            self.metrics.observe("swap", time.perf_counter() - swap_started, game=selected_game)
+            self.metrics.set_gauge("games_remaining", self.game_store.active_count)
+
+        if self.prefetch:
+            with self._span("prefetch"):
+                self._prepare_next(selected_game, active_windows)
+
+        # Handle key events until the swap deadline (pausing freezes the remaining time)
+        while (event := self.scheduler.wait()) != SWAP:
+            self._dispatch(event, selected_game)
+
+        self.previous_window = selected_window
+        return True
+
+    def run(self):
+        """Run swaps until no active games remain."""
+        self.start()
+        while self.step():
+            pass
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_SPAN = _NoSpan()
@@ -1,15 +1,17 @@
-import time
-import win32gui
-import win32con
-import random
-import ctypes
-import keyboard
-import pywinauto
-import configparser
 import os
-from pywinauto.application import Application
-from collections import deque
-from OBS_Websocket_Encapsulation import OBSController
+import threading
+from scheduler import ShuffleScheduler, START, PAUSE, COMPLETE, UNDO, REDO, SKIP, RELOAD
+from shuffle_session import ShuffleSession
+from game_store import GameStore
+from journal import SessionJournal
+from play_time import PlayTimeTracker
+from schedule import ShuffleSchedule, session_header
+from selection import create_strategy
+from exports import ExportWriter, render_game_list, render_num_remaining, render_game_lines, render_json, render_play_time, template_renderer
+from window_registry import WindowRegistry
+from focus import FocusController
+from metrics import Metrics
+from settings import ConfigError, ConfigWatcher, load_settings
 
 # -------------------------------------------------
 # CONFIGURATION HANDLING
@@ -27,20 +29,55 @@ def create_default_config(filename):
 min_time = 10
 ; Maximum time to shuffle (in seconds)
 max_time = 30
+; How the next game is picked: uniform, weighted (uses [Weights]), least_recent or fair (least played first)
+selection = uniform
+; Number of most recently played games to skip when picking (0 = only skip the current game)
+no_repeat = 0
+; For least_recent: pick randomly among this many of the longest-waiting games
+lru_pool = 3
+; For fair: games within this many seconds of play time are treated as tied and picked between randomly
+fair_slack = 30
+; Apply changes to this file while the shuffler is running (timings, games, selection, exports); other changes need a restart
+watch_config = True
+; Seed for the shuffle: the same seed and the same key presses give the same games and timings (leave empty for a new shuffle every run)
+seed =
 
 [OBS]
 ; Set to True to enable OBS integration (set to False to run without OBS)
 obs_integration = False
 ; OBS scene name containing all Dolphin windows
 scene_name = Dolphin Shuffler
+; More scenes on the same OBS that mirror the active game, comma-separated (eg. Vertical, Replay)
+extra_scenes =
 ; Export list of active games to a text file
 export_game_list = False
 ; Export number of active games to a text file
 export_num_remaining = False
+; Export the remaining games one per line to remaining_games_lines.txt
+export_game_lines = False
+; Export the full shuffler state as JSON to shuffler_state.json (for browser overlays)
+export_json = False
+; Export each game's accumulated play time to play_time.txt
+export_play_time = False
+; Custom text export written to custom_export.txt, eg. {num_remaining} left - now playing {current}
+; Available fields: {current}, {num_remaining}, {num_completed}, {num_games}, {remaining}, {completed}, {play_time_spread}
+export_template =
+; Seconds to wait for rapid changes to settle before writing the exports
+export_debounce = 0.25
 ; Advanced setting: OBS WebSocket port (default is 4455)
 obs_port = 4455
 ; Advanced setting: OBS WebSocket password (if any)
 obs_password =
+; Advanced setting: send OBS requests from a background asyncio client so they never delay swaps
+obs_async = False
+
+; To mirror the active game into another OBS instance, add a section per instance, eg.
+; [OBS Target Second PC]
+; host = 192.168.1.20
+; port = 4455
+; password =
+; scenes = Dolphin Shuffler, Vertical
+; Every target is updated at the same time, and a slow or offline one never delays a swap.
 
 [Hotkeys]
 ; Key to pause/unpause the shuffler
@@ -49,9 +86,68 @@ pause_key = p
 completion_key = space
 ; Key to undo the last action
 undo_key = u
+; Key to redo the last undone completion (leave empty to disable)
+redo_key =
 ; Key to start the shuffler
 start_key = s
 
+[Session]
+; Pick up where the last run left off (completed games, undo history, play time) after a crash or restart
+resume_session = True
+; Journal file the session is saved to (leave empty to disable saving)
+journal_file = shuffler_session.jsonl
+; Record the seed, every swap and every key press to this file, so the run can be replayed with python schedule.py <file> (leave empty to disable)
+replay_log =
+
+[Screenshots]
+; Save a thumbnail of every game source every few seconds, eg. for an overlay grid (needs OBS integration)
+screenshots = False
+; Seconds between two thumbnails of the same game
+screenshot_interval = 10
+; Upper limit on thumbnails per second across all games
+screenshot_max_per_second = 2
+; Thumbnail size (OBS scales the image down before sending it) and format (png or jpg)
+screenshot_width = 320
+screenshot_height = 180
+screenshot_format = png
+; Folder the thumbnails are written to, one file per game
+screenshot_dir = thumbnails
+
+[Watchdog]
+; Watch the game on screen through tiny OBS thumbnails and step in when it is frozen or black (needs OBS integration and numpy)
+watchdog = False
+; Seconds between two checks of the game on screen
+watchdog_interval = 1
+; Checks in a row that must look frozen or black before the watchdog acts
+watchdog_samples = 5
+; refocus = bring the window to the front again first, and skip if that did not help; skip = switch to another game straight away
+watchdog_action = refocus
+
+[Metrics]
+; Port for a local Prometheus-style metrics endpoint at http://127.0.0.1:<port>/metrics (0 = disabled)
+metrics_port = 0
+; File to append per-swap timing spans to as JSON lines (leave empty to disable)
+metrics_log =
+
+[Control]
+; Port for a local control API at http://127.0.0.1:<port> (0 = disabled). Overlays can connect a WebSocket to
+; receive the current game, remaining games, swap deadline and play time as they change, or read /state;
+; scripts and stream decks can POST to /command/<name> with complete, undo, redo, pause, skip, refocus or start
+control_port = 0
+
+[Instances]
+; Start a Dolphin for every game with a file in [Paths] (games are found by their process instead of their window title)
+; and watch them: a Dolphin that crashes or stops responding is started again. Leave False to start Dolphin yourself.
+launch_dolphin = False
+; Path to Dolphin.exe
+dolphin_path =
+; Command line options passed to Dolphin before the game file; -b closes Dolphin when its game is stopped
+dolphin_args = -b
+; Times a crashed Dolphin is started again before its game is left to you
+max_relaunches = 3
+; Seconds a Dolphin window may stop responding before it is closed and started again (0 = never)
+hang_timeout = 30
+
 [Games]
 ; List the games to be included in the shuffler.
 ; Add or remove games as needed.
@@ -60,308 +156,524 @@ game2 = Mario Kart: Double Dash!!
 game3 = Mario Superstar Baseball
 game4 = Mario Power Tennis
 game5 = Super Mario Strikers
+
+[Weights]
+; Optional per-game weights for selection = weighted, keyed like [Games] (default weight is 1).
+; eg. game2 = 2 makes game2 twice as likely to be picked as a game with weight 1.
+
+[Paths]
+; Game files (ISO, RVZ, ...) for launch_dolphin, keyed like [Games], eg.
+; game1 = D:\\Games\\Mario Golf - Toadstool Tour.rvz
 """
     with open(filename, 'w') as configfile:
         configfile.write(default_config_text)
     print(f"Default configuration file '{filename}' created.")
 
-# If no config exists, generate one.
-if not os.path.exists(CONFIG_FILE):
-    create_default_config(CONFIG_FILE)
-
-# Load configuration
-config = configparser.ConfigParser()
-config.read(CONFIG_FILE)
-
-# -------------------------------------------------
-# LOAD SETTINGS FROM CONFIG
-# -------------------------------------------------
-
-# General settings
-MIN_TIME = config.getint('General', 'min_time', fallback=10)
-MAX_TIME = config.getint('General', 'max_time', fallback=30)
-
-# OBS settings
-OBS_INTEGRATION = config.getboolean('OBS', 'obs_integration', fallback=True)
-SCENE_NAME = config.get('OBS', 'scene_name', fallback="Dolphin Shuffler")
-EXPORT_GAME_LIST = config.getboolean('OBS', 'export_game_list', fallback=True)
-EXPORT_NUM_REMAINING = config.getboolean('OBS', 'export_num_remaining', fallback=True)
-obs_port = config.get('OBS', 'obs_port', fallback='4455')
-obs_password = config.get('OBS', 'obs_password', fallback='')
-
-# Hotkey settings
-PAUSE_KEY = config.get('Hotkeys', 'pause_key', fallback='p')
-COMPLETION_KEY = config.get('Hotkeys', 'completion_key', fallback='space')
-UNDO_KEY = config.get('Hotkeys', 'undo_key', fallback='u')
-START_KEY = config.get('Hotkeys', 'start_key', fallback='s')
-
-# Games: load in order (sorted by key)
-games = []
-if config.has_section('Games'):
-    games = [value for key, value in sorted(config.items('Games'), key=lambda item: item[0])]
-else:
-    games = [
-        "Mario Golf: Toadstool Tour",
-        "Mario Kart: Double Dash!!",
-        "Mario Superstar Baseball",
-        "Mario Power Tennis",
-        "Super Mario Strikers"
-    ]
 
 # -------------------------------------------------
-# PRINT LOADED CONFIGURATION
+# SHUFFLER APP
 # -------------------------------------------------
 
-print("==========================================")
-print("Configuration Loaded:")
-print("---------- General ----------")
-print(f"MIN_TIME: {MIN_TIME} seconds")
-print(f"MAX_TIME: {MAX_TIME} seconds")
-print("---------- OBS ----------")
-print(f"OBS_INTEGRATION: {OBS_INTEGRATION}")
-print(f"SCENE_NAME: {SCENE_NAME}")
-print(f"EXPORT_GAME_LIST: {EXPORT_GAME_LIST}")
-print(f"EXPORT_NUM_REMAINING: {EXPORT_NUM_REMAINING}")
-print(f"OBS Port: {obs_port}")
-print(f"OBS Password: {'(hidden)' if obs_password else '(none)'}")
-print("---------- Hotkeys ----------")
-print(f"PAUSE_KEY: {PAUSE_KEY}")
-print(f"COMPLETION_KEY: {COMPLETION_KEY}")
-print(f"UNDO_KEY: {UNDO_KEY}")
-print(f"START_KEY: {START_KEY}")
-print("---------- Games ----------")
-for idx, game in enumerate(games, start=1):
-    print(f"Game {idx}: {game}")
-print("==========================================\n")
-
-
-# -------------------------------------------------
-# INITIALIZE GAME STATUS
-# -------------------------------------------------
+class ShufflerApp:
+    """
+    Builds and runs the shuffler from config.ini.
+
+    Nothing happens on import: the config file is read by load_config(), the components are built
+    by build(), and heavy or Windows-only modules (keyboard, pywinauto, the OBS clients) are only
+    imported once they are needed. OBS connects on a background thread while the shuffler waits for
+    the start key, and the first window scan runs during the countdown.
+    """
+    def __init__(self, config_file=CONFIG_FILE):
+        self.config_file = config_file
+        self.obs_control = None
+        self.screenshot_pipeline = None
+        self.watchdog = None
+        self.control_server = None
+        self.instances = None
+        self.config_watcher = None
+        self._pending_settings = None
+        self._obs_thread = None
+
+    # -------------------------------------------------
+    # LOAD SETTINGS FROM CONFIG
+    # -------------------------------------------------
+
+    def load_config(self):
+        """Read and validate config.ini into self.settings. Raises settings.ConfigError listing every problem."""
+        # If no config exists, generate one.
+        if not os.path.exists(self.config_file):
+            create_default_config(self.config_file)
+        self.settings = load_settings(self.config_file)
+
+    def print_config(self):
+        print("==========================================")
+        print("Configuration Loaded:")
+        print("---------- General ----------")
+        print(f"MIN_TIME: {self.settings.min_time} seconds")
+        print(f"MAX_TIME: {self.settings.max_time} seconds")
+        print(f"SELECTION: {self.settings.selection} (no_repeat={self.settings.no_repeat}, lru_pool={self.settings.lru_pool}, fair_slack={self.settings.fair_slack})")
+        print(f"SEED: {self.settings.seed or '(new every run)'}")
+        print("---------- OBS ----------")
+        print(f"OBS_INTEGRATION: {self.settings.obs_integration}")
+        print(f"SCENE_NAME: {self.settings.scene_name}")
+        print(f"EXTRA_SCENES: {', '.join(self.settings.extra_scenes) or '(none)'}")
+        print(f"EXPORT_GAME_LIST: {self.settings.export_game_list}")
+        print(f"EXPORT_NUM_REMAINING: {self.settings.export_num_remaining}")
+        print(f"EXPORT_GAME_LINES: {self.settings.export_game_lines}")
+        print(f"EXPORT_JSON: {self.settings.export_json}")
+        print(f"EXPORT_PLAY_TIME: {self.settings.export_play_time}")
+        print(f"EXPORT_TEMPLATE: {self.settings.export_template or '(none)'}")
+        print(f"OBS Port: {self.settings.obs_port}")
+        print(f"OBS Password: {'(hidden)' if self.settings.obs_password else '(none)'}")
+        print(f"OBS_ASYNC: {self.settings.obs_async}")
+        for name, host, port, password, scenes in self.settings.obs_targets:
+            print(f"OBS Target '{name}': {host}:{port}, scenes: {', '.join(scenes)}")
+        print("---------- Hotkeys ----------")
+        print(f"PAUSE_KEY: {self.settings.pause_key}")
+        print(f"COMPLETION_KEY: {self.settings.completion_key}")
+        print(f"UNDO_KEY: {self.settings.undo_key}")
+        print(f"REDO_KEY: {self.settings.redo_key or '(disabled)'}")
+        print(f"START_KEY: {self.settings.start_key}")
+        print("---------- Session ----------")
+        print(f"RESUME_SESSION: {self.settings.resume_session}")
+        print(f"JOURNAL_FILE: {self.settings.journal_file or '(disabled)'}")
+        print(f"REPLAY_LOG: {self.settings.replay_log or '(disabled)'}")
+        print("---------- Screenshots ----------")
+        print(f"SCREENSHOTS: {self.settings.screenshots}")
+        if self.settings.screenshots:
+            print(f"SCREENSHOT_INTERVAL: {self.settings.screenshot_interval} seconds (max {self.settings.screenshot_max_per_second}/s)")
+            print(f"SCREENSHOT_SIZE: {self.settings.screenshot_width}x{self.settings.screenshot_height} {self.settings.screenshot_format}")
+            print(f"SCREENSHOT_DIR: {self.settings.screenshot_dir}")
+        print("---------- Watchdog ----------")
+        print(f"WATCHDOG: {self.settings.watchdog_enabled}")
+        if self.settings.watchdog_enabled:
+            print(f"WATCHDOG_CHECKS: {self.settings.watchdog_samples} x {self.settings.watchdog_interval} seconds, then {self.settings.watchdog_action}")
+        print("---------- Metrics ----------")
+        print(f"METRICS_PORT: {self.settings.metrics_port or '(disabled)'}")
+        print(f"METRICS_LOG: {self.settings.metrics_log or '(disabled)'}")
+        print("---------- Control ----------")
+        print(f"CONTROL_PORT: {self.settings.control_port or '(disabled)'}")
+        print("---------- Instances ----------")
+        print(f"LAUNCH_DOLPHIN: {self.settings.launch_dolphin}")
+        if self.settings.launch_dolphin:
+            print(f"DOLPHIN: {self.settings.dolphin_path} {self.settings.dolphin_args}")
+            print(f"RELAUNCH: up to {self.settings.max_relaunches} times per game, after {self.settings.hang_timeout:g} seconds not responding")
+        print("---------- Games ----------")
+        for idx, game in enumerate(self.settings.games, start=1):
+            print(f"Game {idx}: {game}" + (f" (weight {self.settings.weights[game]})" if game in self.settings.weights else "")
+                  + (f" [{self.settings.game_paths[game]}]" if self.settings.launch_dolphin and game in self.settings.game_paths else ""))
+        print("==========================================\n")
+
+    # -------------------------------------------------
+    # INITIALIZE GAME STATUS
+    # -------------------------------------------------
+
+    def build(self, window_backend=None):
+        """Create every component from the loaded settings. OBS is left to start_obs()."""
+        # Timing spans for every phase of a swap, optionally served over HTTP and logged as JSON lines
+        self.metrics = Metrics(log_path=self.settings.metrics_log or None)
+        if self.settings.metrics_port:
+            try:
+                self.metrics.serve(self.settings.metrics_port)
+            except OSError as e:
+                print(f"Failed to start the metrics endpoint on port {self.settings.metrics_port}: {e}")
+
+        # Tracks which games are still active, with undo/redo of completions
+        self.game_store = GameStore(self.settings.games)
+
+        # Every completion, undo and swap is journaled; resuming reads the last snapshot plus a short tail
+        self.journal = None
+        if self.settings.journal_file:
+            self.journal = SessionJournal(self.settings.journal_file, self.game_store)
+            if self.journal.open(resume=self.settings.resume_session):
+                if self.game_store.active_count:
+                    print(f"Resumed previous session: {self.game_store.completed_count}/{len(self.game_store)} "
+                          f"games completed, {self.journal.swaps} swaps so far.")
+                else:
+                    print("Previous session was finished; starting a new one.")
+                    self.journal.reset()
 
-# Each game is stored as a tuple (game title, status) where status: True = Active, False = Completed
-game_statuses = deque([(game, True) for game in games])
-completed_games = deque()
+        # Hotkey events are queued here and the main loop waits on it instead of polling
+        self.scheduler = ShuffleScheduler()
 
-# Variables to store the shuffler state
-mark_done = False
-undo_done = False
-pause_active = False
-start_triggered = False
+        # On-screen time per game, not counting pauses, carried over from a resumed session
+        self.play_time = PlayTimeTracker(self.scheduler.clock, self.journal.play_time if self.journal else None)
 
-# Initialize OBSController if OBS integration is enabled
-if OBS_INTEGRATION:
-    obs_control = OBSController(port=int(obs_port), password=obs_password)
+        # Every random choice comes from one seed, so a shuffle can be repeated and replayed
+        self.schedule = ShuffleSchedule(self.settings.seed)
+        print(f"Shuffle seed: {self.schedule.seed} (set seed = {self.schedule.seed} in [General] to get this shuffle again)")
 
-# -------------------------------------------------
-# EVENT HANDLERS
-# -------------------------------------------------
+        # Picks the next game from the games that are active and have a window
+        self.selection_strategy = self._create_strategy()
 
-def on_completion_press(e):
-    global mark_done, pause_active
-    if pause_active:  # Ignore if paused
-        return
-    mark_done = True
-
-def on_undo_press(e):
-    global undo_done, pause_active
-    if pause_active:
-        return
-    undo_done = True
-
-def on_pause_press(e):
-    global pause_active
-    pause_active = not pause_active
-    if pause_active:
-        print("Shuffler paused.")
-    else:
-        print("Shuffler resumed.")
-
-def on_start_press(e):
-    global start_triggered
-    start_triggered = True
+        # Text exports are written off the main loop, coalesced and only when their content changes
+        self.export_writer = self._create_export_writer()
 
-# -------------------------------------------------
-# UTILITY FUNCTIONS
-# -------------------------------------------------
+        # Index of open Dolphin windows by game, refreshed incrementally from the window list
+        if window_backend is None:
+            from platform_backend import Win32WindowBackend
+            window_backend = Win32WindowBackend()
+        if self.settings.launch_dolphin:
+            # Dolphins started by the shuffler are known by process id; start_instances() launches them
+            self.window_registry = self.instances = self._create_instance_manager(window_backend)
+        else:
+            self.window_registry = WindowRegistry(self.settings.games, window_backend)
+
+        # Switches the foreground window, reusing per-window wrappers, and measures swap latency
+        self.focus_controller = FocusController(window_backend, metrics=self.metrics)
+
+        self.session = ShuffleSession(
+            list(self.settings.games), self.game_store, self.selection_strategy, self.window_registry,
+            self.focus_controller, self.scheduler,
+            export_writer=self.export_writer,
+            scene_name=self.settings.scene_name,
+            metrics=self.metrics,
+            journal=self.journal,
+            play_time=self.play_time,
+            min_time=self.settings.min_time,
+            max_time=self.settings.max_time,
+            schedule=self.schedule,
+            on_reload=self.apply_pending_settings,
+        )
+        if self.settings.replay_log:
+            self.schedule.open_log(self.settings.replay_log, session_header(
+                self.session, self.settings.selection, weights=self.settings.weights, no_repeat=self.settings.no_repeat,
+                lru_pool=self.settings.lru_pool, fair_slack=self.settings.fair_slack))
+
+        # Local HTTP/WebSocket API: pushes every state change to overlays and takes commands like the hotkeys
+        if self.settings.control_port:
+            self._start_control_server()
+
+    def _start_control_server(self):
+        from control_api import ControlServer
+        try:
+            self.control_server = ControlServer(self.scheduler, port=self.settings.control_port).start()
+        except OSError as e:
+            print(f"Failed to start the control API on port {self.settings.control_port}: {e}")
+            return
+        self.session.state_listeners.append(self.control_server.publish)
+        # Overlays can show the game list while the shuffler waits for the start key
+        self.control_server.publish(self.session.state())
+
+    def _create_instance_manager(self, window_backend):
+        # Loaded only when launch_dolphin is on (it brings in subprocess and a thread pool)
+        from instances import InstanceManager, dolphin_command
+        return InstanceManager(
+            self.settings.games, window_backend, self.settings.game_paths,
+            # Read from the settings on every launch, so reloaded options apply to the next relaunch
+            lambda path: dolphin_command(self.settings.dolphin_path, self.settings.dolphin_args, path),
+            max_relaunches=self.settings.max_relaunches,
+            hang_timeout=self.settings.hang_timeout,
+            wanted=self.game_store.is_active,
+            on_exit=self.on_dolphin_exit,
+        )
+
+    def start_instances(self):
+        """Start a Dolphin for every game that is not open yet and watch the processes, if launch_dolphin is on."""
+        if self.instances is None:
+            return
+        started = self.instances.launch_all()
+        print(f"Started Dolphin for {len(started)} games; {len(self.instances.instances) - len(started)} were already open.")
+        without_file = [game for game in self.settings.games if game not in self.instances.instances]
+        if without_file:
+            print(f"No Dolphin started for (start them yourself): {', '.join(without_file)}")
+        self.instances.start()
+
+    def on_dolphin_exit(self, game):
+        # Called on the monitor thread; a swap is quicker than waiting out the turn on a closed window
+        if game == self.session.current_game:
+            self.scheduler.post(SKIP)
+
+    def _create_strategy(self):
+        return create_strategy(self.settings.selection, self.settings.games, weights=self.settings.weights,
+                               no_repeat=self.settings.no_repeat, lru_pool=self.settings.lru_pool,
+                               play_time=self.play_time.totals, fair_slack=self.settings.fair_slack,
+                               rng=self.schedule.pick_rng)
+
+    def _create_export_writer(self):
+        export_files = []
+        if self.settings.export_game_list:
+            export_files.append(("remaining_games.txt", render_game_list))
+        if self.settings.export_num_remaining:
+            export_files.append(("num_remaining.txt", render_num_remaining))
+        if self.settings.export_game_lines:
+            export_files.append(("remaining_games_lines.txt", render_game_lines))
+        if self.settings.export_json:
+            export_files.append(("shuffler_state.json", render_json))
+        if self.settings.export_play_time:
+            export_files.append(("play_time.txt", render_play_time))
+        if self.settings.export_template:
+            export_files.append(("custom_export.txt", template_renderer(self.settings.export_template)))
+        return ExportWriter(export_files, debounce=self.settings.export_debounce)
+
+    def start_obs(self):
+        """Import and connect the OBS client on a background thread, if OBS integration is enabled."""
+        if self.settings.obs_integration:
+            self._obs_thread = threading.Thread(target=self._connect_obs, name="obs-connect", daemon=True)
+            self._obs_thread.start()
+
+    def _connect_obs(self):
+        main = self._create_obs_controller('localhost', self.settings.obs_port, self.settings.obs_password)
+        if self.settings.screenshots:
+            self._start_screenshots()
+        if self.settings.watchdog_enabled:
+            self._start_watchdog()
+        if not self.settings.extra_scenes and not self.settings.obs_targets:
+            self.obs_control = main
+            return
 
-def update_exports():
-    if EXPORT_GAME_LIST:
-        with open("remaining_games.txt", "w") as games_list_file:
-            active_games = [game for game, status in game_statuses if status]
-            games_list_file.write(", ".join(active_games))
-    if EXPORT_NUM_REMAINING:
-        with open("num_remaining.txt", "w") as games_remaining_file:
-            count = sum(1 for game, status in game_statuses if status)
-            games_remaining_file.write("Games left: " + str(count))
-
-def mark_game_as_done(current_game):
-    global game_statuses, completed_games
-    for i, (game, status) in enumerate(game_statuses):
-        if game == current_game and status:
-            game_statuses[i] = (game, False)
-            completed_games.append(game)
-            print(f"{current_game} marked as done and removed from the pool.")
-            update_exports()
+        # Several scenes or instances: each target gets its own thread so they are updated concurrently
+        from obs_fanout import FanoutTarget, OBSFanout
+        targets = [FanoutTarget('main', main, [self.settings.scene_name, *self.settings.extra_scenes], metrics=self.metrics)]
+        for name, host, port, password, scenes in self.settings.obs_targets:
+            targets.append(FanoutTarget(name, self._create_obs_controller(host, port, password), scenes, metrics=self.metrics))
+        self.obs_control = OBSFanout(targets)
+
+    def _create_obs_controller(self, host, port, password):
+        # With obs_async, requests are queued on a background event loop and the main loop never waits for OBS.
+        if self.settings.obs_async:
+            from OBS_Websocket_Async import BackgroundOBSController
+            return BackgroundOBSController(host=host, port=port, password=password)
+        # Keeps trying in the background and reconnects on its own if OBS is restarted mid-run
+        from OBS_Websocket_Encapsulation import OBSController
+        return OBSController(host=host, port=port, password=password, lazy=True, metrics=self.metrics)
+
+    def _start_screenshots(self):
+        # Screenshots get a connection of their own so a large capture never holds up a swap's request
+        from OBS_Websocket_Encapsulation import OBSController
+        from screenshots import ScreenshotPipeline
+        controller = OBSController(port=self.settings.obs_port, password=self.settings.obs_password, listen_events=False,
+                                   lazy=True, metrics=self.metrics)
+        self.screenshot_pipeline = ScreenshotPipeline(
+            controller, self.game_store.active_games(),
+            interval=self.settings.screenshot_interval,
+            max_per_second=self.settings.screenshot_max_per_second,
+            img_format=self.settings.screenshot_format,
+            width=self.settings.screenshot_width,
+            height=self.settings.screenshot_height,
+            output_dir=self.settings.screenshot_dir,
+            metrics=self.metrics,
+        ).start()
+        # Completed games leave the capture rotation and undone or added ones join it, at every state change
+        pipeline = self.screenshot_pipeline
+        self.session.state_listeners.append(lambda state: pipeline.set_sources(state['remaining']))
+
+    def _start_watchdog(self):
+        try:
+            from freeze_watchdog import FreezeWatchdog
+        except ImportError:
+            print("The frozen-game watchdog needs numpy (pip install numpy); continuing without it.")
             return
-    print(f"{current_game} is not active or already completed.")
-
-def undo_last_completion():
-    global game_statuses, completed_games
-    if completed_games:
-        last_completed = completed_games.pop()
-        for i, (game, status) in enumerate(game_statuses):
-            if game == last_completed:
-                game_statuses[i] = (game, True)
-                print(f"Undo: {last_completed} moved back to active games.")
-                update_exports()
-                return
-    else:
-        print("No games to undo.")
-
-def allow_set_foreground_window():
-    ASFW_ANY = -1
-    ctypes.windll.user32.AllowSetForegroundWindow(ASFW_ANY)
-
-def bring_window_to_foreground(window_handle):
-    try:
-        # Connect to the window using pywinauto
-        app = Application(backend="win32").connect(handle=window_handle)
-        window = app.window(handle=window_handle)
-        # Restore the window if minimized
-        if window.is_minimized():
-            window.restore()
-        window.set_focus()
-        # print(f"Brought window with handle {window_handle} to the foreground.")
-    except Exception as e:
-        print(f"Failed to bring window to the foreground: {e}")
-
-def minimize_window(window_handle):
-    win32gui.ShowWindow(window_handle, win32con.SW_MINIMIZE)
-    # print(f"Minimized window with handle {window_handle} to ensure it loses focus.")
-
-def get_dolphin_windows():
-    windows = []
-    def enum_window_callback(hwnd, extra):
-        if win32gui.IsWindowVisible(hwnd):
-            window_text = win32gui.GetWindowText(hwnd)
-            for game, status in game_statuses:
-                if game in window_text and "Dolphin" in window_text and status:
-                    windows.append((hwnd, game))
-    win32gui.EnumWindows(enum_window_callback, None)
-    return windows
+        from OBS_Websocket_Encapsulation import OBSController
+        from screenshots import decode_data_uri
+        controller = OBSController(port=self.settings.obs_port, password=self.settings.obs_password, listen_events=False,
+                                   lazy=True, metrics=self.metrics)
+
+        def grab(source_name):
+            # A 64x36 BMP is a few kB and needs no image decoder
+            data_uri = controller.get_source_screenshot(source_name, "bmp", 64, 36, -1)
+            return decode_data_uri(data_uri) if data_uri else None
+
+        self.watchdog_controller = controller
+        self.watchdog = FreezeWatchdog(grab, self.scheduler, samples=self.settings.watchdog_samples,
+                                       interval=self.settings.watchdog_interval, action=self.settings.watchdog_action).start()
+
+    def wait_for_obs(self):
+        """Wait for start_obs() to finish and hand the OBS client to the session."""
+        if self._obs_thread is not None:
+            self._obs_thread.join()
+            self._obs_thread = None
+        self.session.obs_control = self.obs_control
+        if self.watchdog is not None:
+            # Only the game on screen is watched, and the count starts over on every swap
+            self.session.swap_listeners.append(self.watchdog.set_active)
+            self.watchdog.set_active(self.session.current_game)
+
+    # -------------------------------------------------
+    # LIVE CONFIG RELOAD
+    # -------------------------------------------------
+
+    # Settings that take effect while running; a change to anything else is reported as needing a restart
+    LIVE_SETTINGS = {
+        'min_time', 'max_time', 'games',
+        'selection', 'weights', 'no_repeat', 'lru_pool', 'fair_slack',
+        'export_game_list', 'export_num_remaining', 'export_game_lines', 'export_json', 'export_play_time',
+        'export_template', 'export_debounce',
+        'watchdog_interval', 'watchdog_samples', 'watchdog_action',
+        'dolphin_path', 'dolphin_args', 'max_relaunches', 'hang_timeout', 'game_paths',
+    }
+    STRATEGY_SETTINGS = {'selection', 'weights', 'no_repeat', 'lru_pool', 'fair_slack'}
+    # Live as long as no OBS connection has to be opened or closed for them, see _apply_obs_scenes()
+    SCENE_SETTINGS = {'scene_name', 'extra_scenes', 'obs_targets'}
+    EXPORT_SETTINGS = {'export_game_list', 'export_num_remaining', 'export_game_lines', 'export_json',
+                       'export_play_time', 'export_template', 'export_debounce'}
+
+    def watch_config(self):
+        """Start reloading config.ini when it is saved, if watch_config is on."""
+        if self.settings.watch_config:
+            self.config_watcher = ConfigWatcher(self.config_file, self.on_config_changed).start()
+
+    def on_config_changed(self, settings):
+        # Called on the watcher thread; the main loop applies the settings when it handles RELOAD
+        self._pending_settings = settings
+        self.scheduler.post(RELOAD)
+
+    def apply_pending_settings(self):
+        settings, self._pending_settings = self._pending_settings, None
+        if settings is not None:
+            self.apply_settings(settings)
+
+    def apply_settings(self, settings):
+        """Switch to reloaded settings on the main loop, touching only what changed. Returns the changed names."""
+        changed = set(settings.changed(self.settings))
+        if not changed:
+            return changed
+        old, self.settings = self.settings, settings
+        needs_restart = changed - self.LIVE_SETTINGS
+        session = self.session
+
+        session.min_time, session.max_time = settings.min_time, settings.max_time
+        session.scene_name = settings.scene_name
+        if changed & self.SCENE_SETTINGS and self._apply_obs_scenes(old):
+            needs_restart -= self.SCENE_SETTINGS
+        if self.instances is not None:
+            # Set before the game list, so added games are started with their file
+            self.instances.paths = dict(settings.game_paths)
+            self.instances.max_relaunches = settings.max_relaunches
+            self.instances.hang_timeout = settings.hang_timeout
+        if 'games' in changed:
+            added, removed = session.set_games(settings.games)
+            print(f"Game list updated: {len(added)} added, {len(removed)} removed, {self.game_store.active_count} active.")
+        if changed & self.STRATEGY_SETTINGS:
+            # The new strategy's pool is filled from the active windows at the next swap
+            self.selection_strategy = session.selection_strategy = self._create_strategy()
+        if changed & (self.STRATEGY_SETTINGS | {'games'}):
+            self.schedule.forget_plan()
+        if changed & self.EXPORT_SETTINGS:
+            self.export_writer.close()
+            self.export_writer = session.export_writer = self._create_export_writer()
+            session.update_exports()
+        if self.watchdog is not None:
+            self.watchdog.samples = settings.watchdog_samples
+            self.watchdog.interval = settings.watchdog_interval
+            self.watchdog.action = settings.watchdog_action
+
+        print(f"Reloaded {self.config_file}: {', '.join(sorted(changed - needs_restart)) or 'nothing to apply'}.")
+        if needs_restart:
+            print(f"Restart the shuffler to apply: {', '.join(sorted(needs_restart))}.")
+        return changed
+
+    def _apply_obs_scenes(self, old):
+        """
+        Point every OBS target at the reloaded scene names. Returns False if part of the change needs
+        a restart: an OBS target was added, removed or moved, or one scene became several.
+        """
+        if self.obs_control is None:
+            return not self.settings.obs_integration
+        targets = getattr(self.obs_control, 'targets', None)
+        if targets is None:
+            # A single controller follows scene_name through the session, unless fanout is now needed
+            if self.settings.extra_scenes or self.settings.obs_targets:
+                return False
+            if old.scene_name != self.settings.scene_name:
+                self.obs_control.forget_visibility(old.scene_name)
+            return True
+
+        targets[0].scenes = [self.settings.scene_name] + list(self.settings.extra_scenes)
+        configured = {name: scenes for name, host, port, password, scenes in self.settings.obs_targets}
+        for target in targets[1:]:
+            target.scenes = list(configured.get(target.name, target.scenes))
+        # Scenes no longer shown must not be replayed when a connection comes back
+        old_scenes = {old.scene_name, *old.extra_scenes, *(scene for target in old.obs_targets for scene in target[4])}
+        for target in targets:
+            for scene_name in old_scenes.difference(target.scenes):
+                target.controller.forget_visibility(scene_name)
+        return [target[:4] for target in self.settings.obs_targets] == [target[:4] for target in old.obs_targets]
+
+    # -------------------------------------------------
+    # EVENT HANDLERS
+    # -------------------------------------------------
+
+    # Completion and undo presses are ignored by the scheduler while paused.
+
+    def on_completion_press(self, e):
+        self.scheduler.post(COMPLETE)
+
+    def on_undo_press(self, e):
+        self.scheduler.post(UNDO)
+
+    def on_redo_press(self, e):
+        self.scheduler.post(REDO)
+
+    def on_pause_press(self, e):
+        self.scheduler.post(PAUSE)
+
+    def on_start_press(self, e):
+        self.scheduler.post(START)
+
+    def register_hotkeys(self):
+        # Windows-only module, loaded here so the shuffler can be imported on any platform
+        import keyboard
+
+        # Register keyboard listeners using hotkeys from config
+        keyboard.on_press_key(self.settings.completion_key, self.on_completion_press)
+        keyboard.on_press_key(self.settings.undo_key, self.on_undo_press)
+        if self.settings.redo_key:
+            keyboard.on_press_key(self.settings.redo_key, self.on_redo_press)
+        keyboard.on_press_key(self.settings.pause_key, self.on_pause_press)
+        keyboard.on_press_key(self.settings.start_key, self.on_start_press)
+
+    # -------------------------------------------------
+    # MAIN SHUFFLER LOOP
+    # -------------------------------------------------
+
+    def run(self):
+        try:
+            self.load_config()
+        except ConfigError as e:
+            print(f"Please fix {self.config_file} and start the shuffler again:\n{e}")
+            return
+        self.print_config()
+        self.build()
+        self.start_instances()
+        self.watch_config()
+        self.start_obs()
+        self.register_hotkeys()
+        self.session.wait_for_start(self.settings.start_key)
+        self.wait_for_obs()
+        try:
+            self.session.run()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.config_watcher is not None:
+            self.config_watcher.close()
+        if self.control_server is not None:
+            self.control_server.close()
+        if self.instances is not None:
+            self.instances.close()
+        self.export_writer.close()
+        if self.screenshot_pipeline is not None:
+            self.screenshot_pipeline.close()
+            self.screenshot_pipeline.controller.close()
+        if self.watchdog is not None:
+            self.watchdog.close()
+            self.watchdog_controller.close()
+        if self.obs_control is not None:
+            from obs_fanout import OBSFanout
+            if isinstance(self.obs_control, OBSFanout):
+                for name, stats in self.obs_control.stats().items():
+                    print(f"OBS target '{name}': {stats}")
+            self.obs_control.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.schedule.close()
+        self.metrics.close()
 
-# -------------------------------------------------
-# MAIN SHUFFLER LOOP
-# -------------------------------------------------
 
 def main():
-    global mark_done, undo_done
-    previous_window = None
-
-    # Register keyboard listeners using hotkeys from config
-    keyboard.on_press_key(COMPLETION_KEY, on_completion_press)
-    keyboard.on_press_key(UNDO_KEY, on_undo_press)
-    keyboard.on_press_key(PAUSE_KEY, on_pause_press)
-    keyboard.on_press_key(START_KEY, on_start_press)
-
-    print(f"Shuffler is paused. Press '{START_KEY}' to start.")
-    while not start_triggered:
-        time.sleep(0.1)
-
-    # Countdown before starting
-    for i in range(5, 0, -1):
-        print(f"Starting in {i}...")
-        time.sleep(1)
-    print("Shuffler starting!")
-
-    # If using OBS integration, set all sources to inactive initially
-    if OBS_INTEGRATION:
-        initial_dolphin_windows = get_dolphin_windows()
-        for hwnd, game in initial_dolphin_windows:
-            obs_control.set_source_enabled_by_name(SCENE_NAME, game, False)
-
-    update_exports()
-
-    while True:
-        if pause_active:
-            time.sleep(0.1)
-
-        dolphin_windows = get_dolphin_windows()
-
-        # Filter active windows based on game status
-        active_windows = [w for w in dolphin_windows if w[1] in [game for game, status in game_statuses if status]]
-        
-        if len(active_windows) == 0:
-            print("No active games remaining.")
-            break
-
-        # Choose a random active window (or the only one available)
-        if len(active_windows) == 1:
-            selected_window = active_windows[0]
-            selected_handle, selected_game = selected_window
-            
-            # If this is the first iteration or if the active game has changed, swap once.
-            if previous_window is None or selected_handle != previous_window[0]:
-                print(f"Only one active game remains: {selected_game}")
-                bring_window_to_foreground(selected_handle)
-                if previous_window:
-                    minimize_window(previous_window[0])
-                previous_window = selected_window
-
-            # Instead of re-swapping, just sleep and process key events.
-            time.sleep(0.1)
-            if mark_done:
-                mark_game_as_done(selected_game)
-                mark_done = False
-            if undo_done:
-                undo_last_completion()
-                undo_done = False
-            continue
-        else:
-            selected_window = random.choice(active_windows)
-        selected_handle, selected_game = selected_window
-
-        # Prevent switching to the same window as before only if there is more than one active game
-        if len(active_windows) > 1 and previous_window and selected_handle == previous_window[0]:
-            continue
-
-        # Print the game name to indicate what will be swapped to
-        print(f"Swapping to: {selected_game}")
-
-        # Bring the new window to the foreground first
-        bring_window_to_foreground(selected_handle)
-
-        # Then minimize the previous window if it exists
-        if previous_window:
-            minimize_window(previous_window[0])
-
-        # Set OBS sources' visibility if OBS integration is enabled
-        if OBS_INTEGRATION:
-            for hwnd, game in dolphin_windows:
-                if game == selected_game:
-                    obs_control.set_source_enabled_by_name(SCENE_NAME, game, True)
-                else:
-                    obs_control.set_source_opacity(SCENE_NAME, game, False)
-
-        # Determine a random time (in tenths of a second) until the next swap
-        time_to_switch = random.randrange(MIN_TIME * 10, MAX_TIME * 10, 1)
-        print("Switching in", time_to_switch / 10, "seconds.")
-
-        # Countdown loop with 0.1 second resolution (pausing countdown if needed)
-        for _ in range(time_to_switch):
-            while pause_active:
-                time.sleep(0.1)
-            if mark_done:
-                mark_game_as_done(selected_game)
-                mark_done = False
-            if undo_done:
-                undo_last_completion()
-                undo_done = False
-            time.sleep(0.1)
-
-        previous_window = selected_window
-        update_exports()
+    ShufflerApp().run()
 
 if __name__ == "__main__":
     main()
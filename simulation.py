@@ -0,0 +1,159 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from exports import ExportWriter, render_game_list, render_num_remaining, render_json
+from focus import FocusController
+from game_store import GameStore
+from metrics import Metrics
+from platform_backend import FakeWindowBackend
+from schedule import ShuffleSchedule
+from scheduler import FakeClock, ShuffleScheduler, COMPLETE, UNDO, REDO, PAUSE
+from selection import create_strategy, STRATEGIES
+from shuffle_session import ShuffleSession
+from window_registry import WindowRegistry
+
+
+class SimulationClock(FakeClock):
+    """
+    FakeClock for whole runs. Scripted presses can be lost the way real ones are (a second
+    completion before the next swap hits an already completed game), so once the script runs
+    out every remaining game is completed just before its swap, and every simulation ends.
+    """
+    def wait(self, events, timeout):
+        if self._scripted or not events.empty():
+            return super().wait(events, timeout)
+        if timeout is not None:
+            self.time += timeout
+        return COMPLETE
+
+
+class SimulatedOBS:
+    """Stands in for OBSController: records source visibility in memory."""
+    def __init__(self):
+        self.visible = {}
+        self.calls = 0
+
+    def apply_visibility(self, scene_name, visible_source, sources=None):
+        self.calls += 1
+        changed = 0
+        for source in sources or self.visible:
+            wanted = source == visible_source
+            if self.visible.get(source) != wanted:
+                self.visible[source] = wanted
+                changed += 1
+        return changed
+
+
+def script_events(clock, num_games, min_time, max_time, undo_rate=0.1, pause_rate=0.05, rng=None):
+    """
+    Script hotkey presses over the virtual timeline: one completion for every game, spread out
+    so the marathon lasts a few swaps per game, with the occasional undo/redo pair and pause.
+    """
+    rng = rng or random.Random()
+    mean_interval = (min_time + max_time) / 2
+    gaps = [rng.uniform(1, 6) * mean_interval for _ in range(num_games)]
+    at = 0.0
+    for index, gap in enumerate(gaps):
+        at += gap
+        clock.post_at(at, COMPLETE)
+        if rng.random() < undo_rate:
+            clock.post_at(at + 0.5, UNDO)
+            clock.post_at(at + 1.0, REDO)
+        if rng.random() < pause_rate and index + 1 < num_games:
+            # Resume before the next completion, which would otherwise be dropped while paused
+            clock.post_at(at + 2.0, PAUSE)
+            clock.post_at(at + 2.0 + rng.uniform(1, gaps[index + 1] - 3), PAUSE)
+
+
+def build_session(num_games=300, strategy='uniform', min_time=10, max_time=30, export_dir=None, seed=0, clock=None,
+                  wrap_latency=0.0):
+    """Wire a ShuffleSession to fake windows, a virtual clock, in-memory OBS and real exports."""
+    # Key presses are scripted from their own generator, so they do not shift the shuffle's picks
+    rng = random.Random(f"{seed}/script")
+    schedule = ShuffleSchedule(seed)
+    games = [f"Simulated Game {i:04}" for i in range(num_games)]
+
+    backend = FakeWindowBackend(wrap_latency=wrap_latency)
+    for hwnd, game in enumerate(games, start=1000):
+        backend.add_window(hwnd, f"Dolphin 5.0 | {game}")
+    # Unrelated windows the registry has to skip over on every refresh
+    for hwnd in range(num_games * 5):
+        backend.add_window(hwnd + 100000, f"Untitled - Notepad {hwnd}")
+
+    clock = clock or SimulationClock()
+    script_events(clock, num_games, min_time, max_time, rng=rng)
+
+    exports = []
+    if export_dir is not None:
+        exports = [
+            (os.path.join(export_dir, 'games_list.txt'), render_game_list),
+            (os.path.join(export_dir, 'num_remaining.txt'), render_num_remaining),
+            (os.path.join(export_dir, 'state.json'), render_json),
+        ]
+
+    metrics = Metrics(window=100000)
+    game_store = GameStore(games)
+    return ShuffleSession(
+        games,
+        game_store,
+        create_strategy(strategy, games, no_repeat=2, rng=schedule.pick_rng),
+        WindowRegistry(games, backend),
+        FocusController(backend, metrics=metrics),
+        ShuffleScheduler(clock),
+        export_writer=ExportWriter(exports, debounce=0),
+        obs_control=SimulatedOBS(),
+        scene_name='Simulation',
+        metrics=metrics,
+        min_time=min_time,
+        max_time=max_time,
+        countdown=0,
+        schedule=schedule,
+        log=lambda *args: None,
+    )
+
+
+def run_simulation(num_games=300, strategy='uniform', seed=0):
+    """Run a full marathon headless and print the shuffler's own overhead per swap."""
+    with tempfile.TemporaryDirectory() as export_dir:
+        session = build_session(num_games, strategy, export_dir=export_dir, seed=seed)
+        start = time.perf_counter()
+        session.run()
+        elapsed = time.perf_counter() - start
+        session.export_writer.close()
+
+        metrics = session.metrics
+        virtual_hours = session.scheduler.clock.now() / 3600
+        print(f"{num_games} games, '{strategy}' selection, seed {seed} (digest {session.schedule.digest()})")
+        print(f"  {session.swaps} swaps over {virtual_hours:.1f} virtual hours in {elapsed:.2f} s "
+              f"({session.swaps / elapsed:,.0f} swaps/s)")
+        print(f"  completed {session.game_store.completed_count}/{num_games}, "
+              f"{session.obs_control.calls} visibility updates, "
+              f"{session.export_writer.writes} export writes ({session.export_writer.skipped} unchanged)")
+        totals = session.play_time.totals
+        print(f"  play time per game: min {min(totals.values()) / 60:.1f} min, max {max(totals.values()) / 60:.1f} min")
+        for line in metrics.summary().splitlines():
+            print("  " + line)
+        return session
+
+
+def benchmark(seed=0):
+    """Compare per-swap overhead across selection strategies and pool sizes."""
+    for num_games in (50, 300, 1000):
+        for strategy in STRATEGIES:
+            run_simulation(num_games, strategy, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shuffler headless against simulated windows and OBS.")
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--strategy", choices=STRATEGIES, default='uniform')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="run every strategy at several pool sizes")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.seed)
+    else:
+        run_simulation(args.games, args.strategy, args.seed)
@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter so every phase is measured cold
+PHASES_SCRIPT = r"""
+import json, sys, time
+timings = {}
+start = time.perf_counter()
+import shuffler
+timings['import shuffler'] = time.perf_counter() - start
+
+app = shuffler.ShufflerApp(sys.argv[1])
+start = time.perf_counter()
+app.load_config()
+timings['load_config'] = time.perf_counter() - start
+
+from platform_backend import FakeWindowBackend
+start = time.perf_counter()
+app.build(window_backend=FakeWindowBackend())
+timings['build'] = time.perf_counter() - start
+
+start = time.perf_counter()
+import OBS_Websocket_Encapsulation
+timings['import OBS client (background)'] = time.perf_counter() - start
+app.close()
+print(json.dumps(timings))
+"""
+
+
+def import_times(module="shuffler"):
+    """Run `python -X importtime -c "import <module>"` and return [(cumulative_us, self_us, name)]."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=PACKAGE_DIR, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return entries
+
+
+def phase_times():
+    """Time importing the shuffler, loading a default config and building the app, in a fresh interpreter."""
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, "config.ini")
+        subprocess.run([sys.executable, "-c", "import sys, shuffler; shuffler.create_default_config(sys.argv[1])", config_file],
+                       cwd=PACKAGE_DIR, capture_output=True, check=True)
+        # Run from the temporary directory so files the app creates (eg. the text exports) are not left in the package directory
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_DIR, os.environ.get("PYTHONPATH")])))
+        result = subprocess.run([sys.executable, "-c", PHASES_SCRIPT, config_file],
+                                cwd=directory, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def report(top=15):
+    entries = import_times()
+    total_us = max(cumulative for cumulative, _, _ in entries)
+    print(f"Cold import of shuffler: {total_us / 1000:.1f} ms across {len(entries)} modules")
+    print("Slowest imports (cumulative):")
+    for cumulative, self_us, name in sorted(entries, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name.strip()}")
+
+    print("Startup phases (fresh interpreter):")
+    for phase, seconds in phase_times().items():
+        print(f"  {phase:32} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report how long the shuffler takes to start, import by import.")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    report(parser.parse_args().top)
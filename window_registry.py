@@ -0,0 +1,121 @@
+import re
+import time
+from platform_backend import FakeWindowBackend
+
+
+class WindowRegistry:
+    """
+    Index of open Dolphin windows by game, refreshed incrementally.
+
+    All game names are compiled into one regex (longest names first, so "Mario Kart: Double Dash!!"
+    wins over a shorter game that is a prefix of it). On refresh only windows that are new or whose
+    title changed are matched again; unchanged windows keep their previous match.
+    """
+    def __init__(self, games, backend, marker="Dolphin"):
+        self.backend = backend
+        self.marker = marker
+        self._titles = {}   # hwnd -> last seen title, for every visible window
+        self._matches = {}  # hwnd -> game, for windows that belong to a game
+        self.games = []
+        self.set_games(games)
+
+    def set_games(self, games):
+        """
+        Recompile the matcher for a new game list. Known windows are not re-read; only the ones the
+        change can affect are matched again: windows of removed games and windows whose title
+        contains an added game (which may now win over a shorter match).
+        """
+        added = set(games) - set(self.games)
+        removed = set(self.games) - set(games)
+        self.games = list(games)
+        names = sorted(set(self.games), key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(name) for name in names)) if names else None
+        if not added and not removed:
+            return
+        for hwnd, title in self._titles.items():
+            if self._matches.get(hwnd) in removed or any(name in title for name in added):
+                self._update_match(hwnd, title)
+
+    def match(self, title):
+        """Return the game a window title belongs to, or None."""
+        if self._pattern is None or self.marker not in title:
+            return None
+        found = self._pattern.search(title)
+        return found.group(0) if found else None
+
+    def _update_match(self, hwnd, title):
+        game = self.match(title)
+        if game is None:
+            self._matches.pop(hwnd, None)
+        else:
+            self._matches[hwnd] = game
+
+    def refresh(self):
+        """Re-read the window list from the backend. Returns the number of windows that changed."""
+        changed = 0
+        seen = set()
+        for hwnd, title in self.backend.list_windows():
+            seen.add(hwnd)
+            if self._titles.get(hwnd) != title:
+                self._titles[hwnd] = title
+                self._update_match(hwnd, title)
+                changed += 1
+        if len(seen) != len(self._titles):
+            for hwnd in [hwnd for hwnd in self._titles if hwnd not in seen]:
+                del self._titles[hwnd]
+                self._matches.pop(hwnd, None)
+                changed += 1
+        return changed
+
+    def windows(self):
+        """Return [(hwnd, game)] for every known game window."""
+        return list(self._matches.items())
+
+    def hwnd_for(self, game):
+        """Return the window handle for a game, or None if it has no window."""
+        for hwnd, window_game in self._matches.items():
+            if window_game == game:
+                return hwnd
+        return None
+
+
+# -------------------------------------------------
+# BENCHMARK
+# -------------------------------------------------
+
+def benchmark(num_windows=5000, num_games=200, rounds=50):
+    """Compare a full title scan against incremental refreshes over a large fake window list."""
+    games = [f"Game Number {i:04}" for i in range(num_games)]
+    backend = FakeWindowBackend()
+    for hwnd in range(num_windows):
+        if hwnd < num_games:
+            backend.add_window(hwnd, f"Dolphin 2412 | {games[hwnd]} (GM{hwnd:04})")
+        else:
+            backend.add_window(hwnd, f"Some other window {hwnd}")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        matches = [(hwnd, game) for hwnd, title in backend.list_windows() for game in games
+                   if game in title and "Dolphin" in title]
+    naive = (time.perf_counter() - start) / rounds
+
+    registry = WindowRegistry(games, backend)
+    start = time.perf_counter()
+    registry.refresh()
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        backend.set_title(num_games + i, f"Some other window {i} (renamed)")
+        registry.refresh()
+    warm = (time.perf_counter() - start) / rounds
+
+    assert sorted(registry.windows()) == sorted(matches)
+    print(f"{num_windows} windows x {num_games} games")
+    print(f"  naive scan:        {naive * 1000:8.2f} ms")
+    print(f"  registry (cold):   {cold * 1000:8.2f} ms")
+    print(f"  registry (warm):   {warm * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()